@@ -1,6 +1,8 @@
 from __future__ import annotations
+import json
 import logging
 from logging.handlers import RotatingFileHandler, SMTPHandler
+import click
 from flask import Flask
 
 from .config import *
@@ -15,6 +17,9 @@ def create_app(config_class=MongoConfig, use_logger=True):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    from application.mongo.indexes import slow_query_monitor
+    slow_query_monitor.init_app(app)    # before database client creation
+
     db.init_app(app)
     executor.init_app(app)
     linker.init_app(app)
@@ -26,11 +31,83 @@ def create_app(config_class=MongoConfig, use_logger=True):
     app.url_map.converters['experiment'] = WorkspaceExperimentConverter
     app.url_map.converters['rpath'] = AllowedPathConverter
 
+    from application.mongo.locking import lease_manager
+    lease_manager.init_app(app)
+    lease_manager.start()
+
     from application.routes import blueprints
 
     for bp in blueprints:
         app.register_blueprint(bp)
 
+    from application.mongo.indexes import ensure_all_indexes, profiler_report
+
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Creates all declared database indexes."""
+        for collection, indexes in ensure_all_indexes().items():
+            print(f"{collection}: {', '.join(indexes)}")
+
+    @app.cli.command('lock-stats')
+    def lock_stats_command():
+        """Reports the lock wait statistics published by the server processes."""
+        from application.mongo.locking import LeaseManager
+        print(json.dumps(LeaseManager.collect_stats(), indent=2, default=str))
+
+    @app.cli.command('migrate-executions')
+    def migrate_executions_command():
+        """Moves executions embedded in experiments into their own collection."""
+        from application.mongo.resources.experiments import MongoCLExperimentConfig
+        print(f"Migrated experiments: {MongoCLExperimentConfig.migrate_executions()}")
+
+    @app.cli.command('slow-queries')
+    @click.option('--enable', is_flag=True, help='Enable the database profiler for slow queries.')
+    def slow_queries_command(enable):
+        """Reports slow database queries recorded by the profiler, flagging collection scans."""
+        report = profiler_report(app.config['SLOW_QUERY_THRESHOLD_MS'], enable=enable)
+        print(json.dumps(report, indent=2, default=str))
+
+    @app.cli.command('metrics-overhead')
+    @click.option('--minibatches', default=200, help='Minibatches per experience.')
+    @click.option('--repeats', default=3, help='Runs per configuration (the fastest is kept).')
+    def metrics_overhead_command(minibatches, repeats):
+        """Measures the training overhead of system usage metrics in the available modes."""
+        from application.avalanche_ext import measure_metrics_overhead
+        from application.mongo.resources.metricsets import StandardMetricSetBuildConfig
+
+        system_metrics = ('cpu_usage', 'ram_usage', 'disk_usage')
+        per_minibatch = {name: {'minibatch': True, 'epoch': True, 'experience': True} for name in system_metrics}
+        boundaries = {name: {'epoch': True, 'experience': True} for name in system_metrics}
+        configs = {
+            'minibatch': per_minibatch,
+            'minibatch_sampled': dict(per_minibatch, sampling={'cpu_usage': 1.0, 'ram_usage': 1.0}),
+            'boundaries': boundaries,
+            'low_overhead': dict(boundaries, low_overhead=True),
+        }
+        metricsets = {
+            name: (lambda data=data: StandardMetricSetBuildConfig(**data).get_metrics()[1])
+            for name, data in configs.items()
+        }
+        report = measure_metrics_overhead(metricsets, n_minibatches=minibatches, repeats=repeats)
+        print(json.dumps(report, indent=2))
+
+    if app.config.get('ENSURE_INDEXES', False):
+        with app.app_context():
+            # noinspection PyBroadException
+            try:
+                ensure_all_indexes()
+            except Exception as ex:
+                app.logger.warning(f"Unable to ensure database indexes: '{type(ex).__name__}': {ex}")
+
+    if app.config.get('MIGRATE_EXECUTIONS', False):
+        with app.app_context():
+            from application.mongo.resources.experiments import MongoCLExperimentConfig
+            # noinspection PyBroadException
+            try:
+                MongoCLExperimentConfig.migrate_executions()
+            except Exception as ex:
+                app.logger.warning(f"Unable to migrate experiment executions: '{type(ex).__name__}': {ex}")
+
     if not app.debug and not app.testing:
 
         os.makedirs('logs', exist_ok=True)
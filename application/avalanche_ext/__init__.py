@@ -1 +1,3 @@
-from .models import *
\ No newline at end of file
+from .models import *
+from .metrics import *
+from .templates import *
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+Low-overhead system usage metrics.
+
+Avalanche cpu/ram usage metrics do their work at every callback of their granularity
+(or in a polling thread). These metrics instead read process counters from /proc (through
+psutil) only at the boundaries of their granularity and, optionally, at most once every
+`every` seconds in between, and are named as the Avalanche ones (e.g. 'CPUUsage_Epoch',
+'MaxRAMUsage_Exp'), so that they can replace them transparently.
+"""
+from __future__ import annotations
+
+import time
+import typing as t
+import psutil
+import torch
+
+from avalanche.benchmarks.generators import tensors_benchmark
+from avalanche.training.plugins import EvaluationPlugin
+from avalanche.training.supervised import Naive
+from avalanche.evaluation import PluginMetric
+from avalanche.evaluation.metric_results import MetricValue
+from avalanche.evaluation.metric_utils import get_metric_name
+
+if t.TYPE_CHECKING:
+    from avalanche.training.templates import SupervisedTemplate
+
+
+class ProcUsage(PluginMetric[float]):
+    """
+    CPU usage (percentage of a core, averaged since the last reset) or maximum resident
+    memory (MB, over the samples taken since the last reset) of the current process.
+    """
+
+    KINDS = {'cpu_usage': 'CPUUsage', 'ram_usage': 'MaxRAMUsage'}
+
+    # granularity -> (mode, reset_at, emit_at, name suffix)
+    GRANULARITIES = {
+        'minibatch': ('train', 'iteration', 'iteration', '_MB'),
+        'epoch': ('train', 'epoch', 'epoch', '_Epoch'),
+        'epoch_running': ('train', 'epoch', 'iteration', '_Epoch'),
+        'experience': ('eval', 'experience', 'experience', '_Exp'),
+        'stream': ('eval', 'stream', 'stream', '_Stream'),
+    }
+
+    def __init__(self, kind: str, granularity: str, every: float = None):
+        """
+        :param kind: 'cpu_usage' or 'ram_usage'.
+        :param granularity: One of GRANULARITIES.
+        :param every: Minimum interval (in seconds) between samples taken inside the
+        granularity period (and between values emitted for 'minibatch' and 'epoch_running').
+        If None, counters are read only at the boundaries of the period.
+        """
+        super().__init__()
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown usage metric '{kind}'.")
+        self.kind = kind
+        self.granularity = granularity
+        self.mode, self.reset_at, self.emit_at, self.suffix = self.GRANULARITIES[granularity]
+        self.every = every
+        self.process = psutil.Process()
+
+        self._last_sample = 0.0
+        self._start_wall = 0.0
+        self._start_cpu = 0.0
+        self._cpu = 0.0
+        self._max_rss = 0
+        self.reset()
+
+    def __str__(self):
+        prefix = 'Running' if self.granularity == 'epoch_running' else ''
+        return prefix + self.KINDS[self.kind] + self.suffix
+
+    def _sample(self):
+        with self.process.oneshot():
+            times = self.process.cpu_times()
+            rss = self.process.memory_info().rss
+        self._last_sample = time.perf_counter()
+        self._cpu = times.user + times.system
+        self._max_rss = max(self._max_rss, rss)
+
+    def _due(self) -> bool:
+        return self.every is None or time.perf_counter() - self._last_sample >= self.every
+
+    def update(self):
+        self._sample()
+
+    def reset(self, **kwargs):
+        self._max_rss = 0
+        self._sample()
+        self._start_wall, self._start_cpu = self._last_sample, self._cpu
+
+    def result(self, **kwargs) -> float:
+        self._sample()
+        if self.kind == 'cpu_usage':
+            elapsed = self._last_sample - self._start_wall
+            return 100 * (self._cpu - self._start_cpu) / elapsed if elapsed > 0 else 0.0
+        return self._max_rss / 1024 / 1024
+
+    def _emit(self, strategy: SupervisedTemplate) -> list[MetricValue]:
+        name = get_metric_name(self, strategy, add_experience=self.emit_at == 'experience')
+        return [MetricValue(self, name, self.result(), strategy.clock.train_iterations)]
+
+    def _on_iteration(self, strategy: SupervisedTemplate) -> list[MetricValue] | None:
+        if self.emit_at == 'iteration':
+            if self._due():
+                values = self._emit(strategy)
+                if self.reset_at == 'iteration':
+                    self.reset()
+                return values
+        elif self.every is not None and self._due():
+            self.update()
+        return None
+
+    # Training
+    def before_training_epoch(self, strategy: SupervisedTemplate):
+        if self.mode == 'train':
+            self.reset()
+
+    def after_training_iteration(self, strategy: SupervisedTemplate):
+        if self.mode == 'train':
+            return self._on_iteration(strategy)
+
+    def after_training_epoch(self, strategy: SupervisedTemplate):
+        if self.emit_at == 'epoch':
+            return self._emit(strategy)
+
+    # Evaluation
+    def before_eval(self, strategy: SupervisedTemplate):
+        if self.reset_at == 'stream':
+            self.reset()
+
+    def before_eval_exp(self, strategy: SupervisedTemplate):
+        if self.reset_at == 'experience':
+            self.reset()
+
+    def after_eval_iteration(self, strategy: SupervisedTemplate):
+        if self.mode == 'eval':
+            return self._on_iteration(strategy)
+
+    def after_eval_exp(self, strategy: SupervisedTemplate):
+        if self.emit_at == 'experience':
+            return self._emit(strategy)
+
+    def after_eval(self, strategy: SupervisedTemplate):
+        if self.emit_at == 'stream':
+            return self._emit(strategy)
+
+
+def proc_usage_metrics(kind: str, *, every: float = None, minibatch=False, epoch=False,
+                       epoch_running=False, experience=False, stream=False) -> list[PluginMetric]:
+    """
+    Helper with the same granularity flags of Avalanche cpu_usage_metrics and ram_usage_metrics.
+    """
+    flags = {
+        'minibatch': minibatch, 'epoch': epoch, 'epoch_running': epoch_running,
+        'experience': experience, 'stream': stream,
+    }
+    return [ProcUsage(kind, granularity, every) for granularity, enabled in flags.items() if enabled]
+
+
+def measure_metrics_overhead(metricsets: dict[str, t.Callable[[], list]], n_minibatches: int = 200,
+                             batch_size: int = 32, input_size: int = 256, repeats: int = 3) -> dict[str, dict]:
+    """
+    Measures the cost of metrics by training and evaluating a small MLP on random data
+    (2 experiences of n_minibatches minibatches each) with each of the given metrics sets.
+    :param metricsets: A dictionary name -> factory of the metrics list to measure. A
+    'baseline' without metrics is always added.
+    :param repeats: Each configuration is run this number of times, keeping the fastest run.
+    :return: A dictionary name -> {'seconds', 'ms_per_minibatch', 'overhead_pct'}.
+    """
+    n_experiences, n_classes = 2, 10
+    n_samples = n_minibatches * batch_size
+    tensors = [
+        (torch.rand(n_samples, input_size), torch.randint(0, n_classes, (n_samples,)))
+        for _ in range(n_experiences)
+    ]
+    benchmark = tensors_benchmark(tensors, tensors, task_labels=[0] * n_experiences)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    results: dict[str, dict] = {}
+    for name, factory in {'baseline': list, **metricsets}.items():
+        best = None
+        for _ in range(repeats):
+            model = torch.nn.Sequential(
+                torch.nn.Linear(input_size, 256), torch.nn.ReLU(), torch.nn.Linear(256, n_classes),
+            )
+            strategy = Naive(
+                model, torch.optim.SGD(model.parameters(), lr=0.01), torch.nn.CrossEntropyLoss(),
+                train_mb_size=batch_size, train_epochs=1, eval_mb_size=batch_size, device=device,
+                evaluator=EvaluationPlugin(*factory(), loggers=[]),
+            )
+            start = time.perf_counter()
+            for experience in benchmark.train_stream:
+                strategy.train(experience)
+                strategy.eval(benchmark.test_stream)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {'seconds': best}
+
+    # each experience is trained once and evaluated once per training experience
+    total_minibatches = n_experiences * n_minibatches * (1 + n_experiences)
+    baseline = results['baseline']['seconds']
+    for result in results.values():
+        result['ms_per_minibatch'] = 1000 * result['seconds'] / total_minibatches
+        result['overhead_pct'] = 100 * (result['seconds'] - baseline) / baseline
+    return results
+
+
+__all__ = [
+    'ProcUsage',
+    'proc_usage_metrics',
+    'measure_metrics_overhead',
+]
@@ -0,0 +1,114 @@
+"""
+Extensions of Avalanche strategy templates.
+"""
+from __future__ import annotations
+
+import functools
+import torch
+
+from avalanche.training.templates import SupervisedTemplate
+
+
+class GradientAccumulationMixin:
+    """
+    Splits each training minibatch into `gradient_accumulation_steps` micro-batches that are
+    forwarded and backpropagated one at a time, accumulating gradients before a single
+    optimizer step. The effective batch size (train_mb_size) and the number of optimizer
+    steps are unchanged, while activations are kept in memory for one micro-batch at a time.
+
+    Plugins callbacks are called as follows:
+        - before/after_training_iteration and before/after_update: once per minibatch;
+        - before/after_forward and before_backward: once per micro-batch, with mbatch,
+        mb_output and loss of the micro-batch. Loss terms added by plugins in before_backward
+        (e.g. EWC and SI penalties, LwF distillation) are weighted as the micro-batch loss,
+        so that their total weight is the same as without accumulation;
+        - after_backward: once per minibatch, on the accumulated gradients (so that gradient
+        projections, e.g. AGEM and GEM, are applied to the gradient of the whole minibatch).
+    After the last micro-batch, mbatch and mb_output refer to the whole minibatch and loss
+    is the (detached) minibatch loss, as seen by metrics.
+    Layers that depend on the batch (e.g. BatchNorm) see micro-batches.
+    """
+    gradient_accumulation_steps: int = 1
+
+    def _micro_batches(self) -> list[tuple[list, float]]:
+        """
+        :return: A list of (micro-batch, weight) where weights are proportional to sizes.
+        """
+        size = len(self.mb_y)
+        bounds = torch.linspace(0, size, min(self.gradient_accumulation_steps, size) + 1).long().tolist()
+        return [
+            ([part[start:end] for part in self.mbatch], (end - start) / size)
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+        ]
+
+    def training_epoch(self, **kwargs):
+        if self.gradient_accumulation_steps <= 1:
+            return super().training_epoch(**kwargs)
+        for self.mbatch in self.dataloader:
+            if self._stop_training:
+                break
+
+            self._unpack_minibatch()
+            self._before_training_iteration(**kwargs)
+
+            self.optimizer.zero_grad()
+            mbatch, outputs, total_loss = self.mbatch, [], 0
+            for micro_batch, weight in self._micro_batches():
+                self.mbatch = micro_batch
+                self.loss = 0
+
+                self._before_forward(**kwargs)
+                self.mb_output = self.forward()
+                self._after_forward(**kwargs)
+
+                self.loss += self.criterion()
+
+                self._before_backward(**kwargs)
+                self.loss = self.loss * weight
+                self.backward()
+                outputs.append(self.mb_output.detach())
+                total_loss += self.loss.detach()
+
+            self.mbatch, self.mb_output, self.loss = mbatch, torch.cat(outputs), total_loss
+            self._after_backward(**kwargs)
+
+            self._before_update(**kwargs)
+            self.optimizer_step()
+            self._after_update(**kwargs)
+
+            self._after_training_iteration(**kwargs)
+
+
+class AutocastMixin:
+    """
+    Runs the forward pass of the model (in training and evaluation) under torch.autocast
+    with autocast_dtype (bfloat16 by default) for the device type of the strategy.
+    Outputs are cast back to float32, so that the criterion and the regularization terms
+    added by plugins outside of the forward pass (e.g. EWC and SI penalties, LwF distillation
+    through the previous model) are computed in float32. Parameters, gradients and optimizer
+    state stay in float32, and backward runs outside of the autocast region.
+    """
+    autocast_dtype: torch.dtype = torch.bfloat16
+
+    def forward(self):
+        with torch.autocast(torch.device(self.device).type, dtype=self.autocast_dtype):
+            output = super().forward()
+        return output.float()
+
+
+@functools.lru_cache(maxsize=None)
+def extend_strategy(strategy_class: type[SupervisedTemplate], *mixins: type) -> type[SupervisedTemplate]:
+    """
+    :return: A subclass of the given strategy with the given mixins (e.g. GradientAccumulationMixin,
+    AutocastMixin), or the strategy itself if no mixin is given.
+    """
+    if len(mixins) == 0:
+        return strategy_class
+    return type(strategy_class.__name__, (*mixins, strategy_class), {})
+
+
+__all__ = [
+    'GradientAccumulationMixin',
+    'AutocastMixin',
+    'extend_strategy',
+]
@@ -32,9 +32,35 @@ def get_env(key: str, default=None, transf: t.Callable = lambda x: x):
 USE_MONGODB_AUTH = bool(get_env('USE_MONGODB_AUTH', 0, int))
 
 
+def get_persistent_secret_key(path: str) -> str:
+    """
+    Reads the secret key from the given file, creating it with a random key if it does not
+    exist, so that all server processes (e.g. gunicorn workers) share the same key, and
+    signed tokens remain valid across restarts. The file is atomically linked into place,
+    so that concurrent processes never read a partially written key.
+    """
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as fp:
+            fp.write(os.urandom(64).hex())
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass    # created by another process
+        finally:
+            os.remove(tmp_path)
+    with open(path, 'r') as fp:
+        return fp.read().strip()
+
+
 # Base configuration class for Flask app
 class SimpleConfig(object):
-    SECRET_KEY = get_env("SECRET_KEY", os.urandom(128))
+    # Key for signing authentication tokens: if not given, it is generated once and saved in SECRET_KEY_FILE
+    SECRET_KEY = get_env("SECRET_KEY") or get_persistent_secret_key(
+        get_env("SECRET_KEY_FILE", os.path.join(basedir, 'instance', 'secret_key'))
+    )
 
     # For setting up an email notification service for failures
     MAIL_SERVER = get_env('MAIL_SERVER')
@@ -54,6 +80,23 @@ class SimpleConfig(object):
 
     EXECUTOR_TYPE = get_env("EXECUTOR_TYPE", 'thread')
 
+    # Resource locks leases (seconds): locks of crashed processes are released after LOCK_LEASE_TTL
+    LOCK_LEASE_TTL = get_env("LOCK_LEASE_TTL", 30, int)
+    LOCK_HEARTBEAT_INTERVAL = get_env("LOCK_HEARTBEAT_INTERVAL", 10, int)
+    # Maximum time (seconds) a request waits for a busy resource before failing (0 for failing immediately)
+    LOCK_WAIT_TIMEOUT = get_env("LOCK_WAIT_TIMEOUT", 5.0, float)
+    # Maximum time (seconds) a waiting writer prevents new readers from acquiring a resource
+    LOCK_WRITER_PRIORITY = get_env("LOCK_WRITER_PRIORITY", 5.0, float)
+
+    # Creates all declared database indexes on startup (otherwise use 'flask ensure-indexes')
+    ENSURE_INDEXES = bool(get_env("ENSURE_INDEXES", 1, int))
+    # Moves executions embedded in experiments into their own collection on startup (idempotent,
+    # otherwise use 'flask migrate-executions')
+    MIGRATE_EXECUTIONS = bool(get_env("MIGRATE_EXECUTIONS", 1, int))
+    # Database commands slower than this (milliseconds) are reported by 'flask slow-queries'
+    SLOW_QUERY_THRESHOLD_MS = get_env("SLOW_QUERY_THRESHOLD_MS", 100.0, float)
+    SLOW_QUERY_MAX_ENTRIES = get_env("SLOW_QUERY_MAX_ENTRIES", 100, int)
+
 
 # Configuration class for using a SQL database (e.g. PostgreSQL)
 class SQLConfig(SimpleConfig):
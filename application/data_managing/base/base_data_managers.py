@@ -147,6 +147,14 @@ class BaseDataManager:
     def get_file_pointer(self, file_name: str, dir_names: list[str], binary=True) -> t.TextIO | t.BinaryIO | None:
         pass
 
+    def get_file_writer(self, file_name: str, dir_names: list[str], append=True, binary=False,
+                        buffer_size: int = -1) -> t.TextIO | t.BinaryIO | None:
+        """
+        Opens a (buffered) file for writing, that must be closed by the caller.
+        :param buffer_size: Size of the write buffer in bytes (-1 for the default one).
+        """
+        pass
+
     def read_from_files(self, files: t.Iterable[TFRead],
                         base_dir: list[str] = None, binary=True) -> t.Iterable[TFContent]:
         return FilesContentReader(self, files, base_dir, binary)
@@ -169,6 +177,17 @@ class BaseDataManager:
     def save_model(self, model: Module, dir_names: list[str], model_name='model.pt') -> TBoolExc:
         pass
 
+    @abstractmethod
+    def save_script_model(self, model, dir_names: list[str], model_name='model.pt') -> TBoolExc:
+        """
+        Saves a TorchScript module (that cannot be pickled with `torch.save`).
+        """
+        pass
+
+    @abstractmethod
+    def file_exists(self, file_name: str, dir_names: list[str]) -> bool:
+        pass
+
     @abstractmethod
     def add_archive(self, stream, base_path_list: list[str], tmp_archive_name='tmp_file',
                     archive_type='zip') -> tuple[int, list[str]]:
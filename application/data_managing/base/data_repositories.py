@@ -167,6 +167,14 @@ class BaseDataRepository(JSONSerializable, URIBasedResource):
     def get_all_files(self, root_path: str) -> list[str]:
         pass
 
+    @abstractmethod
+    def get_files_page(self, root_path: str, start: int, limit: int) -> tuple[list[str], bool]:
+        """
+        Paginated version of get_all_files(), that retrieves only the requested files.
+        :return: A couple (files, has_more), where has_more is True if there are other files after them.
+        """
+        pass
+
     @abstractmethod
     def delete_file(self, file_name: str, parents: list[str], locked=False, parents_locked=False, save=False) -> TBoolExc:
         pass
@@ -1,17 +1,65 @@
 from __future__ import annotations
 
+import io
+import copy
+import time
 import schema as sch
+import torch
+from torch.ao.quantization import get_default_qconfig, quantize_dynamic
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
 
-from application.utils import TDesc, TBoolStr, abstractmethod, auto_tboolstr
+from application.utils import TDesc, TBoolStr, TBoolAny, TBoolExc, Module, t, abstractmethod, auto_tboolstr, auto_tboolexc
+from application.validation import compiled_schema, invalidate_compiled_schemas
 from application.resources.contexts import ResourceContext
 
+from .base_data_managers import BaseDataManager
+
 
 class BaseModelDeployer:
     """
     Base class for deploying models.
+
+    All deployers accept an optional "optimize" section:
+    {
+        "optimize": {
+            "input_shape": [<batch_size>, <dim1>, ...],    # example input shape for tracing (optional for "script")
+            "method": "trace"/"script"                      # default "trace"
+        }
+    }
+    that produces a frozen TorchScript artifact stored next to the original model,
+    which is then preferred for predictions. Optimized artifacts are CPU-specific,
+    hence they are always loaded and run on CPU.
+
+    All deployers accept also an optional "quantize" section:
+    {
+        "quantize": {
+            "mode": "dynamic"/"static",
+            "input_shape": [<batch_size>, <dim1>, ...],    # example input shape for calibration and latency
+            "calibration": {                                # required for "static" mode
+                "repository": <data_repository_name>,
+                "path": <folder_path_in_repository>,
+                "transform": <transform_config>,            # default ToTensor
+                "greyscale": true/false,                    # default false
+                "max_samples": <int>                        # default 512
+            }
+        }
+    }
+    that produces an int8-quantized model stored as a separate artifact. Size and latency
+    of the original and of the produced artifacts are reported in the deployment.
+    If both sections are given, the TorchScript artifact is produced from the quantized model.
     """
     __CONFIGS__: TDesc = {}
 
+    __OPTIMIZE_METHODS__ = {'trace', 'script'}
+    __QUANTIZE_MODES__ = {'dynamic', 'static'}
+
+    _OPTIMIZED_MODEL_EXTENSION = '.ts.pt'
+    _QUANTIZED_MODEL_EXTENSION = '.q.pt'
+
+    _QUANTIZED_ENGINE = 'fbgemm'
+    _LATENCY_WARMUP_RUNS = 2
+    _LATENCY_RUNS = 10
+
     @staticmethod
     def register_model_deployer(name: str = None):
         def registerer(cls):
@@ -19,6 +67,7 @@ class BaseModelDeployer:
             if name is None:
                 name = cls.__name__
             BaseModelDeployer.__CONFIGS__[name] = cls
+            invalidate_compiled_schemas(cls)
             return cls
 
         return registerer
@@ -47,21 +96,194 @@ class BaseModelDeployer:
         return {
             'name': str,
             sch.Optional('description'): str,
+            sch.Optional('optimize'): sch.And(
+                {
+                    sch.Optional('input_shape'): [int],
+                    sch.Optional('method'): sch.And(str, lambda x: x in BaseModelDeployer.__OPTIMIZE_METHODS__),
+                },
+                lambda x: x.get('method', 'trace') == 'script' or 'input_shape' in x,
+                error="Tracing a model for optimization requires an 'input_shape'.",
+            ),
+            sch.Optional('quantize'): sch.And(
+                {
+                    'mode': sch.And(str, lambda x: x in BaseModelDeployer.__QUANTIZE_MODES__),
+                    'input_shape': [int],
+                    sch.Optional('calibration'): {
+                        'repository': str,
+                        'path': str,
+                        sch.Optional('transform'): {str: object},
+                        sch.Optional('greyscale'): bool,
+                        sch.Optional('max_samples'): int,
+                    },
+                },
+                lambda x: x['mode'] != 'static' or 'calibration' in x,
+                error="Static quantization requires a 'calibration' section.",
+            ),
         }
 
     @classmethod
     @auto_tboolstr()
     def validate_input(cls, data: TDesc, context: ResourceContext) -> TBoolStr:
-        schema = sch.Schema(cls.schema_dict())
-        schema.validate(data)
+        compiled_schema(cls).validate(data)
+        return True, None
+
+    @staticmethod
+    def optimized_model_name(name: str) -> str:
+        return name + BaseModelDeployer._OPTIMIZED_MODEL_EXTENSION
+
+    @staticmethod
+    def cpu_eval_copy(model: Module) -> Module:
+        """
+        Copy of the given model on CPU and in evaluation mode (the given model is left untouched).
+        """
+        model = copy.deepcopy(model).to('cpu')
+        model.eval()
+        return model
+
+    @staticmethod
+    def optimize_model(model: Module, optimize_data: TDesc) -> torch.jit.ScriptModule:
+        """
+        Converts a CPU copy of the given model to TorchScript (by tracing or scripting), freezes it
+        and applies inference optimizations (e.g. folding BatchNorm into convolutions).
+        :param model: Model to optimize (left untouched).
+        :param optimize_data: "optimize" section of the deployer config.
+        :return: Optimized TorchScript module.
+        """
+        model = BaseModelDeployer.cpu_eval_copy(model)
+        method = optimize_data.get('method', 'trace')
+        with torch.no_grad():
+            if method == 'script':
+                script_model = torch.jit.script(model)
+            else:
+                example_input = torch.rand(*optimize_data['input_shape'])
+                script_model = torch.jit.trace(model, example_input)
+        return torch.jit.optimize_for_inference(torch.jit.freeze(script_model))
+
+    @staticmethod
+    def quantized_model_name(name: str) -> str:
+        return name + BaseModelDeployer._QUANTIZED_MODEL_EXTENSION
+
+    # noinspection PyUnusedLocal
+    @classmethod
+    def calibration_data(cls, quantize_data: TDesc, context: ResourceContext) -> t.Iterable[torch.Tensor] | None:
+        """
+        Batches of inputs used for calibrating static quantization.
+        Subclasses should redefine this method for retrieving data from the actual storage.
+        """
+        return None
+
+    @classmethod
+    def quantize_model(cls, model: Module, quantize_data: TDesc,
+                       calibration_data: t.Iterable[torch.Tensor] = None) -> Module:
+        """
+        Applies post-training int8 quantization to a CPU copy of the given model.
+        Dynamic quantization affects only linear and recurrent layers, while static
+        quantization (FX graph mode) needs calibration data and a symbolically traceable model.
+        :param model: Model to quantize (left untouched).
+        :param quantize_data: "quantize" section of the deployer config.
+        :param calibration_data: Input batches for static quantization.
+        :return: Quantized model.
+        """
+        model = cls.cpu_eval_copy(model)
+        torch.backends.quantized.engine = cls._QUANTIZED_ENGINE
+        if quantize_data['mode'] == 'dynamic':
+            return quantize_dynamic(
+                model, {torch.nn.Linear, torch.nn.LSTM, torch.nn.GRU, torch.nn.RNNCell}, dtype=torch.qint8,
+            )
+        if calibration_data is None:
+            raise ValueError("Missing calibration data for static quantization.")
+        example_inputs = (torch.rand(*quantize_data['input_shape']),)
+        prepared = prepare_fx(model, {'': get_default_qconfig(cls._QUANTIZED_ENGINE)}, example_inputs=example_inputs)
+        with torch.no_grad():
+            for batch in calibration_data:
+                prepared(batch)
+        return convert_fx(prepared)
+
+    @classmethod
+    def model_report(cls, model: Module, input_shape: list[int] = None) -> TDesc:
+        """
+        Measures serialized size and average CPU latency of a model on a random batch
+        (latency is not measured if no input shape is given).
+        """
+        buffer = io.BytesIO()
+        if isinstance(model, torch.jit.ScriptModule):
+            torch.jit.save(model, buffer)
+        else:
+            torch.save(model, buffer)
+        if input_shape is None:
+            return {'size_bytes': buffer.getbuffer().nbytes}
+        example_input = torch.rand(*input_shape)
+        with torch.no_grad():
+            for _ in range(cls._LATENCY_WARMUP_RUNS):
+                model(example_input)
+            elapsed = time.perf_counter()
+            for _ in range(cls._LATENCY_RUNS):
+                model(example_input)
+            elapsed = time.perf_counter() - elapsed
+        return {
+            'size_bytes': buffer.getbuffer().nbytes,
+            'latency_ms': 1000 * elapsed / cls._LATENCY_RUNS,
+        }
+
+    @classmethod
+    @auto_tboolexc
+    def store_model(cls, model: Module, data: TDesc, path_dirs: list[str], name: str,
+                    context: ResourceContext = None, report: TDesc = None) -> TBoolExc:
+        """
+        Saves the deployed model and, if requested, its quantized and optimized TorchScript versions.
+        Previous quantized/optimized versions are removed if not requested anymore, so that
+        they cannot shadow the new model.
+        :param report: If given, it is filled with size and latency of the original model and
+        of each saved artifact (left empty if no quantization/optimization has been requested).
+        """
+        manager = BaseDataManager.get()
+        optimize_data = data.get('optimize')
+        quantize_data = data.get('quantize')
+        artifacts: dict[str, Module] = {}
+
+        if quantize_data is not None:
+            calibration_data = cls.calibration_data(quantize_data, context) if quantize_data['mode'] == 'static' \
+                else None
+            artifacts['quantized'] = cls.quantize_model(model, quantize_data, calibration_data)
+        if optimize_data is not None:
+            artifacts['optimized'] = cls.optimize_model(artifacts.get('quantized', model), optimize_data)
+
+        result, exc = manager.save_model(model, path_dirs, name + '.pt')
+        if not result:
+            return result, exc
+        for artifact_type, artifact_name in [
+            ('quantized', cls.quantized_model_name(name)),
+            ('optimized', cls.optimized_model_name(name)),
+        ]:
+            artifact = artifacts.get(artifact_type)
+            if artifact is None:
+                if manager.file_exists(artifact_name, path_dirs):
+                    manager.delete_file(artifact_name, path_dirs)
+            else:
+                save = manager.save_script_model if artifact_type == 'optimized' else manager.save_model
+                result, exc = save(artifact, path_dirs, artifact_name)
+                if not result:
+                    return result, exc
+
+        if report is not None and len(artifacts) > 0:
+            input_shape = (quantize_data or optimize_data).get('input_shape')
+            # latencies are all measured on CPU, in evaluation mode
+            report['original'] = cls.model_report(cls.cpu_eval_copy(model), input_shape)
+            for artifact_type, artifact in artifacts.items():
+                report[artifact_type] = cls.model_report(artifact, input_shape)
         return True, None
 
     @classmethod
     @abstractmethod
-    def deploy_model(cls, data: TDesc, context: ResourceContext, name: str, path: str) -> TBoolStr:
+    def deploy_model(cls, data: TDesc, context: ResourceContext, name: str, path: str,
+                     report: TDesc = None) -> TBoolAny:
+        """
+        :param report: If given, it is filled with the deployment report (see store_model).
+        :return: A couple (True, None) on success, (False, error) otherwise.
+        """
         pass
 
 
 __all__ = [
     'BaseModelDeployer',
-]
\ No newline at end of file
+]
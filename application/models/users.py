@@ -1,5 +1,12 @@
 from __future__ import annotations
-from datetime import datetime
+import hmac
+import json
+import base64
+import hashlib
+from threading import RLock
+from datetime import datetime, timezone
+from cachetools import TTLCache
+from flask import current_app
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash
 
@@ -8,20 +15,114 @@ from application.resources.utils import *
 from application.resources.contexts import *
 
 
+# Token state (username, generation) cache, to avoid a database lookup on each authenticated request
+_TOKEN_STATE_CACHE_TTL = 30     # seconds, maximum delay for revocations made by other processes
+_TOKEN_STATES: TTLCache = TTLCache(maxsize=4096, ttl=_TOKEN_STATE_CACHE_TTL)
+_TOKEN_STATES_LOCK = RLock()
+
+
+def _token_secret() -> bytes:
+    secret = current_app.config['SECRET_KEY']
+    return secret if isinstance(secret, bytes) else secret.encode('utf-8')
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def sign_token(claims: TDesc) -> str:
+    """
+    Builds a self-describing authentication token, as "<payload>.<signature>",
+    where payload is the (base64) JSON of the given claims and signature is
+    its HMAC-SHA256 with the application SECRET_KEY.
+    """
+    payload = _b64encode(json.dumps(claims, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+    signature = hmac.new(_token_secret(), payload.encode('ascii'), hashlib.sha256).digest()
+    return f"{payload}.{_b64encode(signature)}"
+
+
+def verify_signed_token(token: str) -> TDesc | None:
+    """
+    Checks signature and expiration of a token built by sign_token.
+    :return: Token claims if valid, None otherwise.
+    """
+    try:
+        payload, signature = token.split('.')
+        expected = hmac.new(_token_secret(), payload.encode('ascii'), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    if claims.get('exp', 0) <= datetime.now(timezone.utc).timestamp():
+        return None
+    return claims
+
+
+def get_token_state(user_id: str) -> tuple[str, int] | None:
+    """
+    :return: (username, token generation) of the given user, cached for a short time.
+    """
+    with _TOKEN_STATES_LOCK:
+        state = _TOKEN_STATES.get(user_id)
+    if state is None:
+        state = User.get_token_state(user_id)
+        if state is not None:
+            with _TOKEN_STATES_LOCK:
+                _TOKEN_STATES[user_id] = state
+    return state
+
+
+def invalidate_token_state(user_id: str):
+    with _TOKEN_STATES_LOCK:
+        _TOKEN_STATES.pop(user_id, None)
+
+
 def check_token(token):
     """
-    Checks if given authentication token is associated to any user.
+    Checks if given authentication token is valid, i.e. correctly signed, not expired and
+    of the current generation for its user (revocation and password change increase it).
     :param token: Authentication token.
-    :return: Corresponding user if present, None otherwise.
+    :return: An AuthenticatedUser for the corresponding user if valid, None otherwise.
     """
-    user = User.get_by_token(token)
-    now = datetime.utcnow()
-    if (user is not None) and (user.get_token_expiration() > now):
-        return user
+    claims = verify_signed_token(token)
+    if claims is None:
+        return None
+    state = get_token_state(claims.get('uid'))
+    if (state is not None) and (state[1] == claims.get('gen')):
+        return AuthenticatedUser(claims['uid'], state[0])
     else:
         return None
 
 
+class AuthenticatedUser:
+    """
+    User identity from a verified token. The username is available without queries,
+    while the user document must be explicitly loaded by get_user() (once per request)
+    when other attributes or methods are needed.
+    """
+
+    def __init__(self, user_id: str, username: str):
+        self.user_id = user_id
+        self.username = username
+        self._user: User | None = None
+
+    def get_user(self) -> User:
+        if self._user is None:
+            user = User.get_by_name(self.username)
+            if user is None:
+                raise ValueError(f"User '{self.username}' does not exist anymore.")
+            self._user = user
+        return self._user
+
+    def __repr__(self):
+        return f"AuthenticatedUser <{self.username}>"
+
+
 class User(UserMixin, URIBasedResource):
 
     # 0.0. Actual class
@@ -58,6 +159,8 @@ class User(UserMixin, URIBasedResource):
     def canonicalize(cls, obj: str | User) -> User:
         if isinstance(obj, str):
             return cls.get_by_name(obj)
+        elif type(obj) is AuthenticatedUser:
+            return obj.get_user()
         elif isinstance(obj, User):
             return obj
         else:
@@ -72,6 +175,15 @@ class User(UserMixin, URIBasedResource):
     def all(cls):
         return User.user_class().all()
 
+    @classmethod
+    @abstractmethod
+    def get_page(cls, limit: int, token: str = None) -> t.Iterable[User]:
+        """
+        Retrieves a page of users, with an attribute `next_token` that holds the continuation
+        token for the next page after the iteration has been completed.
+        """
+        return User.user_class().get_page(limit, token)
+
     @classmethod
     @abstractmethod
     def get_by_name(cls, name: str) -> User | None:
@@ -87,6 +199,14 @@ class User(UserMixin, URIBasedResource):
     def get_by_token(cls, token: str) -> User | None:
         return User.user_class().get_by_token(token)
 
+    @classmethod
+    @abstractmethod
+    def get_token_state(cls, user_id: str) -> tuple[str, int] | None:
+        """
+        :return: (username, token generation) for the user with given id, None if not existing.
+        """
+        return User.user_class().get_token_state(user_id)
+
     # 4. Create + callbacks
     @classmethod
     @abstractmethod
@@ -201,6 +321,11 @@ class User(UserMixin, URIBasedResource):
 
 
 __all__ = [
+    'sign_token',
+    'verify_signed_token',
+    'get_token_state',
+    'invalidate_token_state',
     'check_token',
+    'AuthenticatedUser',
     'User',
 ]
\ No newline at end of file
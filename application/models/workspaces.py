@@ -105,6 +105,14 @@ class Workspace(JSONSerializable, URIBasedResource):
     def all(cls):
         return Workspace.get_class().all()
 
+    @classmethod
+    @abstractmethod
+    def get_page(cls, owner: str | User, limit: int, token: str = None) -> t.Iterable[Workspace]:
+        """
+        Retrieves a page of the workspaces of the given user (see User.get_page).
+        """
+        return Workspace.get_class().get_page(owner, limit, token)
+
     # 4. Create + callbacks
     @classmethod
     @abstractmethod
@@ -1,8 +1,11 @@
 from .utils import *
 from .locking import *
+from .indexes import *
 from .base import *
 from .mongo_base_metadata import *
+from .metrics_store import *
 from .loggers import *
+from .plugins import *
 
 from .models import *
 from .data_managing import *
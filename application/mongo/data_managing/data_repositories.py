@@ -14,6 +14,7 @@ from application.resources.base import DataType, ReferrableDataType
 from application.mongo.locking import RWLockableDocument
 from application.mongo.mongo_base_metadata import MongoBaseMetadata
 from application.mongo.base import MongoBaseUser, MongoBaseWorkspace
+from application.mongo.utils import prefetch_references
 
 from .base import *
 
@@ -57,12 +58,16 @@ class MongoDataRepository(MongoBaseDataRepository):
 
     # 3. General classmethods
     @classmethod
-    def get(cls, workspace: MongoBaseWorkspace = None, name: str = None, **kwargs) -> list[BaseDataRepository]:
+    def get(cls, workspace: MongoBaseWorkspace = None, name: str = None,
+            exclude: t.Iterable[str] = None, **kwargs) -> list[BaseDataRepository]:
         if workspace is not None:
             kwargs['workspace'] = workspace
         if name is not None:
             kwargs['name'] = name
-        return list(cls.objects(**kwargs).all())
+        queryset = cls.objects(**kwargs)
+        if exclude is not None:
+            queryset = queryset.exclude(*exclude)
+        return list(queryset.all())
 
     # 4. Create + callbacks
     @classmethod
@@ -175,6 +180,12 @@ class MongoDataRepository(MongoBaseDataRepository):
         result['metadata']['claas_urn'] = self.claas_urn
         BenchmarkClass = t.cast(ReferrableDataType, DataType.get_type('Benchmark')).config_type()
         benchmarks = list(BenchmarkClass.get(build_config__data_repository=self))
+        # Owner, workspace and repository are (almost always) shared by all benchmarks
+        owner, workspace = self.get_owner(), self.get_workspace()
+        prefetch_references(benchmarks, known=[owner, workspace], owner=type(owner), workspace=type(workspace))
+        prefetch_references(
+            [benchmark.build_config for benchmark in benchmarks], known=[self], data_repository=type(self),
+        )
         result['benchmarks'] = [benchmark.to_dict(links=False) for benchmark in benchmarks]
         if links:
             result['links'] = {
@@ -330,6 +341,24 @@ class MongoDataRepository(MongoBaseDataRepository):
                     result.append(self.denormalize(file))
         return result
 
+    def get_files_page(self, root_path: str, start: int, limit: int,
+                       locked=False, parents_locked=False) -> tuple[list[str], bool]:
+        root_path = self.normalize(root_path)
+        with self.resource_read(locked, parents_locked):
+            # files are filtered and sliced by the server, so that only the page is transferred
+            page = {
+                '$slice': [
+                    {'$filter': {'input': '$files', 'cond': {'$eq': [{'$indexOfBytes': ['$$this', root_path]}, 0]}}},
+                    start, limit + 1,
+                ],
+            }
+            result = list(self._get_collection().aggregate([
+                {'$match': {'_id': self.pk}},
+                {'$project': {'_id': 0, 'files': page}},
+            ]))
+        files = result[0]['files'] if len(result) > 0 else []
+        return [self.denormalize(file) for file in files[:limit]], len(files) > limit
+
     @auto_tboolexc
     def delete_file(self, file_name: str, parents: list[str], locked=False, parents_locked=False, save=False) -> TBoolExc:
         with self.resource_write(locked, parents_locked):
@@ -4,9 +4,9 @@ import schema as sch
 import torch
 from torchvision.models import *
 
-from application.utils import TDesc, TBoolStr, t
+from application.utils import TDesc, TBoolStr, TBoolAny, t
 from application.models import User, Workspace
-from application.data_managing import BaseModelDeployer, BaseDataManager
+from application.data_managing import BaseDataManager, BaseDataRepository, BaseModelDeployer
 
 from application.resources.base import DataType, ReferrableDataType
 from application.resources.contexts import UserWorkspaceResourceContext
@@ -14,8 +14,54 @@ from application.resources.contexts import UserWorkspaceResourceContext
 from application.mongo.base import MongoBaseUser, MongoBaseWorkspace
 
 
+class MongoBaseModelDeployer(BaseModelDeployer):
+    """
+    Common base class for deployers that retrieve calibration data from MongoDB data repositories.
+    """
+    _DFL_CALIBRATION_MAX_SAMPLES = 512
+
+    @classmethod
+    def calibration_data(cls, quantize_data: TDesc, context: UserWorkspaceResourceContext) \
+            -> t.Iterable[torch.Tensor] | None:
+        # avoid circular import with benchmarks (which depend on data repositories)
+        from application.mongo.resources.benchmarks import TransformConfig
+        from torchvision.transforms import ToTensor
+
+        calibration = quantize_data['calibration']
+        workspace = t.cast(MongoBaseWorkspace, Workspace.canonicalize(context))
+        repositories = BaseDataRepository.get(workspace=workspace, name=calibration['repository'])
+        if len(repositories) != 1:
+            raise ValueError(f"Unknown data repository '{calibration['repository']}'.")
+        repository = repositories[0]
+
+        transform_data = calibration.get('transform')
+        if transform_data is not None:
+            transform_config = TransformConfig.get_by_name(transform_data)
+            if transform_config is None:
+                raise ValueError(f"Unknown transform config: '{transform_data.get('name')}'.")
+            transform = transform_config.create(transform_data, context).get_transform()
+        else:
+            transform = ToTensor()
+
+        manager = BaseDataManager.get()
+        loader = manager.greyscale_image_loader if calibration.get('greyscale', False) \
+            else manager.default_image_loader
+        max_samples = calibration.get('max_samples', cls._DFL_CALIBRATION_MAX_SAMPLES)
+        files = repository.get_all_files(calibration['path'])[:max_samples]
+        if len(files) == 0:
+            raise ValueError(f"No calibration files found in '{calibration['path']}'.")
+        base_path = repository.get_absolute_path()
+        batch_size = quantize_data['input_shape'][0]
+
+        def batches():
+            for i in range(0, len(files), batch_size):
+                yield torch.stack([transform(loader(base_path + '/' + file)) for file in files[i:i+batch_size]])
+
+        return batches()
+
+
 @BaseModelDeployer.register_model_deployer('ExperimentExport')
-class ExperimentExportModelDeployer(BaseModelDeployer):
+class ExperimentExportModelDeployer(MongoBaseModelDeployer):
 
     @classmethod
     def schema_dict(cls) -> dict:
@@ -31,7 +77,8 @@ class ExperimentExportModelDeployer(BaseModelDeployer):
         return super(ExperimentExportModelDeployer, cls).validate_input(data, context)
 
     @classmethod
-    def deploy_model(cls, data: TDesc, context: UserWorkspaceResourceContext, name: str, path: str) -> TBoolStr:
+    def deploy_model(cls, data: TDesc, context: UserWorkspaceResourceContext, name: str, path: str,
+                     report: TDesc = None) -> TBoolAny:
         experiment_name = data.get('experiment')
         execution_id = data.get('execution')
         owner = t.cast(MongoBaseUser, User.canonicalize(context.get_username()))
@@ -48,21 +95,22 @@ class ExperimentExportModelDeployer(BaseModelDeployer):
         if execution.completed:
             model_fd = execution.get_final_model(descriptor=True)
             model = torch.load(model_fd)
-            manager = BaseDataManager.get()
-            result, exc = manager.save_model(model, path_dirs, name + '.pt')
+            result, exc = cls.store_model(model, data, path_dirs, name, context, report)
             return result, exc
         else:
             return False, "Experiment execution not completed"
 
 
 @BaseModelDeployer.register_model_deployer('TorchvisionExport')
-class TorchvisionExportModelDeployer(BaseModelDeployer):
+class TorchvisionExportModelDeployer(MongoBaseModelDeployer):
     """
     Deployer syntax:
     {
         "name": "TorchvisionExport",
         "net_type": <net_name>,
-        "pretrained": true/false
+        "pretrained": true/false,
+        "optimize": {...},  # optional, see BaseModelDeployer
+        "quantize": {...}   # optional, see BaseModelDeployer
     }
     """
 
@@ -134,7 +182,8 @@ class TorchvisionExportModelDeployer(BaseModelDeployer):
         return super(TorchvisionExportModelDeployer, cls).validate_input(data, context)
 
     @classmethod
-    def deploy_model(cls, data: TDesc, context: UserWorkspaceResourceContext, name: str, path: str) -> TBoolStr:
+    def deploy_model(cls, data: TDesc, context: UserWorkspaceResourceContext, name: str, path: str,
+                     report: TDesc = None) -> TBoolAny:
         net_type = data.get('net_type')
         pretrained = data.get('pretrained')
         net_func = cls.__NETS__.get(net_type)
@@ -148,12 +197,12 @@ class TorchvisionExportModelDeployer(BaseModelDeployer):
         path_dir = [s for s in path_dir if len(s) > 0]
         path_dirs = base_dir + path_dir
 
-        manager = BaseDataManager.get()
-        result, exc = manager.save_model(model, path_dirs, name + '.pt')
+        result, exc = cls.store_model(model, data, path_dirs, name, context, report)
         return result, exc
 
 
 __all__ = [
+    'MongoBaseModelDeployer',
     'ExperimentExportModelDeployer',
     'TorchvisionExportModelDeployer',
 ]
\ No newline at end of file
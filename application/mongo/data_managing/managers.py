@@ -126,6 +126,12 @@ class MongoLocalDataManager(BaseDataManager):
         mode = 'rb' if binary else 'r'
         return open(fpath, mode)
 
+    def get_file_writer(self, file_name: str, dir_names: list[str], append=True, binary=False,
+                        buffer_size: int = -1) -> t.TextIO | t.BinaryIO | None:
+        fpath = os.path.join(self.get_root(), *dir_names, file_name)
+        mode = ('a' if append else 'w') + ('b' if binary else '')
+        return open(fpath, mode, buffering=buffer_size)
+
     @auto_tboolexc
     def print_to_file(self, file_name: str, dir_names: list[str], *values: t.Any,
                       sep=' ', newline=True, append=True, flush=True) -> TBoolExc:
@@ -167,6 +173,19 @@ class MongoLocalDataManager(BaseDataManager):
         torch.save(model, fpath)
         return True, None
 
+    @auto_tboolexc
+    def save_script_model(self, model, dir_names: list[str], model_name='model.pt') -> TBoolExc:
+        fpath = os.path.join(self.get_root(), *dir_names, model_name)
+        result, exc = self.create_file((model_name, [self.get_root()] + dir_names, None))
+        if not result:
+            exc.args[0] = f"Failed to create file '{model_name}': {exc.args[0]}."
+            return result, exc
+        torch.jit.save(model, fpath)
+        return True, None
+
+    def file_exists(self, file_name: str, dir_names: list[str]) -> bool:
+        return os.path.isfile(self.get_file_path(file_name, dir_names))
+
     def add_archive(self, stream, base_path_list: list[str], tmp_archive_name='tmp_file',
                     archive_type='zip') -> tuple[int, list[str]]:
         total = 0
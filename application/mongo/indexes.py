@@ -0,0 +1,257 @@
+# Index management and slow queries reporting.
+from __future__ import annotations
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from flask import Flask
+from pymongo import ASCENDING, monitoring
+from mongoengine.connection import get_db
+
+from application.utils import t, TDesc
+from application.database import *
+from application.mongo.locking import RWLockableDocument
+
+
+_logger = logging.getLogger(__name__)
+
+# Indexes for query shapes that cannot be declared in meta['indexes'], e.g. on fields of
+# (polymorphic) embedded documents: document class -> [(fields, index options)]
+_QUERY_INDEXES: dict[type, list[tuple[tuple[str, ...], TDesc]]] = {}
+
+# Indexes used by lock leases renewal and reaping, added to all lockable collections
+_LOCK_INDEXES: list[tuple[tuple[str, ...], TDesc]] = [
+    (('rdleases.lease_id',), {'sparse': True}),
+    (('rdleases.expires',), {'sparse': True}),
+    (('wrlease.lease_id',), {'sparse': True}),
+    (('wrlease.expires',), {'sparse': True}),
+    (('wrqueue.expires',), {'sparse': True}),
+]
+
+
+def query_index(*fields: str, **options):
+    """
+    Class decorator that declares an (ascending) index on the given raw field names
+    of the collection of the decorated document class.
+    """
+    def registerer(cls):
+        _QUERY_INDEXES.setdefault(cls, []).append((fields, options))
+        return cls
+    return registerer
+
+
+def _concrete_documents() -> list[type]:
+    documents = []
+    classes = [db.Document]
+    while len(classes) > 0:
+        current = classes.pop()
+        classes.extend(current.__subclasses__())
+        # noinspection PyProtectedMember
+        if current is not db.Document and not current._meta.get('abstract', False):
+            documents.append(current)
+    return documents
+
+
+def _create_index(collection, fields: t.Sequence[str], options: TDesc) -> str:
+    return collection.create_index([(field, ASCENDING) for field in fields], background=True, **options)
+
+
+def ensure_all_indexes() -> dict[str, list[str]]:
+    """
+    Creates (if not existing) all indexes declared in documents meta, by query_index
+    and for lock leases.
+    :return: A dictionary collection_name -> names of the ensured indexes.
+    """
+    result: dict[str, set[str]] = {}
+    for document in _concrete_documents():
+        document.ensure_indexes()
+        # noinspection PyProtectedMember
+        collection = document._get_collection()
+        result.setdefault(collection.name, set()).update(collection.index_information().keys())
+    for document, indexes in _QUERY_INDEXES.items():
+        # noinspection PyProtectedMember
+        collection = document._get_collection()
+        for fields, options in indexes:
+            result.setdefault(collection.name, set()).add(_create_index(collection, fields, options))
+    for collection in RWLockableDocument.lockable_collections():
+        for fields, options in _LOCK_INDEXES:
+            result.setdefault(collection.name, set()).add(_create_index(collection, fields, options))
+    return {name: sorted(indexes) for name, indexes in result.items()}
+
+
+# Slow queries
+def _query_shape(query: t.Any, prefix: str = '') -> tuple[str, ...]:
+    """
+    Field names (with dotted paths for nested filters) used by a query filter, without values.
+    """
+    if not isinstance(query, dict):
+        return ()
+    shape = []
+    for key, value in query.items():
+        if key in ('$and', '$or', '$nor') and isinstance(value, list):
+            for item in value:
+                shape.extend(_query_shape(item, prefix))
+        elif key.startswith('$'):
+            continue
+        elif isinstance(value, dict) and len(value) > 0 and not all(k.startswith('$') for k in value):
+            shape.extend(_query_shape(value, f"{prefix}{key}."))
+        else:
+            shape.append(prefix + key)
+    return tuple(sorted(set(shape)))
+
+
+class SlowQueryMonitor(monitoring.CommandListener):
+    """
+    Records the read commands (find, count, aggregate ...) that took more than
+    SLOW_QUERY_THRESHOLD_MS milliseconds, grouped by collection and query shape.
+    The report checks the query plan of each recorded shape for collection scans.
+    """
+    __COMMANDS__ = {'find', 'count', 'countDocuments', 'aggregate', 'distinct', 'delete', 'update'}
+
+    def __init__(self, app: Flask = None):
+        self.threshold_ms = 100.0
+        self.max_entries = 100
+        self.enabled = False
+        self._started: dict[int, tuple[str, str, TDesc]] = {}
+        self._entries: OrderedDict[tuple[str, str, tuple[str, ...]], TDesc] = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """
+        Must be called before the database client is created, since command listeners
+        are read by pymongo clients on creation.
+        """
+        self.threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS', self.threshold_ms)
+        self.max_entries = app.config.get('SLOW_QUERY_MAX_ENTRIES', self.max_entries)
+        if not self.enabled and self.threshold_ms is not None:
+            monitoring.register(self)
+            self.enabled = True
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in self.__COMMANDS__:
+            command = event.command
+            collection = command.get(event.command_name)
+            if event.command_name == 'delete':
+                query = (command.get('deletes') or [{}])[0].get('q', {})
+            elif event.command_name == 'update':
+                query = (command.get('updates') or [{}])[0].get('q', {})
+            elif event.command_name == 'aggregate':
+                stages = command.get('pipeline') or [{}]
+                query = stages[0].get('$match', {})
+            else:
+                query = command.get('filter', command.get('query', {}))
+            with self._lock:
+                self._started[event.request_id] = (event.command_name, collection, query)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        with self._lock:
+            started = self._started.pop(event.request_id, None)
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < self.threshold_ms:
+            return
+        command_name, collection, query = started
+        key = (collection, command_name, _query_shape(query))
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                _logger.warning(
+                    f"Slow {command_name} on '{collection}' by {list(key[2])}: {duration_ms:.1f}ms"
+                )
+                entry = {
+                    'database': event.database_name, 'collection': collection, 'command': command_name,
+                    'shape': list(key[2]), 'count': 0, 'max_ms': 0.0, 'total_ms': 0.0,
+                }
+            entry['count'] += 1
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['total_ms'] += duration_ms
+            entry['last_seen'] = time.time()
+            entry['sample'] = query
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        with self._lock:
+            self._started.pop(event.request_id, None)
+
+    @staticmethod
+    def _uses_collscan(plan: t.Any) -> bool:
+        if isinstance(plan, dict):
+            if plan.get('stage') == 'COLLSCAN':
+                return True
+            return any(SlowQueryMonitor._uses_collscan(value) for value in plan.values())
+        elif isinstance(plan, list):
+            return any(SlowQueryMonitor._uses_collscan(value) for value in plan)
+        return False
+
+    def report(self, explain: bool = True) -> list[TDesc]:
+        """
+        :param explain: If True, each recorded query shape is explained (on its last sample)
+        and flagged with 'collscan' = True if its winning plan scans the whole collection.
+        :return: Recorded slow queries, slowest first.
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        database = get_db() if explain and len(entries) > 0 else None
+        for entry in entries:
+            sample = entry.pop('sample')
+            entry['avg_ms'] = entry['total_ms'] / entry['count']
+            if database is not None and database.name == entry['database']:
+                # noinspection PyBroadException
+                try:
+                    plan = database[entry['collection']].find(sample).explain().get('queryPlanner', {})
+                    entry['collscan'] = self._uses_collscan(plan.get('winningPlan'))
+                except Exception:
+                    entry['collscan'] = None
+        entries.sort(key=lambda e: e['max_ms'], reverse=True)
+        return entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_monitor = SlowQueryMonitor()
+
+
+def profiler_report(threshold_ms: float, enable: bool = False, limit: int = 1000) -> list[TDesc]:
+    """
+    Reports the slow operations recorded by the MongoDB profiler (also by other processes),
+    grouped by namespace, operation, query shape and plan and flagged with 'collscan' = True
+    when executed with a collection scan.
+    :param threshold_ms: Minimum duration of the reported operations.
+    :param enable: If True, enables the profiler for operations slower than threshold_ms.
+    :param limit: Maximum number of (most recent) profiled operations to examine.
+    """
+    database = get_db()
+    if enable:
+        database.command('profile', 1, slowms=int(threshold_ms))
+    groups: dict[tuple, TDesc] = {}
+    profiled = database['system.profile'].find(
+        {'millis': {'$gte': threshold_ms}, 'ns': {'$not': {'$regex': r'\.system\.'}}},
+    ).sort('ts', -1).limit(limit)
+    for item in profiled:
+        command = item.get('command', {})
+        shape = _query_shape(command.get('filter', command.get('q', item.get('query', {}))))
+        plan = item.get('planSummary', '')
+        key = (item.get('ns'), item.get('op'), shape, plan)
+        entry = groups.setdefault(key, {
+            'namespace': key[0], 'op': key[1], 'shape': list(shape), 'plan': plan,
+            'collscan': 'COLLSCAN' in plan, 'count': 0, 'max_ms': 0, 'docs_examined': 0,
+        })
+        entry['count'] += 1
+        entry['max_ms'] = max(entry['max_ms'], item.get('millis', 0))
+        entry['docs_examined'] = max(entry['docs_examined'], item.get('docsExamined', 0))
+    return sorted(groups.values(), key=lambda e: (not e['collscan'], -e['max_ms']))
+
+
+__all__ = [
+    'query_index',
+    'ensure_all_indexes',
+    'SlowQueryMonitor',
+    'slow_query_monitor',
+    'profiler_report',
+]
@@ -1,7 +1,316 @@
 from __future__ import annotations
 
-from application.utils import abstractmethod
+import os
+import socket
+import time
+import random
+import threading
+from uuid import uuid4
+from datetime import datetime, timedelta
+from flask import Flask, g, has_app_context
+from pymongo.errors import OperationFailure
+from mongoengine.connection import get_db
+
+from application.utils import t, TDesc, abstractmethod
 from application.database import *
+from application.mongo.utils import clear_identity_map
+
+
+TLockKey = tuple[str, str]     # (collection name, document id)
+
+
+class LockLease(db.EmbeddedDocument):
+    """
+    A lock record: each acquired read/write lock is held by an owner (process)
+    until it is released or its lease expires without being renewed.
+    """
+    lease_id = db.StringField(required=True)
+    owner = db.StringField(required=True)
+    expires = db.DateTimeField(required=True)
+
+
+class LockTicket(db.EmbeddedDocument):
+    """
+    A writer waiting for a lock: writers acquire locks in FIFO order of their tickets,
+    and new readers are not admitted while there are (non-expired) waiting writers
+    that have been waiting for less than LOCK_WRITER_PRIORITY seconds (blocks_until).
+    """
+    ticket_id = db.StringField(required=True)
+    expires = db.DateTimeField(required=True)
+    blocks_until = db.DateTimeField()
+
+
+class LockWaitStats:
+    """
+    In-process statistics about time spent waiting for locks, by lock type.
+    Statistics are published by the heartbeat thread (see LeaseManager.publish_stats)
+    and reported by 'flask lock-stats'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, TDesc] = {}
+        self.version = 0    # incremented at each record, for publishing only changed statistics
+
+    def record(self, lock_type: str, wait_time: float, acquired: bool):
+        with self._lock:
+            stats = self._stats.setdefault(lock_type, {
+                'acquired': 0, 'timeouts': 0, 'contended': 0, 'total_wait': 0.0, 'max_wait': 0.0,
+            })
+            stats['acquired' if acquired else 'timeouts'] += 1
+            self.version += 1
+            if wait_time > 0:
+                stats['contended'] += 1
+                stats['total_wait'] += wait_time
+                stats['max_wait'] = max(stats['max_wait'], wait_time)
+        if has_app_context():
+            g.lock_wait_time = g.get('lock_wait_time', 0.0) + wait_time
+
+    def to_dict(self) -> TDesc:
+        with self._lock:
+            return {lock_type: dict(stats) for lock_type, stats in self._stats.items()}
+
+
+class LeaseManager:
+    """
+    Keeps track of the lock leases held by the current process. A background thread
+    periodically renews them (heartbeat) and releases the expired leases of any
+    owner (reaper), so that locks held by crashed processes are recovered after
+    at most LOCK_LEASE_TTL seconds.
+    """
+
+    _DFL_LEASE_TTL = 30             # seconds
+    _DFL_HEARTBEAT_INTERVAL = 10    # seconds
+    _DFL_WAIT_TIMEOUT = 5.0         # seconds, 0 for failing immediately
+    _DFL_WRITER_PRIORITY = 5.0      # seconds
+
+    STATS_COLLECTION = 'lock_wait_stats'
+
+    _BACKOFF_BASE = 0.01            # seconds
+    _BACKOFF_MAX = 0.5              # seconds
+
+    def __init__(self, app: Flask = None):
+        self.lease_ttl = self._DFL_LEASE_TTL
+        self.heartbeat_interval = self._DFL_HEARTBEAT_INTERVAL
+        self.wait_timeout = self._DFL_WAIT_TIMEOUT
+        self.writer_priority = self._DFL_WRITER_PRIORITY
+        self.wait_stats = LockWaitStats()
+        self._published_version = 0
+        self.owner = self.default_owner()
+        self._held: dict[str, tuple[list, int]] = {}   # lease id -> (collections, lock type)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        if app is None:
+            raise ValueError("'app' must be not None")
+        self.lease_ttl = app.config.get('LOCK_LEASE_TTL', self._DFL_LEASE_TTL)
+        self.heartbeat_interval = app.config.get('LOCK_HEARTBEAT_INTERVAL', self._DFL_HEARTBEAT_INTERVAL)
+        if self.heartbeat_interval >= self.lease_ttl:
+            raise ValueError("Lock heartbeat interval must be less than lease TTL.")
+        self.wait_timeout = app.config.get('LOCK_WAIT_TIMEOUT', self._DFL_WAIT_TIMEOUT)
+        self.writer_priority = app.config.get('LOCK_WRITER_PRIORITY', self._DFL_WRITER_PRIORITY)
+
+        @app.after_request
+        def lock_wait_header(response):
+            wait_time = g.get('lock_wait_time', 0.0)
+            if wait_time > 0:
+                response.headers.add('Server-Timing', f"lockwait;dur={1000 * wait_time:.1f}")
+            return response
+
+    @staticmethod
+    def default_owner() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def acquire(self, attempt: t.Callable[[], bool], lock_type: str, timeout: float = None):
+        """
+        Repeatedly tries to acquire a lock with jittered exponential backoff.
+        :param attempt: Callable that tries once to acquire the lock and returns True on success.
+        :param lock_type: 'read' or 'write', for wait statistics.
+        :param timeout: Maximum wait time in seconds (defaults to LOCK_WAIT_TIMEOUT).
+        :raises LockingError: If the lock cannot be acquired before timeout.
+        """
+        timeout = self.wait_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        retries = 0
+        while not attempt():
+            elapsed = time.perf_counter() - start
+            if elapsed >= timeout:
+                self.wait_stats.record(lock_type, elapsed, acquired=False)
+                raise LockingError.default()
+            delay = min(self._BACKOFF_MAX, self._BACKOFF_BASE * 2 ** retries) * random.uniform(0.5, 1.0)
+            time.sleep(min(delay, timeout - elapsed))
+            retries += 1
+        self.wait_stats.record(lock_type, time.perf_counter() - start if retries > 0 else 0.0, acquired=True)
+
+    def new_ticket(self) -> TDesc:
+        now = datetime.utcnow()
+        return {
+            'ticket_id': uuid4().hex,
+            'expires': now + timedelta(seconds=self.lease_ttl),
+            'blocks_until': now + timedelta(seconds=self.writer_priority),
+        }
+
+    def new_lease(self) -> TDesc:
+        return {
+            'lease_id': uuid4().hex,
+            'owner': self.owner,
+            'expires': datetime.utcnow() + timedelta(seconds=self.lease_ttl),
+        }
+
+    def register(self, lease_id: str, collections: list, lock_type: int):
+        with self._lock:
+            self._held[lease_id] = (collections, lock_type)
+        self.__ensure_started()
+
+    def start(self):
+        """
+        Starts the heartbeat/reaper thread of the current process (if not already running),
+        so that expired locks are reaped even before this process acquires any lock.
+        """
+        self.__ensure_started()
+
+    def unregister(self, lease_id: str):
+        with self._lock:
+            self._held.pop(lease_id, None)
+
+    def __ensure_started(self):
+        pid = os.getpid()
+        if self._thread is None or self._pid != pid:    # thread is not inherited by forked processes
+            with self._lock:
+                if self._thread is None or self._pid != pid:
+                    self.owner = self.default_owner()
+                    self._pid = pid
+                    self._thread = threading.Thread(target=self.__run, name='lock-lease-heartbeat', daemon=True)
+                    self._thread.start()
+
+    def __run(self):
+        # noinspection PyBroadException
+        try:
+            self.release_legacy_locks()
+        except Exception as ex:
+            print(f"Release of legacy locks failed: '{type(ex).__name__}': {ex}")
+        while True:
+            time.sleep(self.heartbeat_interval)
+            # noinspection PyBroadException
+            try:
+                self.renew()
+                self.reap()
+                self.publish_stats()
+            except Exception as ex:
+                print(f"Lock lease heartbeat failed: '{type(ex).__name__}': {ex}")
+
+    def renew(self):
+        """
+        Extends all leases held by this process, with one update per collection and lock type.
+        """
+        with self._lock:
+            held = dict(self._held)
+        groups: dict[tuple[str, int], tuple[t.Any, list[str]]] = {}
+        for lease_id, (collections, lock_type) in held.items():
+            for collection in collections:
+                groups.setdefault((collection.name, lock_type), (collection, []))[1].append(lease_id)
+        expires = datetime.utcnow() + timedelta(seconds=self.lease_ttl)
+        for (_, lock_type), (collection, lease_ids) in groups.items():
+            if lock_type == _SubResourceCtxManager.READ:
+                collection.update_many(
+                    {'rdleases.lease_id': {'$in': lease_ids}},
+                    {'$set': {'rdleases.$[lease].expires': expires}},
+                    array_filters=[{'lease.lease_id': {'$in': lease_ids}}],
+                )
+            else:
+                collection.update_many(
+                    {'wrlease.lease_id': {'$in': lease_ids}}, {'$set': {'wrlease.expires': expires}},
+                )
+
+    def publish_stats(self):
+        """
+        Saves the lock wait statistics of this process (if changed since the last call)
+        in the STATS_COLLECTION collection, with one document per owner.
+        """
+        version = self.wait_stats.version
+        if version == self._published_version:
+            return
+        get_db()[self.STATS_COLLECTION].replace_one(
+            {'_id': self.owner},
+            {'_id': self.owner, 'stats': self.wait_stats.to_dict(), 'updated': datetime.utcnow()},
+            upsert=True,
+        )
+        self._published_version = version
+
+    @classmethod
+    def collect_stats(cls) -> list[TDesc]:
+        """
+        :return: The last published lock wait statistics of all owners (processes).
+        """
+        return list(get_db()[cls.STATS_COLLECTION].find().sort('updated', -1))
+
+    @staticmethod
+    def release_legacy_locks() -> int:
+        """
+        Releases the locks acquired before the introduction of leases, i.e. read locks
+        without a lease record (rdlocks greater than the number of rdleases) and write locks
+        without wrlease, that would otherwise never be reaped. Since locks are always
+        acquired together with their lease, this never releases a lock held with a lease.
+        :return: Number of modified documents.
+        """
+        modified = 0
+        held_rdleases = {'$size': {'$ifNull': ['$rdleases', []]}}
+        for collection in RWLockableDocument.lockable_collections():
+            modified += collection.update_many(
+                {'$expr': {'$gt': ['$rdlocks', held_rdleases]}}, [{'$set': {'rdlocks': held_rdleases}}],
+            ).modified_count
+            modified += collection.update_many(
+                {'wrlock': True, 'wrlease': None}, {'$set': {'wrlock': False}},
+            ).modified_count
+        return modified
+
+    @staticmethod
+    def reap():
+        """
+        Releases all expired leases (of any owner) in all lockable collections.
+        Each release is conditional on the lease still being present, so that
+        concurrent reapers and late unlocks never release a lock twice.
+        """
+        now = datetime.utcnow()
+        for collection in RWLockableDocument.lockable_collections():
+            for document in collection.find({'rdleases.expires': {'$lt': now}}, {'rdleases': 1}):
+                for lease in document['rdleases']:
+                    if lease['expires'] < now:
+                        collection.update_one(
+                            {'_id': document['_id'], 'rdleases.lease_id': lease['lease_id']},
+                            {'$inc': {'rdlocks': -1}, '$pull': {'rdleases': {'lease_id': lease['lease_id']}}},
+                        )
+            collection.update_many(
+                {'wrlease.expires': {'$lt': now}}, {'$set': {'wrlock': False, 'wrlease': None}},
+            )
+            # tickets of writers that stopped waiting without withdrawing
+            collection.update_many(
+                {'wrqueue.expires': {'$lt': now}}, {'$pull': {'wrqueue': {'expires': {'$lt': now}}}},
+            )
+
+
+lease_manager = LeaseManager()
+
+
+def _lock_key(document: RWLockableDocument) -> TLockKey:
+    # noinspection PyProtectedMember
+    return document._get_collection_name(), str(document.pk)
+
+
+def _lock_memo() -> dict[TLockKey, list[int]] | None:
+    """
+    Per-request (and per-thread, since background tasks share the app context) memo
+    of the locks currently held, as lock key -> [lock type, reference count].
+    :return: The memo dictionary, or None if outside an application context.
+    """
+    if not has_app_context():
+        return None
+    memos = g.setdefault('lock_memos', {})
+    return memos.setdefault(threading.get_ident(), {})
 
 
 class _SubResourceCtxManager:
@@ -17,38 +326,126 @@ class _SubResourceCtxManager:
         self.locked = locked
         self.parents_locked = parents_locked
         self.parents_to_lock: set[RWLockableDocument] = set() if parents_locked else resource.parents
-        self.super_contexts: list[_SubResourceCtxManager] = []
+        self.ancestors: list[RWLockableDocument] = []   # ancestors held by this context (also through memo)
+        self.ancestors_acquired: list[RWLockableDocument] = []  # ancestors actually locked by this context
+        self.ancestors_lease: str | None = None
+        self.resource_memoized = False  # True if resource lock is held by an outer context
+        self.resource_counted = False   # True if this context holds a reference in the memo entry
+
+    @staticmethod
+    def ancestors_of(parents: t.Iterable[RWLockableDocument]) -> list[RWLockableDocument]:
+        """
+        Computes the full set of ancestors to lock, sorted by (collection, id)
+        for a deterministic acquisition order.
+        """
+        ancestors: dict[TLockKey, RWLockableDocument] = {}
+        stack = list(parents)
+        while len(stack) > 0:
+            document = stack.pop()
+            if document is None:
+                continue
+            key = _lock_key(document)
+            if key not in ancestors:
+                ancestors[key] = document
+                stack.extend(document.parents)
+        return [ancestors[key] for key in sorted(ancestors)]
+
+    def __lock_ancestors(self, memo: dict[TLockKey, list[int]] | None):
+        self.ancestors = self.ancestors_of(self.parents_to_lock)
+        if memo is None:
+            self.ancestors_acquired = self.ancestors
+        else:
+            self.ancestors_acquired = [doc for doc in self.ancestors if _lock_key(doc) not in memo]
+        self.ancestors_lease = RWLockableDocument.read_lock_all(self.ancestors_acquired)
+        if memo is not None:
+            for document in self.ancestors:
+                entry = memo.setdefault(_lock_key(document), [self.READ, 0])
+                entry[1] += 1
+
+    def __unlock_ancestors(self, memo: dict[TLockKey, list[int]] | None):
+        if memo is not None:
+            for document in self.ancestors:
+                key = _lock_key(document)
+                entry = memo.get(key)
+                if entry is not None:
+                    entry[1] -= 1
+                    if entry[1] <= 0:
+                        memo.pop(key)
+        RWLockableDocument.read_unlock_all(self.ancestors_acquired, self.ancestors_lease)
+        self.ancestors, self.ancestors_acquired, self.ancestors_lease = [], [], None
+
+    def __lock_resource(self, memo: dict[TLockKey, list[int]] | None):
+        key = _lock_key(self.resource)
+        entry = memo.get(key) if memo is not None else None
+        if entry is not None:
+            if entry[0] == self.READ and self.lock_type == self.WRITE:
+                # the write lock would wait forever for the read lock held by the outer context
+                raise LockingError(
+                    f"Cannot write-lock resource '{key[1]}' ({key[0]}): "
+                    f"it is already read-locked in the same request."
+                )
+            # already held by an outer context in this request
+            entry[1] += 1
+            self.resource_memoized = True
+            self.resource_counted = True
+            return
+        if self.lock_type == self.READ:
+            self.resource.read_lock()
+        elif self.lock_type == self.WRITE:
+            self.resource.write_lock()
+        if memo is not None:
+            memo[key] = [self.lock_type, 1]
+            self.resource_counted = True
+
+    def __unlock_resource(self, memo: dict[TLockKey, list[int]] | None):
+        key = _lock_key(self.resource)
+        entry = memo.get(key) if memo is not None and self.resource_counted else None
+        self.resource_counted = False
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                memo.pop(key)
+        if self.resource_memoized:
+            self.resource_memoized = False
+        elif self.lock_type == self.READ:
+            self.resource.read_unlock()
+        elif self.lock_type == self.WRITE:
+            self.resource.write_unlock()
 
     def __enter__(self):
+        memo = _lock_memo()
         if not self.locked:
-            for parent in self.parents_to_lock:
-                context = parent.sub_resource_operation(locked=False)
-                self.super_contexts.append(context.__enter__())
+            self.__lock_ancestors(memo)
 
         if self.create:
             self.resource.init_lock_set(wrlock=True, acquired=1)
         else:
             if not self.locked:
-                if self.lock_type == self.READ:
-                    self.resource.read_lock()
-                elif self.lock_type == self.WRITE:
-                    self.resource.write_lock()
+                try:
+                    self.__lock_resource(memo)
+                except Exception:
+                    self.__unlock_ancestors(memo)
+                    raise
         return self
 
     def update_resource(self, new_resource):
         # noinspection PyProtectedMember
-        acquired = self.resource._acquired
+        leases = self.resource._leases
         self.resource = new_resource
-        self.resource._acquired = acquired
+        self.resource._leases = leases
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if not self.locked:
-            if self.lock_type == self.READ:
-                self.resource.read_unlock()
-            elif self.lock_type == self.WRITE:
+            memo = _lock_memo()
+            if self.create:
+                # newly created resources are not memoized
                 self.resource.write_unlock()
-            for context in self.super_contexts[::-1]:
-                context.__exit__(exc_type, exc_val, exc_tb)
+            else:
+                self.__unlock_resource(memo)
+            self.__unlock_ancestors(memo)
+        if self.lock_type == self.WRITE:
+            # documents may have been deleted or replaced
+            clear_identity_map()
 
 
 class LockingError(Exception):
@@ -71,40 +468,238 @@ class RWLockableDocument(db.Document):
 
     rdlocks = db.IntField(default=0)
     wrlock = db.BooleanField(default=False)
-    _acquired = 0
+    rdleases = db.EmbeddedDocumentListField(LockLease, default=list)
+    wrlease = db.EmbeddedDocumentField(LockLease, default=None)
+    wrqueue = db.EmbeddedDocumentListField(LockTicket, default=list)
+    _leases: list[str] = []     # ids of the leases acquired through this object (stack)
+
+    # None until the first batch acquisition: standalone servers do not support transactions
+    _transactions_supported: bool | None = None
 
     def __init__(self, *args, **values):
         super().__init__(*args, **values)
-        self._acquired = 0
+        self._leases = []
+
+    @classmethod
+    def lockable_collections(cls) -> list:
+        """
+        :return: Collections of all concrete lockable document classes.
+        """
+        collections = {}
+        classes = [cls]
+        while len(classes) > 0:
+            current = classes.pop()
+            classes.extend(current.__subclasses__())
+            # noinspection PyProtectedMember
+            if not current._meta.get('abstract', False):
+                # noinspection PyProtectedMember
+                collection = current._get_collection()
+                collections[collection.name] = collection
+        return list(collections.values())
 
     def init_lock_set(self, rdlocks=0, wrlock=False, acquired=0):
         self.rdlocks = rdlocks
         self.wrlock = wrlock
-        self._acquired = acquired
-
-    def read_lock(self):
-        result = self.modify({'wrlock': False}, inc__rdlocks=1)
-        if result:
-            self._acquired += 1
-        else:
-            raise LockingError.default()
-
-    def write_lock(self):
-        result = self.modify({'rdlocks': 0, 'wrlock': False}, wrlock=True)
-        if result:
-            self._acquired += 1
-        else:
-            raise LockingError.default()
+        self.rdleases = []
+        self.wrlease = None
+        self.wrqueue = []
+        self._leases = []
+        if wrlock and acquired > 0:
+            lease = lease_manager.new_lease()
+            self.wrlease = LockLease(**lease)
+            self._leases.append(lease['lease_id'])
+            lease_manager.register(lease['lease_id'], [self._get_collection()], _SubResourceCtxManager.WRITE)
+
+    @staticmethod
+    def _readable_filter() -> TDesc:
+        """
+        Condition for admitting new readers: no writer holds the lock or has been waiting
+        for it for less than LOCK_WRITER_PRIORITY seconds. Waiting writers keep their ticket
+        alive (expires), but block new readers only until its blocks_until time.
+        """
+        now = datetime.utcnow()
+        return {
+            'wrlock': False,
+            'wrqueue': {'$not': {'$elemMatch': {'expires': {'$gt': now}, 'blocks_until': {'$gt': now}}}},
+        }
+
+    def read_lock(self, timeout: float = None):
+        collection = self._get_collection()
+        lease = None
+
+        def attempt() -> bool:
+            nonlocal lease
+            lease = lease_manager.new_lease()
+            result = collection.update_one(
+                {'_id': self.pk, **self._readable_filter()},
+                {'$inc': {'rdlocks': 1}, '$push': {'rdleases': lease}},
+            )
+            return result.modified_count == 1
+
+        lease_manager.acquire(attempt, 'read', timeout)
+        self._leases.append(lease['lease_id'])
+        lease_manager.register(lease['lease_id'], [collection], _SubResourceCtxManager.READ)
+
+    def write_lock(self, timeout: float = None):
+        collection = self._get_collection()
+        ticket = lease_manager.new_ticket()
+        collection.update_one({'_id': self.pk}, {'$push': {'wrqueue': ticket}})
+        lease = None
+        renewed = time.perf_counter()
+
+        def attempt() -> bool:
+            nonlocal lease, renewed
+            lease = lease_manager.new_lease()
+            now = datetime.utcnow()
+            # the ticket must be the head of the queue, or follow an expired (abandoned) head
+            result = collection.update_one(
+                {
+                    '_id': self.pk, 'rdlocks': 0, 'wrlock': False,
+                    'wrqueue.ticket_id': ticket['ticket_id'],
+                    '$or': [
+                        {'wrqueue.0.ticket_id': ticket['ticket_id']},
+                        {'wrqueue.0.expires': {'$lt': now}},
+                    ],
+                },
+                {
+                    '$set': {'wrlock': True, 'wrlease': lease},
+                    '$pull': {'wrqueue': {'$or': [{'ticket_id': ticket['ticket_id']}, {'expires': {'$lt': now}}]}},
+                },
+            )
+            if result.modified_count == 1:
+                return True
+            if time.perf_counter() - renewed >= lease_manager.heartbeat_interval:
+                # keep the ticket alive while waiting (blocks_until is not extended)
+                ticket['expires'] = lease_manager.new_ticket()['expires']
+                result = collection.update_one(
+                    {'_id': self.pk, 'wrqueue.ticket_id': ticket['ticket_id']},
+                    {'$set': {'wrqueue.$.expires': ticket['expires']}},
+                )
+                if result.matched_count == 0:
+                    # the ticket has been reaped: enqueue again
+                    collection.update_one({'_id': self.pk}, {'$push': {'wrqueue': ticket}})
+                renewed = time.perf_counter()
+            return False
+
+        try:
+            lease_manager.acquire(attempt, 'write', timeout)
+        except Exception:
+            collection.update_one({'_id': self.pk}, {'$pull': {'wrqueue': {'ticket_id': ticket['ticket_id']}}})
+            raise
+        self._leases.append(lease['lease_id'])
+        lease_manager.register(lease['lease_id'], [collection], _SubResourceCtxManager.WRITE)
 
     def read_unlock(self):
-        if self._acquired > 0:
-            self.modify({'wrlock': False}, inc__rdlocks=-1)
-            self._acquired -= 1
+        if len(self._leases) > 0:
+            lease_id = self._leases.pop()
+            # no-op if the lease has already expired and been reaped
+            self._get_collection().update_one(
+                {'_id': self.pk, 'rdleases.lease_id': lease_id},
+                {'$inc': {'rdlocks': -1}, '$pull': {'rdleases': {'lease_id': lease_id}}},
+            )
+            lease_manager.unregister(lease_id)
 
     def write_unlock(self):
-        if self._acquired > 0:
-            self.modify({'rdlocks': 0, 'wrlock': True}, wrlock=False)
-            self._acquired -= 1
+        if len(self._leases) > 0:
+            lease_id = self._leases.pop()
+            self._get_collection().update_one(
+                {'_id': self.pk, 'wrlease.lease_id': lease_id}, {'$set': {'wrlock': False, 'wrlease': None}},
+            )
+            lease_manager.unregister(lease_id)
+
+    @staticmethod
+    def _group_by_collection(documents: list[RWLockableDocument]) -> dict[str, tuple[t.Any, list]]:
+        groups: dict[str, tuple[t.Any, list]] = {}
+        for document in documents:
+            # noinspection PyProtectedMember
+            collection = document._get_collection()
+            groups.setdefault(collection.name, (collection, []))[1].append(document.pk)
+        return groups
+
+    @staticmethod
+    def read_lock_all(documents: list[RWLockableDocument], timeout: float = None) -> str | None:
+        """
+        Read-locks all given documents at once (all or nothing), in the given order,
+        with a single lease shared by all of them.
+        If the server supports transactions, a single transaction with one update
+        per collection is used, otherwise documents are locked one at a time and
+        the acquired locks are released on failure.
+        Acquisition is retried (see LeaseManager.acquire) until timeout.
+        :return: The id of the acquired lease (None if there are no documents).
+        :raises LockingError: If any of the documents is still write-locked at timeout.
+        """
+        if len(documents) == 0:
+            return None
+        lease = lease_manager.new_lease()
+        groups = RWLockableDocument._group_by_collection(documents)
+        RWLockableDocument.__register_lease(lease['lease_id'], groups)
+
+        def attempt() -> bool:
+            lease['expires'] = lease_manager.new_lease()['expires']
+            update = {'$inc': {'rdlocks': 1}, '$push': {'rdleases': lease}}
+            if len(documents) > 1 and RWLockableDocument._transactions_supported is not False:
+                client = next(iter(groups.values()))[0].database.client
+                try:
+                    with client.start_session() as session:
+                        with session.start_transaction():
+                            for collection, ids in groups.values():
+                                result = collection.update_many(
+                                    {'_id': {'$in': ids}, **RWLockableDocument._readable_filter()},
+                                    update, session=session,
+                                )
+                                if result.modified_count != len(ids):
+                                    raise LockingError.default()    # aborts the whole transaction
+                    RWLockableDocument._transactions_supported = True
+                    return True
+                except LockingError:
+                    return False
+                except OperationFailure as ex:
+                    if ex.has_error_label('TransientTransactionError'):    # e.g. WriteConflict
+                        return False
+                    if RWLockableDocument._transactions_supported or ex.code != 20:    # 20 = IllegalOperation
+                        raise ex
+                    RWLockableDocument._transactions_supported = False
+            acquired: list[RWLockableDocument] = []
+            for document in documents:
+                # noinspection PyProtectedMember
+                result = document._get_collection().update_one(
+                    {'_id': document.pk, **RWLockableDocument._readable_filter()}, update,
+                )
+                if result.modified_count != 1:
+                    RWLockableDocument.__unlock_all(acquired, lease['lease_id'])
+                    return False
+                acquired.append(document)
+            return True
+
+        try:
+            lease_manager.acquire(attempt, 'read', timeout)
+        except Exception:
+            lease_manager.unregister(lease['lease_id'])
+            raise
+        return lease['lease_id']
+
+    @staticmethod
+    def __register_lease(lease_id: str, groups: dict[str, tuple[t.Any, list]]):
+        collections = [collection for collection, _ in groups.values()]
+        lease_manager.register(lease_id, collections, _SubResourceCtxManager.READ)
+
+    @staticmethod
+    def read_unlock_all(documents: list[RWLockableDocument], lease_id: str | None):
+        """
+        Releases read locks acquired by read_lock_all, with one update per collection.
+        """
+        if lease_id is None:
+            return
+        RWLockableDocument.__unlock_all(documents, lease_id)
+        lease_manager.unregister(lease_id)
+
+    @staticmethod
+    def __unlock_all(documents: list[RWLockableDocument], lease_id: str):
+        for collection, ids in RWLockableDocument._group_by_collection(documents).values():
+            collection.update_many(
+                {'_id': {'$in': ids}, 'rdleases.lease_id': lease_id},
+                {'$inc': {'rdlocks': -1}, '$pull': {'rdleases': {'lease_id': lease_id}}},
+            )
 
     @property
     @abstractmethod
@@ -148,5 +743,10 @@ class RWLockableDocument(db.Document):
 
 __all__ = [
     'LockingError',
+    'LockLease',
+    'LockTicket',
+    'LockWaitStats',
+    'LeaseManager',
+    'lease_manager',
     'RWLockableDocument',
 ]
\ No newline at end of file
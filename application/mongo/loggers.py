@@ -2,6 +2,9 @@
 Extended Avalanche loggers for interacting with data manager.
 """
 from __future__ import annotations
+import time
+import weakref
+import threading
 import torch
 
 from avalanche.evaluation.metric_results import MetricValue
@@ -12,6 +15,7 @@ from application.utils import t
 from application.data_managing.base import BaseDataManager
 from application.resources import StandardMetricSet
 from application.mongo.utils import mnames_order_filter, mnames_translations
+from application.mongo.metrics_store import MetricsStoreWriter
 
 if t.TYPE_CHECKING:
     from avalanche.training.templates import SupervisedTemplate
@@ -24,15 +28,23 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
     (i.e., it uses BaseDataManager file and directory API), thus synchronizing
     with general experiment data storage (e.g. in Workspaces directories on
     the local FileSystem).
+    Rows are written to buffered files that are kept open and flushed at the end of
+    each training/eval experience, after flush_interval seconds from the last flush
+    and when the logger is closed (also by the experiment run on failure).
+    Numeric values are also written to a binary metrics store (see metrics_store),
+    that is compacted into a columnar file on close.
     """
 
     _DFL_TRAIN_RESULTS_FILE_NAME = 'train_results.csv'
     _DFL_EVAL_RESULTS_FILE_NAME = 'eval_results.csv'
+    _DFL_FLUSH_INTERVAL = 10.0      # seconds
+    _BUFFER_SIZE = 64 * 1024
 
     def __init__(
         self, log_folder: list[str], metricset: StandardMetricSet,
         train_file_name: str = _DFL_TRAIN_RESULTS_FILE_NAME,
         eval_file_name: str = _DFL_EVAL_RESULTS_FILE_NAME,
+        flush_interval: float = _DFL_FLUSH_INTERVAL,
     ):
 
         super().__init__()
@@ -40,6 +52,13 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
         self.metric_names = {k: mnames_order_filter(v) for k, v in metricset.get_metric_names().items()}
         self.val_dict = {k: 0 for k in self.metric_names}
 
+        # Avalanche metric name prefix -> column index, for epoch (train) and experience (eval) metrics
+        self.train_lookup = self._compile_lookup(self.metric_names['train'], 'epoch')
+        self.eval_lookup = self._compile_lookup(self.metric_names['eval'], 'experience')
+        # preallocated rows of current values
+        self.train_row: list = [0] * len(self.metric_names['train'])
+        self.eval_row: list = [0] * len(self.metric_names['eval'])
+
         self.train_file_name = train_file_name
         self.eval_file_name = eval_file_name
         self.log_folder = log_folder
@@ -60,6 +79,16 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
         # validation metrics computed during training
         self.val_acc, self.val_loss, self.val_cpu, self.val_disk, self.val_ram = 0, 0, 0, 0, 0
 
+        # open writers (file_name -> writer), shared with the finalizer that flushes
+        # them if the logger is garbage collected or the process exits without closing it
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._writers: dict[str, t.TextIO] = {}
+        self._stores: dict[str, MetricsStoreWriter] = {}
+        self._writers_lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, self._close_writers, self._writers, self._writers_lock)
+        self._stores_finalizer = weakref.finalize(self, self._close_writers, self._stores, self._writers_lock)
+
         # create files
         self.manager.create_file((self.train_file_name, self.log_folder, None))
         self.manager.create_file((self.eval_file_name, self.log_folder, None))
@@ -72,17 +101,81 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
 
         eval_headers: list[str] = [f"eval_{name}" for name in self.metric_names['eval']]
 
-        self.manager.print_to_file(self.train_file_name, self.log_folder,
-                                   'training_exp', 'epoch', 'training_items', *train_headers,
-                                   sep=',', append=False, flush=True)
+        train_columns = ['training_exp', 'epoch', 'training_items', *train_headers]
+        eval_columns = ['eval_exp', 'training_exp', *eval_headers]
+        self._print_row(self.train_file_name, *train_columns, append=False)
+        self._print_row(self.eval_file_name, *eval_columns, append=False)
+        for file_name, columns in [(self.train_file_name, train_columns), (self.eval_file_name, eval_columns)]:
+            self._stores[file_name] = MetricsStoreWriter(
+                self.manager, file_name, self.log_folder, columns, buffer_size=self._BUFFER_SIZE,
+            )
+        self.flush()
 
-        self.manager.print_to_file(self.eval_file_name, self.log_folder,
-                                   'eval_exp', 'training_exp', *eval_headers,
-                                   sep=',', append=False, flush=True)
+    @staticmethod
+    def _close_writers(writers: dict[str, t.TextIO | MetricsStoreWriter], lock: threading.Lock):
+        with lock:
+            for writer in writers.values():
+                writer.close()      # also flushes
+            writers.clear()
+
+    def _print_row(self, file_name: str, *values, append=True):
+        with self._writers_lock:
+            writer = self._writers.get(file_name)
+            if writer is None or not append:
+                if writer is not None:
+                    writer.close()
+                writer = self.manager.get_file_writer(
+                    file_name, self.log_folder, append=append, buffer_size=self._BUFFER_SIZE,
+                )
+                self._writers[file_name] = writer
+            print(*values, sep=',', file=writer)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _store_row(self, file_name: str, *values):
+        with self._writers_lock:
+            store = self._stores.get(file_name)
+            if store is not None:
+                store.append(*values)
+
+    def flush(self):
+        with self._writers_lock:
+            for writer in self._writers.values():
+                writer.flush()
+            for store in self._stores.values():
+                store.flush()
+        self._last_flush = time.monotonic()
 
     def log_single_metric(self, name, value, x_plot) -> None:
         pass
 
+    @staticmethod
+    def _compile_lookup(names: list[str], mtype: str) -> dict[str, int]:
+        translations = mnames_translations()
+        lookup: dict[str, int] = {}
+        for index, name in enumerate(names):
+            prefix = translations.get(name, {}).get(mtype)
+            if prefix is not None:
+                lookup.setdefault(prefix, index)
+        return lookup
+
+    @staticmethod
+    def _fill_row(row: list, lookup: dict[str, int], metric_values: t.List['MetricValue']) -> list:
+        """
+        Fills row with the values of the metrics in lookup (0 if missing) in one pass, where
+        Avalanche full metric names are of the form '<prefix>/<phase>/<stream>/...'.
+        If more values have the same prefix, the first one is taken.
+        """
+        filled = [False] * len(row)
+        for i in range(len(row)):
+            row[i] = 0
+        for val in metric_values:
+            index = lookup.get(val.name.split('/', 1)[0])
+            if index is not None and not filled[index]:
+                row[index] = val.value
+                filled[index] = True
+        return row
+
     @staticmethod
     def _val_to_str(m_val):
         if isinstance(m_val, torch.Tensor):
@@ -95,22 +188,16 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
     def print_train_metrics(self, training_exp, epoch, *values):
         if self.log_folder is None:
             raise RuntimeError("Undefined log folder.")
+        self._store_row(self.train_file_name, training_exp, epoch, self.current_n_patterns, *values)
         values = [self._val_to_str(m_val) for m_val in values]
-        self.manager.print_to_file(
-            self.train_file_name, self.log_folder,
-            training_exp, epoch, self.current_n_patterns, *values,
-            sep=',', append=True, flush=True,
-        )
+        self._print_row(self.train_file_name, training_exp, epoch, self.current_n_patterns, *values)
 
     def print_eval_metrics(self, eval_exp, training_exp, *values):
         if self.log_folder is None:
             raise RuntimeError("Undefined log folder.")
+        self._store_row(self.eval_file_name, eval_exp, training_exp, *values)
         values = [self._val_to_str(m_val) for m_val in values]
-        self.manager.print_to_file(
-            self.eval_file_name, self.log_folder,
-            eval_exp, training_exp, *values,
-            sep=',', append=True, flush=True,
-        )
+        self._print_row(self.eval_file_name, eval_exp, training_exp, *values)
 
     def after_train_dataset_adaptation(self, strategy: "SupervisedTemplate", *args, **kwargs):
         self.current_n_patterns = len(strategy.adapted_dataset)
@@ -124,20 +211,11 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
     def after_training_epoch(self, strategy: "SupervisedTemplate",
                              metric_values: t.List["MetricValue"], **kwargs):
         super().after_training_epoch(strategy, metric_values, **kwargs)
-        mtype = 'epoch'
+        row = self._fill_row(self.train_row, self.train_lookup, metric_values)
         vals_to_print: list[int | float] = []
+        for index, name in enumerate(self.metric_names['train']):
+            vals_to_print += [row[index], self.val_dict.get(name, 0)]
 
-        for name in self.metric_names['train']:
-            current_value = 0
-            val_start = mnames_translations().get(name).get(mtype)
-            if val_start is not None:
-                for val in metric_values:
-                    if val.name.startswith(val_start):
-                        current_value = val.value
-                        break
-            val_current_value = self.val_dict.get(name, 0)
-            vals_to_print += [current_value, val_current_value]
-        
         self.print_train_metrics(
             self.training_exp_id, strategy.clock.train_exp_epochs, *vals_to_print,
         )
@@ -153,27 +231,16 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
     def after_eval_exp(self, strategy: 'SupervisedTemplate',
                        metric_values: t.List['MetricValue'], **kwargs):
         super().after_eval_exp(strategy, metric_values, **kwargs)
-        mtype = 'experience'
-        vals_to_print: list[int | float] = []
-        
-        for name in self.metric_names['eval']:
-            current_value = 0
-            val_start = mnames_translations().get(name).get(mtype)
-            if val_start is not None:
-                for val in metric_values:
-                    if val.name.startswith(val_start):
-                        current_value = val.value
-                        break
-            if self.in_train_phase:
-                self.val_dict[name] = current_value
-            else:
-                vals_to_print.append(current_value)
-
-        if not self.in_train_phase:
+        row = self._fill_row(self.eval_row, self.eval_lookup, metric_values)
+        if self.in_train_phase:
+            for index, name in enumerate(self.metric_names['eval']):
+                self.val_dict[name] = row[index]
+        else:
             self.print_eval_metrics(
                 strategy.experience.current_experience,
-                self.training_exp_id, *vals_to_print,
+                self.training_exp_id, *row,
             )
+            self.flush()
             print(
                 f"Ended evaluating on experience = {strategy.experience.current_experience} of {self.training_exp_id}"
             )
@@ -185,6 +252,12 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
         self.training_exp_id = strategy.experience.current_experience
         self.training_epoch_id = 0
 
+    # noinspection PyMethodOverriding
+    def after_training_exp(self, strategy: 'SupervisedTemplate',
+                           metric_values: t.List['MetricValue'], **kwargs):
+        super().after_training_exp(strategy, metric_values, **kwargs)
+        self.flush()
+
     # noinspection PyMethodOverriding
     def before_eval(self, strategy: 'SupervisedTemplate',
                     metric_values: t.List['MetricValue'], **kwargs):
@@ -208,7 +281,8 @@ class ExtendedCSVLogger(BaseLogger, SupervisedPlugin):
         print("AFTER TRAINING", *metric_values, sep='\n')
 
     def close(self):
-        pass
+        self._close_writers(self._writers, self._writers_lock)
+        self._close_writers(self._stores, self._writers_lock)
 
 
 __all__ = ['ExtendedCSVLogger']
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Compact binary store for experiment metrics, written alongside csv results.
+
+While an experiment is running, rows are appended to a '.bin' file made of a header
+(magic, version, JSON schema with column names) followed by float64 rows. When the
+logger is closed, the table is compacted into a columnar '.npz' file (one array per
+column), from which single columns can be loaded without reading the other ones.
+"""
+from __future__ import annotations
+
+import io
+import json
+import struct
+import numpy as np
+
+from application.utils import t, TDesc
+from application.data_managing.base import BaseDataManager
+
+
+_MAGIC = b'CLMS'
+_VERSION = 1
+_HEADER_PREFIX = struct.Struct('<4sBI')     # magic, version, schema length
+_DTYPE = np.dtype('<f8')
+_COLUMNS_KEY = '__columns__'
+
+
+def metrics_store_names(csv_file_name: str) -> tuple[str, str]:
+    """
+    :return: Names of the append-only and of the compacted files for a csv results file.
+    """
+    base = csv_file_name[:-4] if csv_file_name.endswith('.csv') else csv_file_name
+    return base + '.bin', base + '.npz'
+
+
+def _to_float(value) -> float:
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    elif hasattr(value, 'numel') and value.numel() == 1:     # single-element tensor
+        return float(value.item())
+    return float('nan')     # e.g. confusion matrices, None
+
+
+class MetricsStoreWriter:
+    """
+    Appends rows of numeric values to a metrics table. Non-scalar values are stored as NaN.
+    """
+
+    def __init__(self, manager: BaseDataManager, csv_file_name: str, dir_names: list[str],
+                 columns: list[str], buffer_size: int = -1):
+        self.manager = manager
+        self.dir_names = dir_names
+        self.columns = list(columns)
+        self.bin_name, self.npz_name = metrics_store_names(csv_file_name)
+        self.buffer_size = buffer_size
+        if self.manager.file_exists(self.npz_name, self.dir_names):
+            self.manager.delete_file(self.npz_name, self.dir_names)
+        self._writer = self.manager.get_file_writer(
+            self.bin_name, self.dir_names, append=False, binary=True, buffer_size=buffer_size,
+        )
+        schema = json.dumps({'columns': self.columns, 'dtype': _DTYPE.str}).encode('utf-8')
+        self._writer.write(_HEADER_PREFIX.pack(_MAGIC, _VERSION, len(schema)) + schema)
+
+    def append(self, *values):
+        if self._writer is None:
+            raise RuntimeError(f"Metrics store '{self.bin_name}' has already been closed.")
+        if len(values) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} values, got {len(values)}.")
+        self._writer.write(np.array([_to_float(value) for value in values], dtype=_DTYPE).tobytes())
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self, compact: bool = True):
+        """
+        Closes the append-only file and (optionally) writes the columnar one.
+        """
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        if compact:
+            loaded = _load_appended(self.manager, self.bin_name, self.dir_names)
+            if loaded is not None:
+                columns, data = loaded
+                buffer = io.BytesIO()
+                arrays = {f"c{i}": data[:, i] for i in range(len(columns))}
+                np.savez(buffer, **{_COLUMNS_KEY: np.array(columns)}, **arrays)
+                writer = self.manager.get_file_writer(self.npz_name, self.dir_names, append=False, binary=True)
+                with writer:
+                    writer.write(buffer.getvalue())
+
+
+def _load_appended(manager: BaseDataManager, bin_name: str,
+                   dir_names: list[str]) -> tuple[list[str], np.ndarray] | None:
+    if not manager.file_exists(bin_name, dir_names):
+        return None
+    with manager.get_file_pointer(bin_name, dir_names, binary=True) as fp:
+        raw = fp.read()
+    if len(raw) < _HEADER_PREFIX.size:
+        return None
+    magic, version, schema_length = _HEADER_PREFIX.unpack_from(raw)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"'{bin_name}' is not a valid metrics store file.")
+    offset = _HEADER_PREFIX.size + schema_length
+    columns = json.loads(raw[_HEADER_PREFIX.size:offset].decode('utf-8'))['columns']
+    row_size = len(columns) * _DTYPE.itemsize
+    n_rows = (len(raw) - offset) // row_size     # a row could still be partially written
+    data = np.frombuffer(raw, dtype=_DTYPE, count=n_rows * len(columns), offset=offset)
+    return columns, data.reshape(n_rows, len(columns))
+
+
+def load_metrics(manager: BaseDataManager, csv_file_name: str, dir_names: list[str],
+                 columns: t.Sequence[str] = None) -> tuple[list[str], dict[str, np.ndarray]] | None:
+    """
+    Loads (the given columns of) a metrics table, from the columnar file if available,
+    otherwise from the append-only one (e.g. while the experiment is running).
+    :return: A couple (all_columns, {column: values}), or None if the table does not exist.
+    :raises ValueError: If some requested column does not exist.
+    """
+    bin_name, npz_name = metrics_store_names(csv_file_name)
+    if manager.file_exists(npz_name, dir_names):
+        with manager.get_file_pointer(npz_name, dir_names, binary=True) as fp:
+            with np.load(fp) as npz:
+                all_columns = [str(column) for column in npz[_COLUMNS_KEY]]
+                selected = all_columns if columns is None else list(columns)
+                _check_columns(selected, all_columns)
+                # each column is a separate member of the archive, that is read only if requested
+                return all_columns, {column: npz[f"c{all_columns.index(column)}"] for column in selected}
+    loaded = _load_appended(manager, bin_name, dir_names)
+    if loaded is None:
+        return None
+    all_columns, data = loaded
+    selected = all_columns if columns is None else list(columns)
+    _check_columns(selected, all_columns)
+    return all_columns, {column: data[:, all_columns.index(column)] for column in selected}
+
+
+def _check_columns(selected: list[str], all_columns: list[str]):
+    unknown = [column for column in selected if column not in all_columns]
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown metric column(s): {', '.join(unknown)}.")
+
+
+def query_metrics(manager: BaseDataManager, csv_file_name: str, dir_names: list[str],
+                  columns: t.Sequence[str] = None, filters: dict[str, tuple[float | None, float | None]] = None,
+                  max_points: int = None) -> TDesc | None:
+    """
+    Selects columns and rows of a metrics table.
+    :param columns: Columns to return (all by default).
+    :param filters: A dictionary column -> (min, max) of (inclusive) ranges that rows must satisfy,
+    where None means unbounded (e.g. {'training_exp': (0, 2), 'epoch': (None, 10)}).
+    :param max_points: If given, returned rows are evenly downsampled to at most this number
+    (the first and the last selected rows are always kept).
+    :return: A dictionary {"columns": [...], "total_rows": <rows before downsampling>, "data": {column: [...]}},
+    or None if the table does not exist.
+    """
+    filters = filters or {}
+    requested = None if columns is None else list(dict.fromkeys(list(columns) + list(filters.keys())))
+    loaded = load_metrics(manager, csv_file_name, dir_names, requested)
+    if loaded is None:
+        return None
+    all_columns, values = loaded
+    columns = all_columns if columns is None else list(columns)
+
+    n_rows = len(next(iter(values.values()))) if len(values) > 0 else 0
+    mask = np.ones(n_rows, dtype=bool)
+    for column, (low, high) in filters.items():
+        if low is not None:
+            mask &= values[column] >= low
+        if high is not None:
+            mask &= values[column] <= high
+    indexes = np.nonzero(mask)[0]
+    total_rows = len(indexes)
+    if max_points is not None and total_rows > max_points:
+        indexes = indexes[np.unique(np.linspace(0, total_rows - 1, max_points).round().astype(int))]
+
+    data = {}
+    for column in columns:
+        selected = values[column][indexes]
+        # NaN (non-scalar or missing values) is not valid JSON
+        data[column] = [None if np.isnan(value) else value for value in selected.tolist()]
+    return {'columns': columns, 'total_rows': total_rows, 'data': data}
+
+
+__all__ = [
+    'metrics_store_names',
+    'MetricsStoreWriter',
+    'load_metrics',
+    'query_metrics',
+]
@@ -1,20 +1,20 @@
 from __future__ import annotations
-import base64
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from hashlib import md5
+from bson import ObjectId
 from werkzeug.security import check_password_hash
-from mongoengine import NotUniqueError
 
-from application.utils import TDesc, TBoolExc, os, auto_tboolexc
+from application.utils import TDesc, TBoolExc, auto_tboolexc
 from application.validation import USERNAME_MAX_CHARS
 from application.database import db
-from application.models import User, Workspace
+from application.models import User, Workspace, sign_token, invalidate_token_state
 
 from application.mongo.base import *
 from application.mongo.mongo_base_metadata import MongoBaseMetadata
 
 from application.data_managing import BaseDataManager
 from application.mongo.locking import RWLockableDocument
+from application.mongo.utils import request_cached, identity_key, prefetch_references, CursorPage
 
 
 class UserMetadata(MongoBaseMetadata):
@@ -36,6 +36,7 @@ class MongoUser(MongoBaseUser):
     password_hash = db.StringField()
     token = db.StringField(unique=True)
     token_expiration = db.DateTimeField()
+    token_generation = db.IntField(default=0)   # increased for invalidating all issued tokens
     metadata = db.EmbeddedDocumentField(UserMetadata)
 
     @property
@@ -53,9 +54,13 @@ class MongoUser(MongoBaseUser):
     def all(cls):
         return cls.get()
 
+    @classmethod
+    def get_page(cls, limit: int, token: str = None) -> CursorPage:
+        return CursorPage(cls.objects(), limit, token, only=('username', 'metadata'))
+
     @classmethod
     def get_by_name(cls, name: str) -> MongoBaseUser | None:
-        result = cls.get(name)
+        result = request_cached('user', identity_key(cls, name), lambda: cls.get(name))
         return result[0] if len(result) >= 1 else None
 
     @classmethod
@@ -68,6 +73,11 @@ class MongoUser(MongoBaseUser):
         result = cls.get(token=token)
         return result[0] if len(result) >= 1 else None
 
+    @classmethod
+    def get_token_state(cls, user_id: str) -> tuple[str, int] | None:
+        user = cls.objects(id=user_id).only('username', 'token_generation').first()
+        return (user.username, user.token_generation) if user is not None else None
+
     # 4. Create + callbacks
     @classmethod
     def create(cls, username: str, email: str, password: str,
@@ -102,6 +112,7 @@ class MongoUser(MongoBaseUser):
                     workspace.delete(parents_locked=True)
 
                 db.Document.delete(self)
+                invalidate_token_state(str(self.id))
                 manager = BaseDataManager.get()
                 manager.remove_subdir(self.user_base_dir())
                 return True, None
@@ -140,6 +151,7 @@ class MongoUser(MongoBaseUser):
             modified = True
             before_username = self.username
             self.username = username
+            invalidate_token_state(str(self.id))
             result['username'] = {'before': before_username, 'after': username}
 
         if (self.email != email) and (email is not None):
@@ -175,9 +187,11 @@ class MongoUser(MongoBaseUser):
         :return:
         """
         self.password_hash = self.get_password_hash(password)
+        self.revoke_token(save=False)
         self.update_last_modified(save=save)
         if save:
             self.save()
+        invalidate_token_state(str(self.id))
 
     def user_base_dir(self):
         return f"User_{self.get_id()}"
@@ -194,6 +208,7 @@ class MongoUser(MongoBaseUser):
         }
         if links:
             workspaces = self.workspaces()
+            prefetch_references(workspaces, known=[self], owner=type(self))
             data['links'] = {
                 'workspaces': {w.get_name(): ('Workspace', w) for w in workspaces}
             }
@@ -234,14 +249,14 @@ class MongoUser(MongoBaseUser):
         now = datetime.utcnow()
         if self.token and self.token_expiration > now + timedelta(seconds=60):
             return self.token
-        while True:
-            try:
-                self.token = base64.b64encode(os.urandom(96)).decode('utf-8')  # 96 * 4/3 == 128
-                break
-            except NotUniqueError:
-                continue
-        now = datetime.utcnow()
+        if self.id is None:
+            self.id = ObjectId()    # new user, the token must contain its id
         self.token_expiration = now + timedelta(seconds=expires_in)
+        self.token = sign_token({
+            'uid': str(self.id),
+            'exp': int(self.token_expiration.replace(tzinfo=timezone.utc).timestamp()),
+            'gen': self.token_generation,
+        })
         self.update_last_modified(save=save)
         if save:
             self.save()
@@ -249,14 +264,15 @@ class MongoUser(MongoBaseUser):
 
     def revoke_token(self, save: bool = True):
         """
-        Revokes current authentication token.
+        Revokes current authentication token (and any other one issued before).
         :param save:
         :return:
         """
         self.token_expiration = datetime.utcnow() - timedelta(seconds=1)
+        self.token_generation += 1
         if save:
             self.save()
-
+        invalidate_token_state(str(self.id))
 
 __all__ = [
     'UserMetadata',
@@ -11,6 +11,7 @@ from application.data_managing import BaseDataManager, BaseDataRepository
 from application.resources import *
 
 from application.mongo.locking import RWLockableDocument
+from application.mongo.utils import request_cached, identity_key, prefetch_references, CursorPage
 from application.mongo.mongo_base_metadata import MongoBaseMetadata
 from application.mongo.base import MongoBaseUser, MongoBaseWorkspace
 
@@ -64,7 +65,7 @@ class MongoWorkspace(MongoBaseWorkspace):
             kwargs['owner'] = owner
         if name is not None:
             kwargs['name'] = name
-        return list(cls.objects(**kwargs).all())
+        return request_cached('workspace', identity_key(cls, **kwargs), lambda: list(cls.objects(**kwargs).all()))
 
     @classmethod
     def get_by_owner(cls, owner: str | MongoBaseUser):
@@ -75,6 +76,14 @@ class MongoWorkspace(MongoBaseWorkspace):
     def all(cls):
         return cls.get()
 
+    @classmethod
+    def get_page(cls, owner: str | MongoBaseUser, limit: int, token: str = None) -> CursorPage:
+        owner = t.cast(MongoBaseUser, User.canonicalize(owner))
+        return CursorPage(
+            cls.objects(owner=owner), limit, token, exclude=('rdleases', 'wrlease', 'wrqueue'),
+            prefetch=lambda documents: prefetch_references(documents, known=[owner], owner=type(owner)),
+        )
+
     # 4. Create + callbacks
     @classmethod
     def create(cls, name: str, owner: str | MongoBaseUser, save: bool = True,
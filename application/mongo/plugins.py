@@ -0,0 +1,438 @@
+"""
+Avalanche plugins for instrumenting experiments, writing into the execution log folder
+through data manager.
+"""
+from __future__ import annotations
+import os
+import json
+import math
+import time
+import shutil
+import resource
+import tempfile
+import psutil
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from torch.profiler import profile, ProfilerActivity
+
+from avalanche.core import SupervisedPlugin
+from avalanche.training.plugins import EvaluationPlugin
+from avalanche.training.templates import BaseTemplate
+
+from application.utils import t, TDesc
+from application.data_managing.base import BaseDataManager
+from application.mongo.metrics_store import MetricsStoreWriter
+
+if t.TYPE_CHECKING:
+    from avalanche.training.templates import SupervisedTemplate
+
+
+class PhaseTimingPlugin(SupervisedPlugin):
+    """
+    Measures, for each minibatch, the time spent waiting for the DataLoader, in forward,
+    backward, optimizer step and evaluation, and aggregates them into log-spaced histograms.
+    At the end of each training experience (and of each evaluation) a summary row per phase
+    is appended to a csv file, and the histograms are written in a json file.
+    When training on GPU, the device is synchronized before taking each time, so that
+    asynchronous kernels are accounted to the right phase (at the cost of some throughput).
+    """
+
+    PHASES = ('data', 'forward', 'backward', 'optimizer')
+    EVAL_PHASES = ('eval_data', 'eval')
+
+    _DFL_SUMMARY_FILE_NAME = 'phase_timings.csv'
+    _DFL_HISTOGRAMS_FILE_NAME = 'phase_timings.json'
+    _PERCENTILES = (50, 90, 99)
+
+    def __init__(self, log_folder: list[str], n_bins: int = 50, min_ms: float = 0.01, max_ms: float = 1e5,
+                 synchronize: bool = True, summary_file_name: str = _DFL_SUMMARY_FILE_NAME,
+                 histograms_file_name: str = _DFL_HISTOGRAMS_FILE_NAME):
+        super().__init__()
+        self.log_folder = log_folder
+        self.manager = BaseDataManager.get()
+        self.synchronize = synchronize
+        self.summary_file_name = summary_file_name
+        self.histograms_file_name = histograms_file_name
+
+        # bins are [edges[i-1], edges[i]), with an underflow (0) and an overflow (n_bins + 1) bin
+        self.edges = np.logspace(math.log10(min_ms), math.log10(max_ms), n_bins + 1)
+        self.histograms: dict[str, np.ndarray] = {}
+        self.totals: dict[str, float] = {}
+        self.maxs: dict[str, float] = {}
+        self.reset(self.PHASES + self.EVAL_PHASES)
+        self.history: list[TDesc] = []
+
+        self.training_exp_id = None
+        self._mark: float | None = None     # end of the last iteration (start of data loading)
+        self._start: float | None = None    # start of the current phase
+
+        self.manager.create_file((self.summary_file_name, self.log_folder, None))
+        self.manager.print_to_file(
+            self.summary_file_name, self.log_folder,
+            'training_exp', 'phase', 'count', 'total_ms', 'mean_ms',
+            *[f"p{p}_ms" for p in self._PERCENTILES], 'max_ms',
+            sep=',', append=False, flush=True,
+        )
+
+    def reset(self, phases: t.Iterable[str]):
+        for phase in phases:
+            self.histograms[phase] = np.zeros(len(self.edges) + 1, dtype=np.int64)
+            self.totals[phase] = 0.0
+            self.maxs[phase] = 0.0
+
+    def _now(self, strategy: SupervisedTemplate) -> float:
+        if self.synchronize and torch.device(strategy.device).type == 'cuda':
+            torch.cuda.synchronize(strategy.device)
+        return time.perf_counter()
+
+    def _record(self, phase: str, start: float | None, end: float):
+        if start is None:
+            return
+        elapsed_ms = 1000 * (end - start)
+        self.histograms[phase][np.searchsorted(self.edges, elapsed_ms, side='right')] += 1
+        self.totals[phase] += elapsed_ms
+        self.maxs[phase] = max(self.maxs[phase], elapsed_ms)
+
+    def _percentile(self, phase: str, percentile: float) -> float:
+        """
+        Upper bound of the given percentile from the histogram.
+        """
+        histogram = self.histograms[phase]
+        rank = math.ceil(histogram.sum() * percentile / 100)
+        index = int(np.searchsorted(np.cumsum(histogram), rank))
+        return float(self.edges[index]) if index < len(self.edges) else self.maxs[phase]
+
+    def _dump(self, phases: t.Sequence[str]):
+        entry = {'training_exp': self.training_exp_id, 'phases': {}}
+        for phase in phases:
+            count = int(self.histograms[phase].sum())
+            if count == 0:
+                continue
+            total = self.totals[phase]
+            self.manager.print_to_file(
+                self.summary_file_name, self.log_folder,
+                self.training_exp_id, phase, count, f"{total:.3f}", f"{total / count:.4f}",
+                *[f"{self._percentile(phase, p):.4f}" for p in self._PERCENTILES], f"{self.maxs[phase]:.4f}",
+                sep=',', append=True, flush=True,
+            )
+            entry['phases'][phase] = {
+                'count': count, 'total_ms': total, 'max_ms': self.maxs[phase],
+                'counts': self.histograms[phase].tolist(),
+            }
+        if len(entry['phases']) > 0:
+            self.history.append(entry)
+            content = json.dumps({'bin_edges_ms': self.edges.tolist(), 'experiences': self.history})
+            self.manager.write_to_file((self.histograms_file_name, self.log_folder, content), append=False, binary=False)
+        self.reset(phases)
+
+    # Training
+    def before_training_exp(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self.training_exp_id = strategy.experience.current_experience
+
+    def before_training_epoch(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._mark = self._now(strategy)
+
+    def before_training_iteration(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._record('data', self._mark, self._now(strategy))
+
+    def before_forward(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._start = self._now(strategy)
+
+    def after_forward(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._record('forward', self._start, self._now(strategy))
+
+    def before_backward(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._start = self._now(strategy)
+
+    def after_backward(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._record('backward', self._start, self._now(strategy))
+
+    def before_update(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._start = self._now(strategy)
+
+    def after_update(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._record('optimizer', self._start, self._now(strategy))
+
+    def after_training_iteration(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._mark = self._now(strategy)
+
+    def after_training_exp(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._dump(self.PHASES)
+
+    # Evaluation
+    def before_eval_exp(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._mark = self._now(strategy)
+
+    def before_eval_iteration(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._start = self._now(strategy)
+        self._record('eval_data', self._mark, self._start)
+
+    def after_eval_iteration(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._mark = self._now(strategy)
+        self._record('eval', self._start, self._mark)
+
+    def after_eval(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._dump(self.EVAL_PHASES)
+
+
+class ProfilerPlugin(SupervisedPlugin):
+    """
+    Wraps a window of training minibatches of a chosen experience in torch.profiler
+    (CPU and, if available, CUDA activities, with memory profiling). When the window ends,
+    a Chrome trace (viewable in chrome://tracing or Perfetto) and a summary of the
+    top operators by time and by memory are written in the log folder.
+    Only one window is profiled per experiment, since traces are large and profiling
+    slows down training significantly.
+    """
+
+    TRACE_FILE_NAME = 'profiler_trace.json'
+    SUMMARY_FILE_NAME = 'profiler_summary.txt'
+
+    _MEMORY_SORT_KEY = 'self_cpu_memory_usage'
+
+    def __init__(self, log_folder: list[str], experience: int = 0, start_iteration: int = 0,
+                 num_iterations: int = None, row_limit: int = 30, sort_by: str = 'self_cpu_time_total',
+                 record_shapes: bool = False, with_stack: bool = False):
+        """
+        :param experience: Id of the training experience to profile.
+        :param start_iteration: First minibatch of the window (counted from the beginning of the experience).
+        :param num_iterations: Number of minibatches in the window (None for the whole experience).
+        :param row_limit: Number of operators in each table of the summary.
+        :param sort_by: Key for sorting operators by time (see torch.autograd.profiler_util.EventList.table).
+        """
+        super().__init__()
+        self.log_folder = log_folder
+        self.manager = BaseDataManager.get()
+        self.experience = experience
+        self.start_iteration = start_iteration
+        self.num_iterations = num_iterations
+        self.row_limit = row_limit
+        self.sort_by = sort_by
+        self.record_shapes = record_shapes
+        self.with_stack = with_stack
+
+        self._iteration: int | None = None  # current minibatch in the profiled experience
+        self._profiler: profile | None = None
+        self.done = False
+
+    @staticmethod
+    def activities() -> list[ProfilerActivity]:
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        return activities
+
+    def _start(self):
+        self._profiler = profile(
+            activities=self.activities(), profile_memory=True,
+            record_shapes=self.record_shapes, with_stack=self.with_stack,
+        )
+        self._profiler.start()
+
+    def _stop(self):
+        profiler, self._profiler = self._profiler, None
+        profiler.stop()
+        self.done = True
+
+        # export_chrome_trace writes only to a local path, so the trace is copied through data manager
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            profiler.export_chrome_trace(path)
+            writer = self.manager.get_file_writer(self.TRACE_FILE_NAME, self.log_folder, append=False, binary=True)
+            with writer, open(path, 'rb') as fp:
+                shutil.copyfileobj(fp, writer)
+        finally:
+            os.remove(path)
+
+        averages = profiler.key_averages()
+        summary = '\n'.join([
+            f"Training experience {self.experience}, iterations {self.start_iteration}"
+            f"-{self.start_iteration + self._profiled_iterations() - 1}",
+            '', f"Top operators by {self.sort_by}:",
+            averages.table(sort_by=self.sort_by, row_limit=self.row_limit),
+            '', f"Top operators by {self._MEMORY_SORT_KEY}:",
+            averages.table(sort_by=self._MEMORY_SORT_KEY, row_limit=self.row_limit),
+        ])
+        self.manager.write_to_file((self.SUMMARY_FILE_NAME, self.log_folder, summary), append=False, binary=False)
+
+    def _profiled_iterations(self) -> int:
+        return max(self._iteration - self.start_iteration, 0)
+
+    def before_training_exp(self, strategy: SupervisedTemplate, *args, **kwargs):
+        if not self.done and strategy.experience.current_experience == self.experience:
+            self._iteration = 0
+
+    def before_training_iteration(self, strategy: SupervisedTemplate, *args, **kwargs):
+        if self._iteration == self.start_iteration and self._profiler is None:
+            self._start()
+
+    def after_training_iteration(self, strategy: SupervisedTemplate, *args, **kwargs):
+        if self._iteration is None:
+            return
+        self._iteration += 1
+        if self._profiler is not None and self.num_iterations is not None \
+                and self._profiled_iterations() >= self.num_iterations:
+            self._stop()
+
+    def after_training_exp(self, strategy: SupervisedTemplate, *args, **kwargs):
+        if self._profiler is not None:     # window ending after the last minibatch
+            self._stop()
+        self._iteration = None
+
+
+def _state_size(obj, seen: set,  depth: int = 0, max_depth: int = 8) -> tuple[int, int]:
+    """
+    Walks tensors, modules, containers and avalanche objects reachable from obj.
+    :param seen: Ids of visited objects and storages of counted tensors, shared between
+    calls so that tensors reachable from more than one object are counted once.
+    :return: A couple (tensor bytes, dataset samples).
+    """
+    if depth > max_depth or obj is None or isinstance(obj, (str, bytes, int, float, bool)):
+        return 0, 0
+    if isinstance(obj, torch.Tensor):
+        key = ('tensor', obj.data_ptr())
+        if key[1] == 0 or key in seen:
+            return 0, 0
+        seen.add(key)
+        return obj.element_size() * obj.nelement(), 0
+    if id(obj) in seen or isinstance(obj, (BaseTemplate, EvaluationPlugin)):
+        return 0, 0
+    seen.add(id(obj))
+    if isinstance(obj, Dataset):     # e.g. replay buffers, which mostly refer to the original data
+        return 0, len(obj) if hasattr(obj, '__len__') else 0
+    if isinstance(obj, torch.nn.Module):
+        items = obj.state_dict(keep_vars=True).values()
+    elif isinstance(obj, dict):
+        items = obj.values()
+    elif isinstance(obj, (list, tuple, set)):
+        items = obj
+    elif type(obj).__module__.startswith('avalanche.') and hasattr(obj, '__dict__'):
+        items = vars(obj).values()
+    else:
+        return 0, 0
+    total_bytes, total_samples = 0, 0
+    for item in items:
+        item_bytes, item_samples = _state_size(item, seen, depth + 1, max_depth)
+        total_bytes += item_bytes
+        total_samples += item_samples
+    return total_bytes, total_samples
+
+
+class MemoryTrackingPlugin(SupervisedPlugin):
+    """
+    Records, for each training experience, the peak resident memory of the process, the peaks
+    of the CUDA allocator (when training on GPU) and the size of the state held by the strategy:
+    model, optimizer state and the state of each plugin (e.g. EWC importances, LwF previous model,
+    replay buffers, for which the number of samples is also reported).
+    Rows are appended to a csv file and to a metrics store (the 'memory' metrics table), and the
+    per-plugin sizes are written in a json file. State sizes are measured at the end of each
+    call to train(), after all plugins have updated their state.
+    """
+
+    SUMMARY_FILE_NAME = 'memory_usage.csv'
+    DETAILS_FILE_NAME = 'memory_usage.json'
+
+    COLUMNS = (
+        'training_exp', 'peak_rss_bytes', 'max_rss_bytes', 'cuda_peak_allocated_bytes',
+        'cuda_peak_reserved_bytes', 'model_bytes', 'optimizer_state_bytes', 'plugins_state_bytes', 'buffer_samples',
+    )
+
+    def __init__(self, log_folder: list[str], sample_every: int = 10):
+        """
+        :param sample_every: Resident memory is sampled every this number of minibatches
+        (and at the beginning and at the end of each experience).
+        """
+        super().__init__()
+        self.log_folder = log_folder
+        self.manager = BaseDataManager.get()
+        self.sample_every = sample_every
+        self.process = psutil.Process()
+
+        self.training_exp_id = None
+        self._iteration = 0
+        self._peak_rss = 0
+        self._pending: list[TDesc] = []     # experiences trained in the current call to train()
+        self.history: list[TDesc] = []
+
+        self.manager.create_file((self.SUMMARY_FILE_NAME, self.log_folder, None))
+        self.manager.print_to_file(self.SUMMARY_FILE_NAME, self.log_folder, *self.COLUMNS,
+                                   sep=',', append=False, flush=True)
+        self.store = MetricsStoreWriter(self.manager, self.SUMMARY_FILE_NAME, self.log_folder, list(self.COLUMNS))
+
+    def _sample_rss(self):
+        self._peak_rss = max(self._peak_rss, self.process.memory_info().rss)
+
+    @staticmethod
+    def _cuda_device(strategy: SupervisedTemplate) -> torch.device | None:
+        device = torch.device(strategy.device)
+        return device if device.type == 'cuda' else None
+
+    def before_training_exp(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self.training_exp_id = strategy.experience.current_experience
+        self._iteration = 0
+        self._peak_rss = 0
+        self._sample_rss()
+        device = self._cuda_device(strategy)
+        if device is not None:
+            torch.cuda.reset_peak_memory_stats(device)
+
+    def after_training_iteration(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._iteration += 1
+        if self._iteration % self.sample_every == 0:
+            self._sample_rss()
+
+    def after_training_exp(self, strategy: SupervisedTemplate, *args, **kwargs):
+        self._sample_rss()
+        device = self._cuda_device(strategy)
+        self._pending.append({
+            'training_exp': self.training_exp_id,
+            'peak_rss_bytes': self._peak_rss,
+            # ru_maxrss is in kilobytes on Linux and it is the peak over the whole process life
+            'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            'cuda_peak_allocated_bytes': torch.cuda.max_memory_allocated(device) if device is not None else None,
+            'cuda_peak_reserved_bytes': torch.cuda.max_memory_reserved(device) if device is not None else None,
+        })
+
+    def after_training(self, strategy: SupervisedTemplate, *args, **kwargs):
+        if len(self._pending) == 0:
+            return
+        seen = set()
+        model_bytes, _ = _state_size(strategy.model, seen)
+        optimizer_bytes, _ = _state_size(dict(strategy.optimizer.state), seen)
+        plugins, plugins_bytes, buffer_samples = {}, 0, 0
+        # strategy-level state (e.g. the cumulative dataset of Cumulative strategy)
+        for name, item in [(type(strategy).__name__, getattr(strategy, 'dataset', None))] + \
+                [(type(plugin).__name__, plugin) for plugin in strategy.plugins if plugin is not self]:
+            item_bytes, item_samples = _state_size(item, seen)
+            if item_bytes > 0 or item_samples > 0:
+                plugins[name] = {'bytes': item_bytes, 'samples': item_samples}
+            plugins_bytes += item_bytes
+            buffer_samples += item_samples
+
+        for entry in self._pending:
+            entry.update({
+                'model_bytes': model_bytes, 'optimizer_state_bytes': optimizer_bytes,
+                'plugins_state_bytes': plugins_bytes, 'buffer_samples': buffer_samples,
+            })
+            row = [entry[column] for column in self.COLUMNS]
+            self.manager.print_to_file(self.SUMMARY_FILE_NAME, self.log_folder,
+                                       *['' if value is None else value for value in row],
+                                       sep=',', append=True, flush=True)
+            self.store.append(*row)
+            self.history.append(dict(entry, plugins=plugins))
+        self.store.flush()
+        self._pending = []
+        content = json.dumps({'experiences': self.history})
+        self.manager.write_to_file((self.DETAILS_FILE_NAME, self.log_folder, content), append=False, binary=False)
+
+    def close(self):
+        self.store.close()
+
+
+__all__ = [
+    'PhaseTimingPlugin',
+    'ProfilerPlugin',
+    'MemoryTrackingPlugin',
+]
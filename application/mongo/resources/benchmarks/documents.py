@@ -8,6 +8,7 @@ from application.resources.contexts import UserWorkspaceResourceContext
 from application.resources.base import DataType, ReferrableDataType, BaseMetadata
 
 from application.mongo.locking import RWLockableDocument
+from application.mongo.indexes import query_index
 from application.mongo.mongo_base_metadata import MongoBaseMetadata
 
 from application.mongo.resources.mongo_base_configs import *
@@ -19,6 +20,7 @@ class BenchmarkMetadata(MongoBaseMetadata):
     pass
 
 
+@query_index('build_config.data_repository')
 class MongoBenchmarkConfig(MongoResourceConfig):
 
     _COLLECTION = 'benchmarks'
@@ -3,12 +3,16 @@ from __future__ import annotations
 
 import schema as sch
 import io
+import warnings
+import numpy as np
+import torch
 from PIL import Image
 
 from torchvision.transforms import ToTensor, CenterCrop, Normalize, Compose, \
     RandomCrop, RandomHorizontalFlip
 
 from application.utils import TBoolStr, TDesc, abstractmethod, t
+from application.validation import invalidate_compiled_schemas
 from application.database import db
 from application.resources.contexts import ResourceContext
 from application.mongo.resources.mongo_base_configs import *
@@ -30,6 +34,7 @@ class TransformConfig(MongoEmbeddedBuildConfig):
             if name is None:
                 name = cls.__name__
             TransformConfig.__CONFIGS__[name] = cls
+            invalidate_compiled_schemas(cls)
             return cls
 
         return registerer
@@ -92,6 +97,49 @@ class BytesToGrayscale:
         return Image.open(io.BytesIO(image_bytes)).convert('L')
 
 
+# Special transform for converting raw buffers to tensors without passing through PIL
+class BytesToTensor:
+    """
+    Wraps either a NumPy `.npy` buffer or a raw buffer (with given shape and dtype)
+    into a tensor. Raw buffers are wrapped without copying data.
+    """
+
+    _NPY_MAGIC = b'\x93NUMPY'
+    _DTYPE_KINDS = 'biuf'   # boolean, (unsigned) integer and floating point
+
+    def __init__(self, shape: list[int] = None, dtype: str = 'float32'):
+        """
+        :raises ValueError: If shape is not a list of positive integers, or dtype
+        is not the name of a numeric NumPy dtype.
+        """
+        if shape is not None and not (
+                isinstance(shape, list) and
+                all(isinstance(dim, int) and not isinstance(dim, bool) and dim > 0 for dim in shape)
+        ):
+            raise ValueError(f"Shape must be a list of positive integers, got '{shape}'.")
+        if not isinstance(dtype, str):
+            raise ValueError(f"Dtype must be a string, got '{dtype}'.")
+        try:
+            self.dtype = np.dtype(dtype)
+        except TypeError:
+            raise ValueError(f"Unknown dtype '{dtype}'.")
+        if self.dtype.kind not in self._DTYPE_KINDS:
+            raise ValueError(f"Dtype '{dtype}' is not numeric.")
+        self.shape = tuple(shape) if shape is not None else None
+
+    def __call__(self, tensor_bytes):
+        if tensor_bytes[:len(self._NPY_MAGIC)] == self._NPY_MAGIC:
+            array = np.load(io.BytesIO(tensor_bytes), allow_pickle=False)
+        elif self.shape is None:
+            raise ValueError("Missing shape for raw tensor buffer.")
+        else:
+            array = np.frombuffer(tensor_bytes, dtype=self.dtype).reshape(self.shape)
+        with warnings.catch_warnings():
+            # buffers from requests are read-only, but tensors are never modified in place here
+            warnings.simplefilter('ignore', UserWarning)
+            return torch.from_numpy(array)
+
+
 @TransformConfig.register_transform_config('BytesToPIL')
 class BytesToPILConfig(TransformConfig):
 
@@ -801,6 +849,7 @@ __all__ = [
     'BytesToPIL',
     'BytesToRGB',
     'BytesToGrayscale',
+    'BytesToTensor',
 
     # Transform Configs
     'TransformConfig',
@@ -3,7 +3,7 @@ from __future__ import annotations
 import torch
 import io
 
-from application.utils import t, get_device
+from application.utils import t, get_model_device
 
 from application.resources.base import DataType
 from application.resources.datatypes import DeployedModel
@@ -12,6 +12,55 @@ from application.mongo.resources.mongo_base_configs import *
 from .documents import *
 
 
+class InputShapeError(ValueError):
+    """
+    Raised when prediction inputs cannot be decoded or batched together.
+    """
+    pass
+
+
+def predict_tensors(model, input_data, transform, device=None) -> dict[str, list[int]]:
+    """
+    Predictions for 'tensor' mode: each file is a batch of already preprocessed inputs
+    (a `.npy` file or a raw buffer of the shape given in the request info), and all
+    files are concatenated into a single (float32) batch.
+    :param transform: A BytesToTensor that wraps each file into a batch.
+    :param device: Device of the model (defaults to that of its parameters).
+    :return: A dictionary filename -> list of predicted class ids.
+    :raises InputShapeError: If a file cannot be decoded, or batches have different item shapes.
+    """
+    batches: dict[str, torch.Tensor] = {}
+    item_shape = None
+    for inp in input_data:
+        try:
+            batch = transform(inp.read())
+        except ValueError as ex:
+            raise InputShapeError(f"Invalid tensor in '{inp.filename}': {ex}")
+        if batch.dim() < 1:
+            raise InputShapeError(f"Tensor in '{inp.filename}' must have a batch dimension.")
+        if item_shape is None:
+            item_shape = batch.shape[1:]
+        elif batch.shape[1:] != item_shape:
+            raise InputShapeError(
+                f"Tensor in '{inp.filename}' has items of shape {list(batch.shape[1:])}, "
+                f"expected {list(item_shape)}."
+            )
+        batches[inp.filename] = batch
+    device = get_model_device(model) if device is None else device
+    batch_tensor = torch.cat(list(batches.values())).float().to(device)
+    model.eval()
+    with torch.no_grad():
+        outputs: torch.Tensor = model(batch_tensor)
+    _, y_hat = outputs.max(1)
+    y_hat = y_hat.to('cpu').numpy().astype(int)
+    result: dict[str, list[int]] = {}
+    i = 0
+    for filename, batch in batches.items():
+        result[filename] = [int(y) for y in y_hat[i:i + len(batch)]]
+        i += len(batch)
+    return result
+
+
 @DataType.set_resource_type()
 class MongoDeployedModel(DeployedModel):
 
@@ -30,7 +79,8 @@ class MongoDeployedModel(DeployedModel):
             output_bytes: dict[str, int] = {}
             # input_bytes = [inp.read() for inp in input_data]
             tensors = [transform(item_bytes).unsqueeze(0) for item_bytes in input_bytes.values()]
-            device = get_device()
+            # quantized and optimized models run on CPU
+            device = get_model_device(model)
             tensors = [tensor.to(device) for tensor in tensors]
             batch_tensor = torch.stack(tensors)
             batch_tensor = batch_tensor.to(device)
@@ -43,6 +93,8 @@ class MongoDeployedModel(DeployedModel):
                 output_bytes[filename] = int(y_hat[i])
                 i += 1
             return output_bytes
+        elif mode == 'tensor':
+            return predict_tensors(model, input_data, transform)
         elif mode == 'zip':
             return NotImplemented
         else:
@@ -57,5 +109,7 @@ class MongoDeployedModel(DeployedModel):
 
 
 __all__ = [
+    'InputShapeError',
+    'predict_tensors',
     'MongoDeployedModel',
 ]
\ No newline at end of file
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import hashlib
+import schema as sch
 import torch
 from datetime import datetime
+from threading import RLock
+from cachetools import TTLCache
 
 from application.database import *
 from application.utils import t, TBoolExc, TDesc, get_device, TBoolStr, auto_tboolexc
@@ -20,13 +24,34 @@ class MongoDeployedModelMetadata(MongoBaseMetadata):
     pass
 
 
+# In-process prediction result caches (deployment id -> cache)
+_PREDICTION_CACHES: dict[str, TTLCache] = {}
+_PREDICTION_CACHES_LOCK = RLock()
+
+
 class MongoDeployedModelConfig(MongoBaseResourceConfig):
 
     path = db.StringField(default=None)
+    deploy_report = db.DictField(default=None)     # size/latency of quantized/optimized artifacts
+    deploy_version = db.IntField(default=0)         # incremented on each redeploy
+    prediction_cache = db.DictField(default=None)   # {'ttl': <seconds>, 'max_entries': <int>} or None
+
+    _DFL_PREDICTION_CACHE_TTL = 300
+    _DFL_PREDICTION_CACHE_MAX_ENTRIES = 1024
+
+    # validates 'prediction_cache' on both create and update (None disables the cache)
+    _PREDICTION_CACHE_SCHEMA = sch.Schema(sch.Or(None, {
+        sch.Optional('ttl'): sch.And(int, lambda x: x > 0),
+        sch.Optional('max_entries'): sch.And(int, lambda x: x > 0),
+    }))
 
     def to_dict(self, links=True) -> TDesc:
         data = super().to_dict(links=links)
         data['path'] = self.get_path()
+        if self.deploy_report is not None:
+            data['deploy_report'] = self.deploy_report
+        if self.prediction_cache is not None:
+            data['prediction_cache'] = self.prediction_cache
         return data
 
     @classmethod
@@ -35,6 +60,7 @@ class MongoDeployedModelConfig(MongoBaseResourceConfig):
         data.update({
             'path': str,
             'deploy': {str: object},
+            sch.Optional('prediction_cache'): cls._PREDICTION_CACHE_SCHEMA,
         })
         return data
 
@@ -69,14 +95,75 @@ class MongoDeployedModelConfig(MongoBaseResourceConfig):
     def base_dir(self) -> list[str]:
         return self.workspace.models_base_dir_parents() + [self.workspace.models_base_dir()]
 
+    def optimized_model_name(self) -> str:
+        return BaseModelDeployer.optimized_model_name(self.name)
+
+    def quantized_model_name(self) -> str:
+        return BaseModelDeployer.quantized_model_name(self.name)
+
     # ok
     def get_model(self) -> torch.nn.Module:
         path_dirs = self.base_dir() + self.get_path_list()
         manager = BaseDataManager.get()
+        optimized_name = self.optimized_model_name()
+        if manager.file_exists(optimized_name, path_dirs):
+            # prefer optimized TorchScript artifact if it has been produced on deploy: since
+            # optimize_for_inference produces CPU-specific (e.g. MKLDNN) graphs, it runs only on CPU
+            model_fd = manager.get_file_pointer(optimized_name, path_dirs)
+            return torch.jit.load(model_fd, map_location='cpu')
+        quantized_name = self.quantized_model_name()
+        if manager.file_exists(quantized_name, path_dirs):
+            # quantized models run only on CPU
+            model_fd = manager.get_file_pointer(quantized_name, path_dirs)
+            return torch.load(model_fd, map_location='cpu')
         model_fd = manager.get_file_pointer(self.name + '.pt', path_dirs)
         model = torch.load(model_fd).to(get_device())
         return model
 
+    # Prediction results cache
+    def __get_prediction_cache(self) -> TTLCache | None:
+        if self.prediction_cache is None:
+            return None
+        ttl = self.prediction_cache.get('ttl', self._DFL_PREDICTION_CACHE_TTL)
+        max_entries = self.prediction_cache.get('max_entries', self._DFL_PREDICTION_CACHE_MAX_ENTRIES)
+        cache = _PREDICTION_CACHES.get(str(self.id))
+        if cache is None or cache.ttl != ttl or cache.maxsize != max_entries:
+            cache = TTLCache(maxsize=max_entries, ttl=ttl)
+            _PREDICTION_CACHES[str(self.id)] = cache
+        return cache
+
+    def prediction_cache_key(self, transform_fingerprint: str, data: bytes) -> tuple[int, str, str]:
+        """
+        Cache key for the prediction on the given input: (model version, transform fingerprint, input hash).
+        """
+        return self.deploy_version, transform_fingerprint, hashlib.sha256(data).hexdigest()
+
+    def get_cached_predictions(self, keys: dict[str, tuple]) -> dict[str, t.Any]:
+        """
+        :param keys: A dictionary filename -> cache key.
+        :return: A dictionary filename -> cached prediction for cache hits only.
+        """
+        result = {}
+        with _PREDICTION_CACHES_LOCK:
+            cache = self.__get_prediction_cache()
+            if cache is not None:
+                for filename, key in keys.items():
+                    value = cache.get(key)
+                    if value is not None:
+                        result[filename] = value
+        return result
+
+    def cache_predictions(self, keys: dict[str, tuple], predictions: dict[str, t.Any]):
+        with _PREDICTION_CACHES_LOCK:
+            cache = self.__get_prediction_cache()
+            if cache is not None:
+                for filename, value in predictions.items():
+                    cache[keys[filename]] = value
+
+    def clear_prediction_cache(self):
+        with _PREDICTION_CACHES_LOCK:
+            _PREDICTION_CACHES.pop(str(self.id), None)
+
     def set_model(self, model: torch.nn.Module) -> TBoolExc:
         path_dirs = self.base_dir() + self.get_path_list()
         manager = BaseDataManager.get()
@@ -119,15 +206,18 @@ class MongoDeployedModelConfig(MongoBaseResourceConfig):
             deployer = BaseModelDeployer.get_by_name(deploy_data)
             if deployer is None:
                 return None
-            result, msg = deployer.deploy_model(deploy_data, context, name, path)
+            report = {}
+            result, exc = deployer.deploy_model(deploy_data, context, name, path, report=report)
             if not result:
-                return f"Failed to deploy model: '{msg}'"
+                return f"Failed to deploy model: '{exc}'"
             # noinspection PyArgumentList
             obj = cls(
                 name=name,
                 description=description,
                 owner=owner,
                 path=path,
+                deploy_report=report or None,
+                prediction_cache=data.get('prediction_cache'),
                 workspace=workspace,
                 metadata=cls.meta_type()(**metadata),
             )
@@ -156,6 +246,16 @@ class MongoDeployedModelConfig(MongoBaseResourceConfig):
 
     def update(self, data, context, save=True) -> TBoolStr:
         new_deployment_data = data.pop('deploy', None)
+        if 'prediction_cache' in data:
+            try:
+                prediction_cache = self._PREDICTION_CACHE_SCHEMA.validate(data.pop('prediction_cache'))
+            except sch.SchemaError as ex:
+                return False, f"Invalid prediction cache config: '{ex}'."
+            with self.resource_write(locked=False, parents_locked=False):
+                self.prediction_cache = prediction_cache
+                self.clear_prediction_cache()
+                if save:
+                    self.save()
         if new_deployment_data is None:
             new_name = data.get('name')
             if new_name is not None:
@@ -170,13 +270,19 @@ class MongoDeployedModelConfig(MongoBaseResourceConfig):
             if deployer is None:
                 return False, "Deployer name is wrong or not existing."
             # First deploy new model, then delete old one (if necessary)
-            result, msg = deployer.deploy_model(new_deployment_data, context, name, path)
+            report = {}
+            result, exc = deployer.deploy_model(new_deployment_data, context, name, path, report=report)
             if not result:
-                return result, f"Failed to deploy model: '{msg}'"
+                return result, f"Failed to deploy model: '{exc}'"
             # if another path is provided, delete previous model, otherwise retain it
             if self.path != path:
                 self.__manager_delete()
             self.path = path    # update path
+            self.deploy_report = report or None
+            self.deploy_version += 1    # invalidates cached predictions of the previous model
+            self.clear_prediction_cache()
+            if save:
+                self.save()
             return super().update(data, context, save=save)
 
     def __manager_rename(self, new_name: str) -> TBoolStr:
@@ -187,6 +293,14 @@ class MongoDeployedModelConfig(MongoBaseResourceConfig):
         fname = self.name + '.pt'
         parents = dirs
         manager.rename_file(old_name=fname, parents=parents, new_name=new_name+'.pt')
+        optimized_name = self.optimized_model_name()
+        if manager.file_exists(optimized_name, parents):
+            manager.rename_file(old_name=optimized_name, parents=parents,
+                                new_name=BaseModelDeployer.optimized_model_name(new_name))
+        quantized_name = self.quantized_model_name()
+        if manager.file_exists(quantized_name, parents):
+            manager.rename_file(old_name=quantized_name, parents=parents,
+                                new_name=BaseModelDeployer.quantized_model_name(new_name))
         return True, None
 
     def __manager_delete(self) -> TBoolStr:
@@ -197,6 +311,12 @@ class MongoDeployedModelConfig(MongoBaseResourceConfig):
         fname = self.name + '.pt'
         parents = dirs
         manager.delete_file(fname, parents)
+        optimized_name = self.optimized_model_name()
+        if manager.file_exists(optimized_name, parents):
+            manager.delete_file(optimized_name, parents)
+        quantized_name = self.quantized_model_name()
+        if manager.file_exists(quantized_name, parents):
+            manager.delete_file(quantized_name, parents)
         return True, None
 
     @auto_tboolexc
@@ -204,6 +324,7 @@ class MongoDeployedModelConfig(MongoBaseResourceConfig):
         with self.resource_delete(locked, parents_locked):
             db.Document.delete(self)
             self.__manager_delete()
+            self.clear_prediction_cache()
             return True, None
 
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 import schema as sch
 
 from application.database import db
+from application.data_managing import BaseDataManager
 from application.utils import TBoolStr, t, TDesc
 from application.models import User, Workspace
 
@@ -14,16 +15,34 @@ from application.mongo.resources.mongo_base_configs import *
 from application.mongo.models import MongoUser, MongoWorkspace
 from application.mongo.resources.strategies import MongoStrategyConfig
 from application.mongo.resources.benchmarks import MongoBenchmarkConfig
+from application.mongo.plugins import ProfilerPlugin
 
 
 @MongoBuildConfig.register_build_config('ExperimentBuild')
 class StandardExperimentBuildConfig(MongoBuildConfig):
+    """
+    Experiment build config. The optional "profile" section:
+    {
+        "profile": {
+            "experience": <int>,        # training experience to profile, default 0
+            "start_iteration": <int>,   # first profiled minibatch of the experience, default 0
+            "num_iterations": <int>,    # number of profiled minibatches, default whole experience
+            "row_limit": <int>,         # number of operators in the summary tables, default 30
+            "sort_by": <str>,           # e.g. "self_cpu_time_total" (default), "cpu_time_total"
+            "record_shapes": <bool>,    # default false
+            "with_stack": <bool>        # default false
+        }
+    }
+    wraps the chosen window in torch.profiler and stores a Chrome trace and a summary
+    of the top operators in the logs of each execution.
+    """
 
     # Fields
     strategy = db.ReferenceField(MongoStrategyConfig)
     benchmark = db.ReferenceField(MongoBenchmarkConfig)
     status = db.StringField(default=BaseCLExperiment.CREATED)
     run_config = db.StringField(default=BaseCLExperimentRunConfig.DFL_RUN_CONFIG_NAME)
+    profile = db.DictField(default=None)
 
     def to_dict(self, links=True) -> TDesc:
         return {}
@@ -35,6 +54,15 @@ class StandardExperimentBuildConfig(MongoBuildConfig):
             'strategy': str,
             'benchmark': str,
             sch.Optional('run_config'): str,
+            sch.Optional('profile'): {
+                sch.Optional('experience'): sch.And(int, lambda x: x >= 0),
+                sch.Optional('start_iteration'): sch.And(int, lambda x: x >= 0),
+                sch.Optional('num_iterations'): sch.And(int, lambda x: x > 0),
+                sch.Optional('row_limit'): sch.And(int, lambda x: x > 0),
+                sch.Optional('sort_by'): str,
+                sch.Optional('record_shapes'): bool,
+                sch.Optional('with_stack'): bool,
+            },
         })
         return data
 
@@ -44,7 +72,7 @@ class StandardExperimentBuildConfig(MongoBuildConfig):
 
     @classmethod
     def get_optionals(cls) -> set[str]:
-        return (super().get_optionals() or set()).union({'run_config'})
+        return (super().get_optionals() or set()).union({'run_config', 'profile'})
 
     @staticmethod
     def target_type() -> t.Type[DataType]:
@@ -94,8 +122,12 @@ class StandardExperimentBuildConfig(MongoBuildConfig):
         return cls(**params)
 
     def build(self, context: ResourceContext, locked=False, parents_locked=False):
+        _, log_folder = context.head()  # consumed by strategy build
         strategy = self.strategy.build(context, locked=locked, parents_locked=parents_locked)
         benchmark = self.benchmark.build(context, locked=locked, parents_locked=parents_locked)
+        if self.profile is not None:
+            profiler = ProfilerPlugin([BaseDataManager.get().get_root()] + log_folder, **self.profile)
+            strategy.get_value().plugins.append(profiler)
         # noinspection PyArgumentList
         return self.target_type()(strategy, benchmark, self.status, self.run_config)
 
@@ -12,6 +12,8 @@ from application.resources.base import DataType, BaseMetadata
 from application.resources.datatypes import BaseCLExperiment
 
 from application.mongo.locking import RWLockableDocument
+from application.mongo.indexes import query_index
+from application.mongo.utils import prefetch_references
 from application.mongo.mongo_base_metadata import MongoBaseMetadata
 
 from application.mongo.base import MongoBaseUser, MongoBaseWorkspace
@@ -26,6 +28,8 @@ class CLExperimentMetadata(MongoBaseMetadata):
     pass
 
 
+@query_index('build_config.strategy')
+@query_index('build_config.benchmark')
 class MongoCLExperimentConfig(MongoResourceConfig):
 
     _COLLECTION = 'experiments'
@@ -34,11 +38,14 @@ class MongoCLExperimentConfig(MongoResourceConfig):
         'collection': _COLLECTION,
         'indexes': [
             {'fields': ('owner', 'workspace', 'name'), 'unique': True}
-        ]
+        ],
+        'strict': False,    # ignores legacy embedded 'executions' until migrated
     }
 
-    executions = db.ListField(db.EmbeddedDocumentField(MongoCLExperimentExecutionConfig), default=[])
-    current_exec_id = db.IntField(default=0)
+    current_exec_id = db.IntField(default=0)   # executions are stored in MongoCLExperimentExecutionConfig
+
+    # Maximum number of executions summaries included in to_dict() (use get_executions for history)
+    _DICT_EXECUTIONS_LIMIT = 10
 
     @staticmethod
     def meta_type() -> t.Type[BaseMetadata]:
@@ -71,11 +78,50 @@ class MongoCLExperimentConfig(MongoResourceConfig):
     def run_config(self) -> str:
         return self.build_config.run_config
 
-    def get_execution(self, exec_id: int):
+    def get_execution(self, exec_id: int, summary: bool = False) -> MongoCLExperimentExecutionConfig:
+        """
+        :param exec_id: Execution id.
+        :param summary: If True, results payload is not retrieved (e.g. for status checks).
+        """
         if exec_id > self.current_exec_id:
             raise ValueError(f"{exec_id} is out of existing executions range.")
-        else:
-            return self.executions[exec_id-1]
+        fields = MongoCLExperimentExecutionConfig.SUMMARY_FIELDS if summary else None
+        executions = MongoCLExperimentExecutionConfig.get(self, exec_id=exec_id, fields=fields)
+        if len(executions) < 1:
+            raise ValueError(f"Execution {exec_id} does not exist.")
+        return executions[0]
+
+    def get_executions(self, skip: int = 0, limit: int = None,
+                       summary: bool = True) -> list[MongoCLExperimentExecutionConfig]:
+        fields = MongoCLExperimentExecutionConfig.SUMMARY_FIELDS if summary else None
+        return MongoCLExperimentExecutionConfig.get(self, skip=skip, limit=limit, fields=fields)
+
+    @classmethod
+    def migrate_executions(cls) -> int:
+        """
+        Moves executions embedded in experiments (previous storage format) into
+        their own collection. Idempotent.
+        :return: Number of migrated experiments.
+        """
+        collection = cls._get_collection()
+        # noinspection PyProtectedMember
+        exec_collection = MongoCLExperimentExecutionConfig._get_collection()
+        migrated = 0
+        for document in collection.find({'executions': {'$exists': True}}, {'executions': 1}):
+            for execution in document['executions']:
+                execution['experiment'] = document['_id']
+                exec_collection.update_one(
+                    {'experiment': document['_id'], 'exec_id': execution['exec_id']},
+                    {'$setOnInsert': execution}, upsert=True,
+                )
+            collection.update_one({'_id': document['_id']}, {'$unset': {'executions': ''}})
+            migrated += 1
+        return migrated
+
+    @classmethod
+    def prefetch_page_references(cls, documents: list[MongoCLExperimentConfig]):
+        build_configs = [document.build_config for document in documents]
+        prefetch_references(build_configs, benchmark=MongoBenchmarkConfig, strategy=MongoStrategyConfig)
 
     def get_last_execution(self):
         return self.get_execution(self.current_exec_id)
@@ -112,7 +158,10 @@ class MongoCLExperimentConfig(MongoResourceConfig):
         }
         base_result['metadata']['claas_urn'] = self.claas_urn
         if not settings:
-            base_result['executions'] = [execution.to_dict() for execution in self.executions]
+            skip = max(self.current_exec_id - self._DICT_EXECUTIONS_LIMIT, 0)
+            base_result['executions'] = [
+                execution.to_dict(results=False) for execution in self.get_executions(skip=skip)
+            ]
         return base_result
     
     @auto_tboolexc
@@ -143,10 +192,24 @@ class MongoCLExperimentConfig(MongoResourceConfig):
             if self.status != BaseCLExperiment.READY:
                 raise RuntimeError("Experiment is not ready: must setup before start running!")
             else:
+                # execution is inserted first: it is not visible until current_exec_id is updated.
+                # Executions left over by a start that was interrupted before updating
+                # current_exec_id are never visible, and would collide with the new one.
+                MongoCLExperimentExecutionConfig.objects(experiment=self, exec_id__gt=self.current_exec_id).delete()
+                execution.save(force_insert=True)
+                status = self.build_config.status
                 self.build_config.status = BaseCLExperiment.RUNNING
                 self.current_exec_id += 1
-                self.executions.append(execution)
-                result = self.save()
+                try:
+                    result = self.save()
+                except Exception:
+                    result = None
+                    raise
+                finally:
+                    if not result:
+                        self.build_config.status = status
+                        self.current_exec_id -= 1
+                        execution.delete()
                 return exec_id if result else None
 
     @auto_tboolexc
@@ -164,6 +227,7 @@ class MongoCLExperimentConfig(MongoResourceConfig):
                 payload = response.get_json()
                 execution.status_code = status_code
                 execution.payload = payload
+                execution.save()
                 self.save()
                 return True, None
 
@@ -220,6 +284,7 @@ class MongoCLExperimentConfig(MongoResourceConfig):
     @auto_tboolexc
     def delete(self, context: UserWorkspaceResourceContext, locked=False, parents_locked=False) -> TBoolExc:
         with self.resource_delete(locked=locked, parents_locked=parents_locked):
+            MongoCLExperimentExecutionConfig.objects(experiment=self).delete()
             db.Document.delete(self)
             manager = BaseDataManager.get()
             dirs = self.base_dir()
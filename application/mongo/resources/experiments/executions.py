@@ -7,8 +7,41 @@ from application.data_managing import BaseDataManager
 from application.resources.contexts import UserWorkspaceResourceContext
 from application.resources.datatypes import BaseCLExperimentExecution, BaseCLExperiment
 
-
-class MongoCLExperimentExecutionConfig(BaseCLExperimentExecution, db.EmbeddedDocument):
+from application.mongo.metrics_store import query_metrics
+from application.mongo.plugins import ProfilerPlugin, MemoryTrackingPlugin
+
+
+class MongoCLExperimentExecutionConfig(BaseCLExperimentExecution, db.Document):
+    """
+    A single run of an experiment. Executions are stored in their own collection
+    (instead of being embedded in the experiment), so that experiments with many
+    runs can be fetched without loading all results.
+    """
+
+    _COLLECTION = 'executions'
+
+    # fields for status checks and history listing (results payload excluded)
+    SUMMARY_FIELDS = ('experiment', 'exec_id', 'started', 'completed', 'start_time', 'end_time', 'status_code')
+
+    # metrics tables -> results file names (see ExtendedCSVLogger and MemoryTrackingPlugin)
+    METRICS_TABLES = {
+        'train': 'train_results.csv',
+        'eval': 'eval_results.csv',
+        'memory': MemoryTrackingPlugin.SUMMARY_FILE_NAME,
+    }
+
+    # profiler outputs -> file names (see ProfilerPlugin)
+    PROFILE_FILES = {
+        'trace': ProfilerPlugin.TRACE_FILE_NAME,
+        'summary': ProfilerPlugin.SUMMARY_FILE_NAME,
+    }
+
+    meta = {
+        'collection': _COLLECTION,
+        'indexes': [
+            {'fields': ('experiment', 'exec_id'), 'unique': True}
+        ]
+    }
 
     experiment = db.ReferenceField('MongoCLExperimentConfig', required=True)
     exec_id = db.IntField(required=True)
@@ -45,6 +78,23 @@ class MongoCLExperimentExecutionConfig(BaseCLExperimentExecution, db.EmbeddedDoc
         else:
             return False, None
 
+    def get_metrics(self, table: str, columns: t.Sequence[str] = None,
+                    filters: dict[str, tuple[float | None, float | None]] = None,
+                    max_points: int = None) -> TDesc | None:
+        file_name = self.METRICS_TABLES.get(table)
+        if file_name is None:
+            raise ValueError(f"Unknown metrics table '{table}': must be one of {', '.join(self.METRICS_TABLES)}.")
+        return query_metrics(BaseDataManager.get(), file_name, self.get_logging_path(), columns, filters, max_points)
+
+    def get_profile_file(self, kind: str = 'trace'):
+        file_name = self.PROFILE_FILES.get(kind)
+        if file_name is None:
+            raise ValueError(f"Unknown profile file '{kind}': must be one of {', '.join(self.PROFILE_FILES)}.")
+        manager = BaseDataManager.get()
+        if not manager.file_exists(file_name, self.get_logging_path()):
+            return None
+        return manager.get_file_pointer(file_name, self.get_logging_path())
+
     def get_final_model(self, descriptor=False):
         manager = BaseDataManager.get()
         if descriptor:
@@ -54,8 +104,35 @@ class MongoCLExperimentExecutionConfig(BaseCLExperimentExecution, db.EmbeddedDoc
             model = manager.read_from_file(('model.pt', self.base_dir(), -1))
             return model
 
-    def to_dict(self) -> TDesc:
-        return {
+    @classmethod
+    def get(cls, experiment, exec_id: int = None, skip: int = 0, limit: int = None,
+            fields: t.Sequence[str] = None) -> list[MongoCLExperimentExecutionConfig]:
+        """
+        Retrieves executions of the given experiment ordered by exec_id.
+        :param experiment: Experiment document.
+        :param exec_id: If given, retrieves only this execution.
+        :param skip: Number of executions to skip (for pagination).
+        :param limit: Maximum number of executions to retrieve (None for all).
+        :param fields: If given, only these fields are retrieved (e.g. SUMMARY_FIELDS).
+        """
+        args = {'experiment': experiment}
+        if exec_id is not None:
+            args['exec_id'] = exec_id
+        query = cls.objects(**args).order_by('exec_id')
+        if fields is not None:
+            query = query.only(*fields)
+        if skip > 0:
+            query = query.skip(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        return list(query)
+
+    @classmethod
+    def count(cls, experiment) -> int:
+        return cls.objects(experiment=experiment).count()
+
+    def to_dict(self, results: bool = True) -> TDesc:
+        data = {
             'experiment': self.experiment.get_name(),
             'exec_id': self.exec_id,
             'claas_urn': self.claas_urn,
@@ -65,9 +142,11 @@ class MongoCLExperimentExecutionConfig(BaseCLExperimentExecution, db.EmbeddedDoc
             'end_time': self.end_time,
             'results': {
                 'status': self.status_code,
-                'payload': self.payload,
             }
         }
+        if results:
+            data['results']['payload'] = self.payload
+        return data
 
     @property
     def claas_urn(self):
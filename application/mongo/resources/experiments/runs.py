@@ -23,15 +23,33 @@ def _save_model(model: Module, model_directory: list[str] = None) -> TOptBoolAny
     return True, None
 
 
+def _close_loggers(cl_strategy: SupervisedTemplate | None):
+    """
+    Closes the strategy loggers and the plugins that write results (e.g. MemoryTrackingPlugin),
+    so that buffered results are written also on failure.
+    """
+    evaluator = getattr(cl_strategy, 'evaluator', None)
+    closeables = list(getattr(evaluator, 'loggers', []))
+    closeables += [plugin for plugin in getattr(cl_strategy, 'plugins', []) if callable(getattr(plugin, 'close', None))]
+    for item in closeables:
+        # noinspection PyBroadException
+        try:
+            item.close()
+        except Exception:
+            traceback.print_exception(*sys.exc_info())
+
+
 @BaseCLExperimentRunConfig.register_default_run_config()
 @BaseCLExperimentRunConfig.register_run_config('FixedTestSet')
 class StdTrainTestRunConfig(BaseCLExperimentRunConfig):
 
     @classmethod
     def run(cls, experiment: BaseCLExperiment, model_directory: list[str] = None) -> TOptBoolAny:
+        cl_strategy = None
         try:
             cl_scenario: GenericCLScenario = experiment.get_benchmark().get_value()
             cl_strategy: SupervisedTemplate = experiment.get_strategy().get_value()
+            dataloader_args = experiment.get_strategy().get_dataloader_args()
 
             # noinspection PyUnresolvedReferences
             train_stream = cl_scenario.train_stream
@@ -41,14 +59,16 @@ class StdTrainTestRunConfig(BaseCLExperimentRunConfig):
             print(f"Using {cl_strategy.__class__.__name__} strategy ...")
             results: list[TDesc] = []
             for experience in train_stream:
-                cl_strategy.train(experience)
-                results.append(cl_strategy.eval(test_stream))
+                cl_strategy.train(experience, **dataloader_args)
+                results.append(cl_strategy.eval(test_stream, **dataloader_args))
 
             model_saved, exc = _save_model(cl_strategy.model, model_directory)
             return model_saved, results if model_saved else exc
         except Exception as ex:
             traceback.print_exception(*sys.exc_info())
             return False, ex
+        finally:
+            _close_loggers(cl_strategy)
 
 
 @BaseCLExperimentRunConfig.register_run_config('GrowingTestSet')
@@ -56,9 +76,11 @@ class GrowingTestSetRunConfig(BaseCLExperimentRunConfig):
 
     @classmethod
     def run(cls, experiment: BaseCLExperiment, model_directory: list[str] = None) -> TOptBoolAny:
+        cl_strategy = None
         try:
             cl_scenario: GenericCLScenario = experiment.get_benchmark().get_value()
             cl_strategy: SupervisedTemplate = experiment.get_strategy().get_value()
+            dataloader_args = experiment.get_strategy().get_dataloader_args()
 
             # noinspection PyUnresolvedReferences
             train_stream = cl_scenario.train_stream
@@ -69,15 +91,17 @@ class GrowingTestSetRunConfig(BaseCLExperimentRunConfig):
             results: list[TDesc] = []
             i = 1
             for experience in train_stream:
-                cl_strategy.train(experience)
+                cl_strategy.train(experience, **dataloader_args)
                 actual_test_stream = test_stream[:i]
-                results.append(cl_strategy.eval(actual_test_stream))
+                results.append(cl_strategy.eval(actual_test_stream, **dataloader_args))
 
             model_saved, exc = _save_model(cl_strategy.model, model_directory)
             return model_saved, results if model_saved else exc
         except Exception as ex:
             traceback.print_exception(*sys.exc_info())
             return False, ex
+        finally:
+            _close_loggers(cl_strategy)
 
 
 @BaseCLExperimentRunConfig.register_run_config('JointTraining')
@@ -85,9 +109,11 @@ class JointTrainingRunConfig(BaseCLExperimentRunConfig):
 
     @classmethod
     def run(cls, experiment: BaseCLExperiment, model_directory: list[str] = None) -> TOptBoolAny:
+        cl_strategy = None
         try:
             cl_scenario: GenericCLScenario = experiment.get_benchmark().get_value()
             cl_strategy: SupervisedTemplate = experiment.get_strategy().get_value()
+            dataloader_args = experiment.get_strategy().get_dataloader_args()
 
             # noinspection PyUnresolvedReferences
             train_stream = cl_scenario.train_stream
@@ -96,8 +122,8 @@ class JointTrainingRunConfig(BaseCLExperimentRunConfig):
 
             print(f"Using {cl_strategy.__class__.__name__} strategy ...")
             results: list[TDesc] = []
-            cl_strategy.train(train_stream)
-            results.append(cl_strategy.eval(test_stream))
+            cl_strategy.train(train_stream, **dataloader_args)
+            results.append(cl_strategy.eval(test_stream, **dataloader_args))
 
             if model_directory is not None:
                 manager = BaseDataManager.get()
@@ -110,6 +136,8 @@ class JointTrainingRunConfig(BaseCLExperimentRunConfig):
         except Exception as ex:
             traceback.print_exception(*sys.exc_info())
             return False, ex
+        finally:
+            _close_loggers(cl_strategy)
 
 
 __all__ = [
@@ -8,6 +8,7 @@ from avalanche.evaluation.metrics import *
 
 from application.utils import TBoolStr, t, TDesc
 from application.database import db
+from application.avalanche_ext import proc_usage_metrics
 
 from application.resources.contexts import ResourceContext
 from application.resources.base import DataType
@@ -57,8 +58,14 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
             "stream": true/false,
             "train_time": true/false,
             "eval_time": true/false
-        }
+        },
+        "sampling": {<metric_name>: <seconds>},
+        "low_overhead": true/false
     }
+    where "sampling" gives the minimum interval between two samples for cpu_usage, ram_usage
+    and gpu_usage. With "low_overhead", cpu_usage and ram_usage read process counters only
+    at the boundaries of their granularity (or with the given sampling interval), and system
+    metrics cannot be computed per minibatch.
     """
     accuracy = db.MapField(db.BooleanField(), validation=std_name_validate, default={})
     loss = db.MapField(db.BooleanField(), validation=std_name_validate, default={})
@@ -74,6 +81,14 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
     forward_transfer = db.MapField(db.BooleanField(), validation=std_name_validate, default={})
     MAC = db.MapField(db.BooleanField(), validation=std_name_validate, default={})
 
+    sampling = db.MapField(db.FloatField(), default={})
+    low_overhead = db.BooleanField(default=False)
+
+    __sampled__ = {'cpu_usage', 'ram_usage', 'gpu_usage'}
+    __proc_metrics__ = {'cpu_usage', 'ram_usage'}   # replaced by proc_usage_metrics when sampled
+    __system_metrics__ = {'cpu_usage', 'ram_usage', 'disk_usage', 'gpu_usage'}
+    __boundaries_only__ = {'minibatch', 'epoch_running'}    # granularities excluded by low_overhead
+
     def to_dict(self, links=True) -> TDesc:
         data = super().to_dict(links=links)
         data.update({
@@ -90,6 +105,9 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
             'bwt': self.bwt,
             'forward_transfer': self.forward_transfer,
             'MAC': self.MAC,
+
+            'sampling': self.sampling,
+            'low_overhead': self.low_overhead,
         })
         return data
     
@@ -110,6 +128,12 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
             sch.Optional('bwt', default={}): {str: bool},
             sch.Optional('forward_transfer', default={}): {str: bool},
             sch.Optional('MAC', default={}): {str: bool},
+
+            sch.Optional('sampling', default={}): {
+                sch.And(str, lambda x: x in StandardMetricSetBuildConfig.__sampled__):
+                    sch.And(sch.Or(int, float), lambda x: x > 0),
+            },
+            sch.Optional('low_overhead', default=False): bool,
         })
         return data
 
@@ -133,8 +157,15 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
             'bwt',
             'forward_transfer',
             'MAC',
+
+            'sampling',
+            'low_overhead',
         }
 
+    @classmethod
+    def metric_names(cls) -> set[str]:
+        return cls.names().difference({'sampling', 'low_overhead'})
+
     __values__ = {
         'minibatch',
         'epoch',
@@ -148,7 +179,7 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
 
     @staticmethod
     def get_metrics_helper_name(name: str):
-        if name in StandardMetricSetBuildConfig.names():
+        if name in StandardMetricSetBuildConfig.metric_names():
             return f"{name}_metrics"
         else:
             raise ValueError("Unknown metrics helper function.")
@@ -156,7 +187,7 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
     @staticmethod
     def get_all_metrics_helper_names():
         result = []
-        for name in StandardMetricSetBuildConfig.names():
+        for name in StandardMetricSetBuildConfig.metric_names():
             result.append(f"{name}_metrics")
         return result
 
@@ -166,7 +197,13 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
 
     @classmethod
     def validate_input(cls, data: TDesc, dtype: t.Type[DataType], context: ResourceContext) -> TBoolStr:
-        return super().validate_input(data, dtype, context)
+        result, msg = super().validate_input(data, dtype, context)
+        if result and data.get('low_overhead', False):
+            for name in cls.__system_metrics__:
+                excluded = [scope for scope in cls.__boundaries_only__ if (data.get(name) or {}).get(scope)]
+                if len(excluded) > 0:
+                    return False, f"'{name}' cannot be computed per {', '.join(excluded)} in low-overhead mode."
+        return result, msg
 
     @classmethod
     def create(cls, data: TDesc, tp: t.Type[DataType], context: ResourceContext, save: bool = True):
@@ -174,10 +211,14 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
         # noinspection PyArgumentList
         return cls(**params)
 
-    def build(self, context: ResourceContext, locked=False, parents_locked=False):
+    def get_metrics(self) -> tuple[dict[str, list[str]], list]:
+        """
+        :return: A couple (metric_names, metrics), where metric_names contains the names
+        of the metrics logged at 'train' and at 'eval' time and metrics are the Avalanche ones.
+        """
         metrics = []
         metric_names: dict[str, list[str]] = {'train': [], 'eval': []}
-        for name in self.names():
+        for name in self.metric_names():
             vals = dict(eval(f"self.{name}") or {})
             if len(vals) > 0:
                 train_time: bool = vals.get('train_time')
@@ -190,13 +231,22 @@ class StandardMetricSetBuildConfig(MongoBuildConfig):
                     train_time = False if train_time is None else vals.pop('train_time')
                     eval_time = False if eval_time is None else vals.pop('eval_time')
 
-                ms = eval(f"{self.get_metrics_helper_name(name)}")(**vals)
+                every = (self.sampling or {}).get(name)
+                if name in self.__proc_metrics__ and (self.low_overhead or every is not None):
+                    ms = proc_usage_metrics(name, every=every, **vals)
+                elif every is not None:
+                    ms = eval(f"{self.get_metrics_helper_name(name)}")(every=every, **vals)
+                else:
+                    ms = eval(f"{self.get_metrics_helper_name(name)}")(**vals)
                 metrics.append(ms)
                 if train_time:
                     metric_names['train'].append(name)
                 if eval_time:
                     metric_names['eval'].append(name)
-        metrics = tuple(metrics)
+        return metric_names, metrics
+
+    def build(self, context: ResourceContext, locked=False, parents_locked=False):
+        metric_names, metrics = self.get_metrics()
         # noinspection PyArgumentList
         return self.target_type()(metric_names, *metrics)
 
@@ -14,6 +14,7 @@ from application.resources.contexts import ResourceContext, UserWorkspaceResourc
 from application.resources.base import EmbeddedBuildConfig, BuildConfig, ResourceConfig, BaseMetadata, DataType
 
 from application.mongo.locking import RWLockableDocument
+from application.mongo.utils import request_cached, identity_key, prefetch_references, CursorPage
 from application.mongo.mongo_base_metadata import MongoBaseMetadata
 from application.mongo.base import MongoBaseUser, MongoBaseWorkspace
 
@@ -112,8 +113,7 @@ class MongoEmbeddedBuildConfig(db.EmbeddedDocument, EmbeddedBuildConfig):
         :param context:
         :return:
         """
-        schema = sch.Schema(cls.schema_dict())
-        schema.validate(data)
+        compiled_schema(cls).validate(data)
         return True, None
 
     # noinspection PyUnusedLocal
@@ -235,8 +235,7 @@ class MongoBuildConfig(db.EmbeddedDocument, BuildConfig):
         :param context:
         :return:
         """
-        schema = sch.Schema(cls.schema_dict())
-        schema.validate(data)
+        compiled_schema(cls).validate(data)
         return True, None
         """
         try:
@@ -385,10 +384,51 @@ class MongoBaseResourceConfig(RWLockableDocument, ResourceConfig):
             args['name'] = name
         return list(cls.objects(**args).all())
 
+    @classmethod
+    def get_page(cls, limit: int, token: str = None, owner: str | MongoBaseUser = None,
+                 workspace: str | MongoBaseWorkspace = None, only: t.Iterable[str] = None,
+                 exclude: t.Iterable[str] = None, **args) -> CursorPage:
+        """
+        Paginated version of get(), that streams the results from the cursor
+        and optionally applies the given projection. Owner and workspace of the returned
+        documents are set to the given ones, and other references are resolved once per
+        batch (see prefetch_page_references).
+        """
+        if owner is not None:
+            owner = User.canonicalize(owner)
+            args['owner'] = owner
+        if isinstance(workspace, str):
+            if owner is not None:
+                workspace = Workspace.canonicalize((owner, workspace))
+            else:
+                raise RuntimeError("Unable to canonicalize workspace name: missing 'owner' parameter.")
+        if workspace is not None:
+            args['workspace'] = workspace
+        known = [document for document in (owner, workspace) if document is not None]
+        references = {field: type(document) for field, document in (('owner', owner), ('workspace', workspace))
+                      if document is not None}
+
+        def prefetch(documents: list[MongoBaseResourceConfig]):
+            prefetch_references(documents, known=known, **references)
+            cls.prefetch_page_references(documents)
+
+        return CursorPage(cls.objects(**args), limit, token, only=only, exclude=exclude, prefetch=prefetch)
+
+    @classmethod
+    def prefetch_page_references(cls, documents: list[MongoBaseResourceConfig]):
+        """
+        Resolves (with one query per field) the references used by to_dict() of a batch
+        of documents returned by get_page(), other than owner and workspace.
+        """
+        pass
+
     @classmethod
     def get_one(cls, owner: str | MongoBaseUser = None, workspace: str | MongoBaseWorkspace = None,
                 name: str = None, check_unique=False, **args) -> MongoResourceConfig | None:
-        results = cls.get(owner, workspace, name, **args)
+        results = request_cached(
+            'resource', identity_key(cls, owner, workspace, name, **args),
+            lambda: cls.get(owner, workspace, name, **args),
+        )
         if check_unique and len(results) > 1:
             raise RuntimeError("Query returned more than one result!")
         return results[0] if len(results) > 0 else None
@@ -478,8 +518,7 @@ class MongoBaseResourceConfig(RWLockableDocument, ResourceConfig):
     @classmethod
     @auto_tboolstr()
     def validate_input(cls, data, context: ResourceContext) -> TBoolStr:
-        schema = sch.Schema(cls.schema_dict())
-        schema.validate(data)
+        compiled_schema(cls).validate(data)
         return True, None
 
     @abstractmethod
@@ -627,8 +666,7 @@ class MongoResourceConfig(MongoBaseResourceConfig):
     @classmethod
     @auto_tboolstr()
     def validate_input(cls, data, context: ResourceContext) -> TBoolStr:
-        schema = sch.Schema(cls.schema_dict())
-        schema.validate(data)
+        compiled_schema(cls).validate(data)
         config = MongoBuildConfig.get_by_name(data['build'])
         return t.cast(MongoBuildConfig, config).validate_input(data['build'], cls.target_type(), context)
 
@@ -5,6 +5,7 @@ from application.resources.base import DataType, ReferrableDataType, BaseMetadat
 from application.resources.contexts import UserWorkspaceResourceContext
 
 from application.mongo.mongo_base_metadata import MongoBaseMetadata
+from application.mongo.indexes import query_index
 from application.mongo.resources.mongo_base_configs import *
 
 
@@ -12,6 +13,7 @@ class CLOptimizerMetadata(MongoBaseMetadata):
     pass
 
 
+@query_index('build_config.model')
 class MongoCLOptimizerConfig(MongoResourceConfig):
 
     _COLLECTION = 'optimizers'
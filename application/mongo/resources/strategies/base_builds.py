@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import torch
 import schema as sch
 
 from avalanche.core import SupervisedPlugin
@@ -7,7 +8,9 @@ from avalanche.training.templates import SupervisedTemplate
 from avalanche.training.plugins import EvaluationPlugin
 
 from application.database import db
+from application.avalanche_ext import GradientAccumulationMixin, AutocastMixin, extend_strategy
 from application.utils import abstractmethod, get_device, t, TDesc, TBoolStr
+from application.validation import invalidate_compiled_schemas
 from application.data_managing import BaseDataManager
 from application.models import User, Workspace
 
@@ -45,6 +48,7 @@ class StrategyPluginConfig(MongoEmbeddedBuildConfig):
             if name is None:
                 name = cls.__name__
             StrategyPluginConfig.__CONFIGS__[name] = cls
+            invalidate_compiled_schemas(cls)
             return cls
 
         return registerer
@@ -91,6 +95,14 @@ class StrategyPluginConfig(MongoEmbeddedBuildConfig):
     def get_plugin(self) -> SupervisedPlugin:
         pass
 
+    # noinspection PyUnusedLocal
+    def build_plugin(self, log_folder: list[str]) -> SupervisedPlugin:
+        """
+        Builds the plugin for a strategy that logs its results into log_folder.
+        Plugins that write their own files should redefine this method.
+        """
+        return self.get_plugin()
+
     @classmethod
     def get_required(cls) -> set[str]:
         return super(StrategyPluginConfig, cls).get_required()
@@ -103,6 +115,20 @@ class StrategyPluginConfig(MongoEmbeddedBuildConfig):
 class MongoBaseStrategyBuildConfig(MongoBuildConfig):
     """
     Base class template for strategies build configs.
+
+    DataLoaders used for training and evaluation can be configured with the optional
+    "num_workers", "persistent_workers", "prefetch_factor" and "pin_memory" parameters.
+    When not given, num_workers is 0 (data is loaded in the training thread, since worker
+    processes would be forked from the multithreaded server process), persistent_workers
+    is enabled when worker processes are requested and pin_memory when training on GPU.
+
+    With the optional "gradient_accumulation_steps" parameter (default 1), each training
+    minibatch of train_mb_size examples is processed in that number of micro-batches
+    before the optimizer step (see GradientAccumulationMixin for the interaction with plugins).
+    With the optional "autocast_bf16" flag (default false), the forward pass in training and
+    evaluation runs in bfloat16 under torch.autocast, while losses, regularization terms and
+    parameters stay in float32 (see AutocastMixin). On CUDA, it requires a device with
+    bfloat16 support (e.g. Ampere or later GPUs).
     """
     meta = {
         'abstract': True,
@@ -118,6 +144,12 @@ class MongoBaseStrategyBuildConfig(MongoBuildConfig):
     eval_every = db.IntField(default=-1)
     metricset = db.ReferenceField(MongoStandardMetricSetConfig, required=True)
     plugins = db.ListField(db.EmbeddedDocumentField(StrategyPluginConfig), default=None)
+    num_workers = db.IntField(default=None)
+    persistent_workers = db.BooleanField(default=None)
+    prefetch_factor = db.IntField(default=None)
+    pin_memory = db.BooleanField(default=None)
+    gradient_accumulation_steps = db.IntField(default=1)
+    autocast_bf16 = db.BooleanField(default=False)
 
     def to_dict(self, links=True) -> TDesc:
         data = super().to_dict(links=links)
@@ -131,6 +163,12 @@ class MongoBaseStrategyBuildConfig(MongoBuildConfig):
             'eval_every': self.eval_every,
             'metricset': self.metricset.to_dict(links=False) if links else self.metricset.get_name(),
             'plugins': [plugin.to_dict(links=False) if links else plugin.get_name() for plugin in self.plugins],
+            'num_workers': self.num_workers,
+            'persistent_workers': self.persistent_workers,
+            'prefetch_factor': self.prefetch_factor,
+            'pin_memory': self.pin_memory,
+            'gradient_accumulation_steps': self.gradient_accumulation_steps,
+            'autocast_bf16': self.autocast_bf16,
         })
         return data
 
@@ -147,9 +185,30 @@ class MongoBaseStrategyBuildConfig(MongoBuildConfig):
             sch.Optional('eval_mb_size'): int,
             sch.Optional('eval_every'): int,
             sch.Optional('plugins', default=[]): [{str: object}],
+            sch.Optional('num_workers'): sch.And(int, lambda x: x >= 0),
+            sch.Optional('persistent_workers'): bool,
+            sch.Optional('prefetch_factor'): sch.And(int, lambda x: x >= 1),
+            sch.Optional('pin_memory'): bool,
+            sch.Optional('gradient_accumulation_steps'): sch.And(int, lambda x: x >= 1),
+            sch.Optional('autocast_bf16'): bool,
         })
         return data
 
+    def dataloader_args(self) -> TDesc:
+        """
+        :return: Keyword arguments for strategy train() and eval() DataLoaders.
+        """
+        num_workers = self.num_workers if self.num_workers is not None else 0
+        args = {
+            'num_workers': num_workers,
+            'pin_memory': self.pin_memory if self.pin_memory is not None else torch.cuda.is_available(),
+        }
+        if num_workers > 0:     # both are rejected by DataLoader without worker processes
+            args['persistent_workers'] = self.persistent_workers if self.persistent_workers is not None else True
+            if self.prefetch_factor is not None:
+                args['prefetch_factor'] = self.prefetch_factor
+        return args
+
     @staticmethod
     @abstractmethod
     def get_avalanche_strategy() -> t.Type[SupervisedTemplate]:
@@ -191,6 +250,12 @@ class MongoBaseStrategyBuildConfig(MongoBuildConfig):
             'eval_mb_size',
             'eval_every',
             'plugins',
+            'num_workers',
+            'persistent_workers',
+            'prefetch_factor',
+            'pin_memory',
+            'gradient_accumulation_steps',
+            'autocast_bf16',
         }
 
     @staticmethod
@@ -216,6 +281,9 @@ class MongoBaseStrategyBuildConfig(MongoBuildConfig):
                 if not result:
                     return False, f"Failed to validate plugins data: '{msg}'"
 
+        if data.get('gradient_accumulation_steps', 1) > data.get('train_mb_size', 1):
+            return False, "'gradient_accumulation_steps' cannot be greater than 'train_mb_size'."
+
         model_name = data['model']
         optim_name = data['optimizer']
         criterion_name = data['criterion']
@@ -300,20 +368,35 @@ class MongoBaseStrategyBuildConfig(MongoBuildConfig):
         if self.plugins is not None and len(self.plugins) > 0:
             plugins = []
             for plugin_data in self.plugins:
-                plugin = plugin_data.get_plugin()
+                plugin = plugin_data.build_plugin(log_folder)
                 plugins.append(plugin)
 
         extra_params = self.extra_build_params_process()
 
-        strategy = self.get_avalanche_strategy()(
+        device = get_device()
+        mixins = []
+        steps = self.gradient_accumulation_steps or 1
+        if steps > 1:
+            mixins.append(GradientAccumulationMixin)
+        if self.autocast_bf16:
+            if device.type == 'cuda' and not torch.cuda.is_bf16_supported():
+                raise RuntimeError(
+                    f"'autocast_bf16' is not supported by the CUDA device '{torch.cuda.get_device_name(device)}'."
+                )
+            mixins.append(AutocastMixin)
+        strategy_class = extend_strategy(self.get_avalanche_strategy(), *mixins)
+
+        strategy = strategy_class(
             model.get_value(), optim.get_value(), criterion.get_value(),
-            device=get_device(), **extra_params, plugins=plugins,
+            device=device, **extra_params, plugins=plugins,
             train_mb_size=self.train_mb_size, train_epochs=self.train_epochs,
             eval_mb_size=self.eval_mb_size, eval_every=self.eval_every,
             evaluator=self.get_evaluator(log_folder, metricset),
         )
+        if steps > 1:
+            strategy.gradient_accumulation_steps = steps
         # noinspection PyArgumentList
-        return self.target_type()(strategy, model, optim, criterion, metricset)
+        return self.target_type()(strategy, model, optim, criterion, metricset, self.dataloader_args())
 
 
 __all__ = [
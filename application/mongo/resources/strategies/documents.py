@@ -7,6 +7,7 @@ from application.resources.contexts import UserWorkspaceResourceContext
 from application.resources.base import DataType, ReferrableDataType, BaseMetadata
 
 from application.mongo.locking import RWLockableDocument
+from application.mongo.indexes import query_index
 from application.mongo.mongo_base_metadata import MongoBaseMetadata
 from application.mongo.base import MongoBaseUser, MongoBaseWorkspace
 
@@ -21,6 +22,10 @@ class StrategyMetadata(MongoBaseMetadata):
     pass
 
 
+@query_index('build_config.model')
+@query_index('build_config.optimizer')
+@query_index('build_config.criterion')
+@query_index('build_config.metricset')
 class MongoStrategyConfig(MongoResourceConfig):
 
     _COLLECTION = 'strategies'
@@ -9,6 +9,7 @@ from avalanche.training.plugins import ReplayPlugin, GDumbPlugin, SynapticIntell
 from application.utils import TBoolStr, TDesc
 from application.database import db
 from application.resources.contexts import UserWorkspaceResourceContext
+from application.mongo.plugins import PhaseTimingPlugin, MemoryTrackingPlugin
 
 from .base_builds import *
 
@@ -283,6 +284,117 @@ class AGEMPluginConfig(StrategyPluginConfig):
         )
 
 
+@StrategyPluginConfig.register_plugin_config('PhaseTiming')
+class PhaseTimingPluginConfig(StrategyPluginConfig):
+    """
+    Per-minibatch timing of data loading, forward, backward, optimizer step and evaluation
+    (see PhaseTimingPlugin), written into the execution log folder.
+    """
+
+    # Fields
+    n_bins = db.IntField(default=50)
+    min_ms = db.FloatField(default=0.01)
+    max_ms = db.FloatField(default=1e5)
+    synchronize = db.BooleanField(default=True)
+
+    def to_dict(self, links=True) -> TDesc:
+        data = super().to_dict(links=links)
+        data.update({
+            'n_bins': self.n_bins,
+            'min_ms': self.min_ms,
+            'max_ms': self.max_ms,
+            'synchronize': self.synchronize,
+        })
+        return data
+
+    @classmethod
+    def schema_dict(cls) -> dict:
+        data = super(PhaseTimingPluginConfig, cls).schema_dict()
+        data.update({
+            sch.Optional('n_bins'): sch.And(int, lambda x: x > 0),
+            sch.Optional('min_ms'): sch.And(float, lambda x: x > 0),
+            sch.Optional('max_ms'): sch.And(float, lambda x: x > 0),
+            sch.Optional('synchronize'): bool,
+        })
+        return data
+
+    @classmethod
+    def get_required(cls) -> set[str]:
+        return super(PhaseTimingPluginConfig, cls).get_required()
+
+    @classmethod
+    def get_optionals(cls) -> set[str]:
+        return super(PhaseTimingPluginConfig, cls).get_optionals().union({'n_bins', 'min_ms', 'max_ms', 'synchronize'})
+
+    @classmethod
+    def validate_input(cls, data: TDesc, context: UserWorkspaceResourceContext) -> TBoolStr:
+        result, msg = super(PhaseTimingPluginConfig, cls).validate_input(data, context)
+        if result and data.get('min_ms', 0.01) >= data.get('max_ms', 1e5):
+            return False, "'min_ms' must be less than 'max_ms'."
+        return result, msg
+
+    @classmethod
+    def extra_create_params_process(cls, params: TDesc) -> TDesc:
+        return params
+
+    def get_plugin(self) -> SupervisedPlugin:
+        raise RuntimeError("PhaseTiming plugin needs the log folder of the experiment (see build_plugin).")
+
+    def build_plugin(self, log_folder: list[str]) -> SupervisedPlugin:
+        return PhaseTimingPlugin(
+            log_folder, n_bins=self.n_bins, min_ms=self.min_ms,
+            max_ms=self.max_ms, synchronize=self.synchronize,
+        )
+
+
+@StrategyPluginConfig.register_plugin_config('MemoryTracking')
+class MemoryTrackingPluginConfig(StrategyPluginConfig):
+    """
+    Per-experience peak memory and size of strategy-held state (see MemoryTrackingPlugin),
+    written into the execution log folder.
+    """
+
+    # Fields
+    sample_every = db.IntField(default=10)
+
+    def to_dict(self, links=True) -> TDesc:
+        data = super().to_dict(links=links)
+        data.update({
+            'sample_every': self.sample_every,
+        })
+        return data
+
+    @classmethod
+    def schema_dict(cls) -> dict:
+        data = super(MemoryTrackingPluginConfig, cls).schema_dict()
+        data.update({
+            sch.Optional('sample_every'): sch.And(int, lambda x: x > 0),
+        })
+        return data
+
+    @classmethod
+    def get_required(cls) -> set[str]:
+        return super(MemoryTrackingPluginConfig, cls).get_required()
+
+    @classmethod
+    def get_optionals(cls) -> set[str]:
+        return super(MemoryTrackingPluginConfig, cls).get_optionals().union({'sample_every'})
+
+    @classmethod
+    def validate_input(cls, data: TDesc, context: UserWorkspaceResourceContext) -> TBoolStr:
+        return super(MemoryTrackingPluginConfig, cls).validate_input(data, context)
+
+    @classmethod
+    def extra_create_params_process(cls, params: TDesc) -> TDesc:
+        return params
+
+    def get_plugin(self) -> SupervisedPlugin:
+        raise RuntimeError("MemoryTracking plugin needs the log folder of the experiment (see build_plugin).")
+
+    def build_plugin(self, log_folder: list[str]) -> SupervisedPlugin:
+        return MemoryTrackingPlugin(log_folder, sample_every=self.sample_every)
+
+
 __all__ = [
     'SynapticIntelligencePluginConfig',
     'ReplayPluginConfig',
@@ -290,4 +402,6 @@ __all__ = [
     'EWCPluginConfig',
     'GDumbPluginConfig',
     'AGEMPluginConfig',
+    'PhaseTimingPluginConfig',
+    'MemoryTrackingPluginConfig',
 ]
\ No newline at end of file
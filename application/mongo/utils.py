@@ -1,6 +1,15 @@
 # Common utils that for imports order require to be defined here.
 from __future__ import annotations
 
+import itertools
+import threading
+import typing as t
+from bson import ObjectId, DBRef
+from flask import g, has_app_context
+from mongoengine.base import BaseDocument
+
+from application.utils import encode_continuation_token, decode_continuation_token
+
 
 MNAMES_ORDER: list[str] = [
     'accuracy',
@@ -108,8 +117,156 @@ def mnames_translations(gpu_id: int = 0, **kwargs):
     }
 
 
+# Request-scoped identity map
+def identity_map() -> dict | None:
+    """
+    Per-request (and per-thread, since background tasks share the app context) map
+    of the documents already retrieved, so that each one is fetched at most once.
+    :return: The identity map, or None if outside an application context.
+    """
+    if not has_app_context():
+        return None
+    maps = g.setdefault('identity_maps', {})
+    return maps.setdefault(threading.get_ident(), {})
+
+
+def identity_key(*args, **kwargs) -> tuple:
+    """
+    Hashable key for a query, where documents are replaced by (type, id) and classes
+    by their qualified name.
+    """
+    def normalize(value):
+        if isinstance(value, type):
+            return f"{value.__module__}.{value.__qualname__}"
+        if isinstance(value, BaseDocument):
+            # embedded documents have no pk and are compared by identity
+            return type(value).__name__, str(getattr(value, 'pk', None) or id(value))
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return repr(value)
+    return tuple(normalize(arg) for arg in args) + tuple(sorted((k, normalize(v)) for k, v in kwargs.items()))
+
+
+def request_cached(kind: str, key: tuple, loader: t.Callable[[], t.Any]):
+    """
+    Returns the value for the given query from the identity map, or loads and stores it.
+    Empty results are not stored, since the documents could be created later in the request.
+    """
+    imap = identity_map()
+    if imap is None:
+        return loader()
+    value = imap.get((kind, key))
+    if value is None:
+        value = loader()
+        if value:
+            imap[(kind, key)] = value
+    return value
+
+
+def clear_identity_map():
+    imap = identity_map()
+    if imap is not None:
+        imap.clear()
+
+
+# Batched reference resolution
+def _reference_id(value):
+    if isinstance(value, DBRef):
+        return value.id
+    elif isinstance(value, ObjectId):
+        return value
+    return None     # None or an already dereferenced document
+
+
+def prefetch_references(documents: t.Sequence, known: t.Iterable = (), **fields: type) -> None:
+    """
+    Resolves the given reference fields of all the documents with at most one query per field,
+    instead of one query per document when each reference is accessed for the first time.
+    :param documents: Documents whose references must be resolved.
+    :param known: Documents already loaded that are reused without querying them again.
+    :param fields: A mapping field_name -> concrete document class of the referenced documents.
+    """
+    known = list(known)
+    for field, document_type in fields.items():
+        resolved = {document.pk: document for document in known if isinstance(document, document_type)}
+        missing = {_reference_id(document._data.get(field)) for document in documents}
+        missing.discard(None)
+        missing.difference_update(resolved.keys())
+        if len(missing) > 0:
+            resolved.update(document_type.objects.in_bulk(list(missing)))
+        for document in documents:
+            ref_id = _reference_id(document._data.get(field))
+            if ref_id is not None and ref_id in resolved:
+                document._data[field] = resolved[ref_id]
+
+
+# Cursor-based pagination
+class CursorPage:
+    """
+    A page of a query result, with keyset pagination on document ids: the continuation token
+    encodes the id of the last returned document, so that each page is retrieved with an index
+    scan starting from it instead of skipping over the previous ones.
+    Documents are produced lazily from the underlying cursor, and projections can be applied
+    with `only` and `exclude` for avoiding to load fields that are not used by the caller.
+    Documents are read in batches of _BATCH_SIZE, so that references of each batch can be
+    resolved together by `prefetch` (e.g. with prefetch_references).
+    """
+
+    _BATCH_SIZE = 100
+
+    def __init__(self, queryset, limit: int, token: str | None = None,
+                 only: t.Iterable[str] = None, exclude: t.Iterable[str] = None,
+                 prefetch: t.Callable[[list], None] = None):
+        """
+        :param queryset: Filtered (mongoengine) queryset.
+        :param limit: Maximum number of documents in the page.
+        :param token: Continuation token of the previous page, if any.
+        :param prefetch: Called on each batch of documents before they are produced.
+        :raises ValueError: If the token is malformed.
+        """
+        last_id = decode_continuation_token(token)
+        if last_id is not None:
+            if not (isinstance(last_id, str) and ObjectId.is_valid(last_id)):
+                raise ValueError(f"Invalid continuation token: '{token}'.")
+            queryset = queryset.filter(id__gt=ObjectId(last_id))
+        if only is not None:
+            queryset = queryset.only(*only)
+        if exclude is not None:
+            queryset = queryset.exclude(*exclude)
+        self.limit = limit
+        self.prefetch = prefetch
+        self.queryset = queryset.order_by('id').limit(limit + 1)
+        self.next_token: str | None = None
+
+    def __iter__(self):
+        documents = iter(self.queryset)
+        count, last_id = 0, None
+        while count < self.limit:
+            batch = list(itertools.islice(documents, min(self._BATCH_SIZE, self.limit - count)))
+            if len(batch) == 0:
+                return
+            if self.prefetch is not None:
+                self.prefetch(batch)
+            yield from batch
+            count += len(batch)
+            last_id = batch[-1].id
+        # the (limit + 1)-th document only signals that there is another page
+        if next(documents, None) is not None:
+            self.next_token = encode_continuation_token(str(last_id))
+
+
 __all__ = [
     'MNAMES_ORDER',
     'mnames_order_filter',
     'mnames_translations',
+
+    'identity_map',
+    'identity_key',
+    'request_cached',
+    'clear_identity_map',
+
+    'prefetch_references',
+    'CursorPage',
 ]
\ No newline at end of file
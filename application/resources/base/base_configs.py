@@ -2,6 +2,7 @@ from __future__ import annotations
 from datetime import datetime
 
 from application.utils import abstractmethod, t, TBoolStr, TDesc
+from application.validation import invalidate_compiled_schemas
 from application.resources.utils import *
 from application.resources.contexts import *
 from .base_datatypes import *
@@ -52,6 +53,7 @@ class BuildConfig(JSONSerializable, NameBasedResource):
             if name is None:
                 name = cls.__name__
             BuildConfig.__CONFIGS__[name] = cls
+            invalidate_compiled_schemas(cls)
             return cls
 
         return registerer
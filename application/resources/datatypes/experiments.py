@@ -140,6 +140,24 @@ class BaseCLExperimentExecution(JSONSerializable, URIBasedResource):
     def get_csv_results(self) -> tuple[bool, t.Optional[TDesc]]:
         pass
 
+    @abstractmethod
+    def get_metrics(self, table: str, columns: t.Sequence[str] = None,
+                    filters: dict[str, tuple[float | None, float | None]] = None,
+                    max_points: int = None) -> TDesc | None:
+        """
+        Queries the metrics store of the given table ('train', 'eval' or 'memory').
+        :return: Selected metrics, or None if not (yet) available.
+        """
+        pass
+
+    @abstractmethod
+    def get_profile_file(self, kind: str = 'trace'):
+        """
+        :param kind: 'trace' (Chrome trace) or 'summary' (top operators).
+        :return: A file pointer to the profiler output, or None if the execution has not been profiled (yet).
+        """
+        pass
+
     @abstractmethod
     def get_final_model(self, descriptor=False):
         pass
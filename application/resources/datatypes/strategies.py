@@ -16,12 +16,13 @@ class Strategy(WrapperReferrableDataType, ABC):
     """
     def __init__(self, strategy: SupervisedTemplate,
                  model: Model, optimizer: CLOptimizer,
-                 criterion: CLCriterion, metricset: StandardMetricSet):
+                 criterion: CLCriterion, metricset: StandardMetricSet, dataloader_args: TDesc = None):
         super().__init__(strategy)
         self.model = model
         self.optimizer = optimizer
         self.criterion = criterion
         self.metricset = metricset
+        self.dataloader_args = dataloader_args if dataloader_args is not None else {}
 
     def set_metadata(self, **kwargs):
         WrapperReferrableDataType.set_metadata(self, **kwargs)
@@ -41,5 +42,11 @@ class Strategy(WrapperReferrableDataType, ABC):
     def get_metricset(self) -> StandardMetricSet:
         return self.metricset
 
+    def get_dataloader_args(self) -> TDesc:
+        """
+        Keyword arguments for the DataLoaders built by the strategy train() and eval() methods.
+        """
+        return self.dataloader_args
+
 
 __all__ = ['Strategy']
\ No newline at end of file
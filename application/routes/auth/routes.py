@@ -85,7 +85,7 @@ def logout():
 
     :return:
     """
-    current_user = token_auth.current_user()
+    current_user = token_auth.current_user().get_user()
     current_user.revoke_token()
     return make_success_kwargs(HTTPStatus.OK, 'Successfully logged out.')
 
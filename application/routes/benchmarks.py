@@ -33,6 +33,13 @@ def create_benchmark(username, wname):
     return add_new_resource(username, wname, typename=_DFL_BENCHMARK_NAME_)
 
 
+@benchmarks_bp.get('/')
+@benchmarks_bp.get('')
+@token_auth.login_required
+def get_benchmarks(username, wname):
+    return get_resources(username, wname, typename=_DFL_BENCHMARK_NAME_)
+
+
 @benchmarks_bp.get('/<resource:name>/')
 @benchmarks_bp.get('/<resource:name>')
 @token_auth.login_required
@@ -83,6 +90,7 @@ def delete_benchmark(username, wname, name):
 __all__ = [
     'benchmarks_bp',
     'create_benchmark',
+    'get_benchmarks',
     'get_benchmark',
     'update_benchmark',
     'delete_benchmark',
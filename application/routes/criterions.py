@@ -32,6 +32,13 @@ def create_criterion(username, wname):
     return add_new_resource(username, wname, _DFL_CRITERION_NAME)
 
 
+@criterions_bp.get('/')
+@criterions_bp.get('')
+@token_auth.login_required
+def get_criterions(username, wname):
+    return get_resources(username, wname, typename=_DFL_CRITERION_NAME)
+
+
 @criterions_bp.get('/<resource:name>/')
 @criterions_bp.get('/<resource:name>')
 @token_auth.login_required
@@ -70,6 +77,7 @@ def delete_criterion(username, wname, name):
 __all__ = [
     'criterions_bp',
     'create_criterion',
+    'get_criterions',
     'get_criterion',
     'update_criterion',
     'delete_criterion',
@@ -354,8 +354,24 @@ def update_data_repository(username, wname, name):
 def get_folder_content(username, wname, name, path):
     current_user = token_auth.current_user()
     workspace = Workspace.canonicalize((current_user, wname))
-    data_repository = BaseDataRepository.get_one(workspace, name)
+    limit, token, error = get_pagination_args()
+    if error is not None:
+        return error
+    # paged requests do not need to load the whole file list
+    data_repository = BaseDataRepository.get_one(workspace, name, exclude=('files',) if limit is not None else None)
     if data_repository is not None:
+        if limit is not None:
+            try:
+                start = decode_continuation_token(token) or 0
+                if not isinstance(start, int) or start < 0:
+                    raise ValueError(f"Invalid continuation token: '{token}'.")
+            except ValueError as ex:
+                return MalformedQueryString(msg=str(ex))
+            files, has_more = data_repository.get_files_page(path, start, limit)
+            end = start + len(files)
+            return make_streamed_list_response(
+                iter(files), lambda: encode_continuation_token(end) if has_more else None,
+            )
         files = data_repository.get_all_files(path)
         num_files = len(files) if files is not None else 0
         return make_success_dict(data={'num_files': num_files, 'files': files})
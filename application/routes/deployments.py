@@ -45,6 +45,13 @@ def create_deployed_model(username, wname):
     return add_new_resource(username, wname, typename=_DFL_DEPLOYED_MODEL_NAME_, required={'name', 'path', 'deploy'})
 
 
+@deployments_bp.get('/')
+@deployments_bp.get('')
+@token_auth.login_required
+def get_deployed_models(username, wname):
+    return get_resources(username, wname, typename=_DFL_DEPLOYED_MODEL_NAME_)
+
+
 @deployments_bp.get('/<resource:name>/')
 @deployments_bp.get('/<resource:name>')
 @token_auth.login_required
@@ -114,6 +121,7 @@ __all__ = [
     'deployments_bp',
 
     'create_deployed_model',
+    'get_deployed_models',
     'get_deployed_model',
     'update_deployed_model_metadata',
 
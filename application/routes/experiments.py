@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import sys
 import traceback
-from flask import Blueprint, Response, send_file
+from flask import Blueprint, Response, request, send_file
 from http import HTTPStatus
 
 from application.errors import *
@@ -20,6 +20,8 @@ _DFL_EXPERIMENT_NAME = DataType.get_type(BaseCLExperiment.canonical_typename()).
 
 _EXPERIMENT_START = "START"
 
+_DFL_EXECUTIONS_LIMIT = 20
+
 experiments_bp = Blueprint('experiments', __name__,
                            url_prefix='/users/<user:username>/workspaces/<workspace:wname>/experiments')
 
@@ -107,6 +109,14 @@ def create_experiment(username, wname):
     return add_new_resource(username, wname, typename=_DFL_EXPERIMENT_NAME)
 
 
+@experiments_bp.get('/')
+@experiments_bp.get('')
+@token_auth.login_required
+def get_experiments(username, wname):
+    return get_resources(username, wname, typename=_DFL_EXPERIMENT_NAME,
+                         to_dict=lambda experiment: experiment.to_dict(settings=True))
+
+
 @experiments_bp.patch('/<experiment:name>/setup/')
 @experiments_bp.patch('/<experiment:name>/setup')
 @token_auth.login_required
@@ -180,7 +190,7 @@ def get_experiment_execution_results(username, wname, name, exec_id):
     experiment_config, err_response = get_resource(username, wname, typename=_DFL_EXPERIMENT_NAME, name=name)
     if err_response:
         return err_response
-    elif exec_id <= len(experiment_config.executions):
+    elif 0 < exec_id <= experiment_config.current_exec_id:
         if exec_id == experiment_config.current_exec_id:
             if experiment_config.status != BaseCLExperiment.ENDED:
                 return ResourceInUse(msg="Experiment is still running and results are not available.")
@@ -194,6 +204,34 @@ def get_experiment_execution_results(username, wname, name, exec_id):
         return ResourceNotFound(resource=f"execution<{exec_id}>")
 
 
+@experiments_bp.get('/<experiment:name>/executions/')
+@experiments_bp.get('/<experiment:name>/executions')
+@token_auth.login_required
+def get_experiment_executions(username, wname, name):
+    """
+    Executions history (without results payloads), ordered by exec_id.
+    Query parameters: skip (default 0), limit (default 20).
+    :param username:
+    :param wname:
+    :param name:
+    :return:
+    """
+    experiment_config, err_response = get_resource(username, wname, typename=_DFL_EXPERIMENT_NAME, name=name)
+    if err_response:
+        return err_response
+    skip = request.args.get('skip', 0, type=int)
+    limit = request.args.get('limit', _DFL_EXECUTIONS_LIMIT, type=int)
+    if skip < 0 or limit < 1:
+        return MalformedQueryString(msg="'skip' must be non-negative and 'limit' positive.")
+    executions = experiment_config.get_executions(skip=skip, limit=limit)
+    return make_success_dict(data={
+        'total': experiment_config.current_exec_id,
+        'skip': skip,
+        'limit': limit,
+        'executions': [linker.make_links(execution.to_dict(results=False)) for execution in executions],
+    })
+
+
 @experiments_bp.get('/<experiment:name>/settings/')
 @experiments_bp.get('/<experiment:name>/settings')
 @token_auth.login_required
@@ -269,6 +307,114 @@ def get_experiment_execution_csv_results(username, wname, name, exec_id):
             return ResourceInUse(msg="Experiment is still running and csv results are not available.")
 
 
+@experiments_bp.get('/<experiment:name>/results/metrics/')
+@experiments_bp.get('/<experiment:name>/results/metrics')
+@token_auth.login_required
+def get_experiment_metrics(username, wname, name):
+    experiment_config, err_response = get_resource(username, wname, typename=_DFL_EXPERIMENT_NAME, name=name)
+    if err_response:
+        return err_response
+    else:
+        exec_id = experiment_config.current_exec_id
+        return get_experiment_execution_metrics(username, wname, name, exec_id)
+
+
+@experiments_bp.get('/<experiment:name>/results/metrics/<int:exec_id>/')
+@experiments_bp.get('/<experiment:name>/results/metrics/<int:exec_id>')
+@token_auth.login_required
+def get_experiment_execution_metrics(username, wname, name, exec_id):
+    """
+    Metrics of an execution, also while it is running.
+    Query parameters:
+        table: 'train', 'eval' or 'memory' (default 'eval');
+        columns: comma-separated column names (default all);
+        exp_start, exp_end: range of training experiences;
+        epoch_start, epoch_end: range of epochs ('train' table only);
+        max_points: maximum number of returned rows (evenly downsampled).
+    :param username:
+    :param wname:
+    :param name:
+    :param exec_id:
+    :return:
+    """
+    experiment_config, err_response = get_resource(username, wname, typename=_DFL_EXPERIMENT_NAME, name=name)
+    if err_response:
+        return err_response
+    try:
+        execution = experiment_config.get_execution(exec_id, summary=True)
+    except ValueError as ex:
+        return ResourceNotFound(msg=str(ex))
+
+    table = request.args.get('table', 'eval')
+    columns = request.args.get('columns')
+    columns = [column.strip() for column in columns.split(',') if len(column.strip()) > 0] if columns else None
+    max_points = request.args.get('max_points', type=int)
+    if max_points is not None and max_points < 2:
+        return MalformedQueryString(msg="'max_points' must be at least 2.")
+    filters = {}
+    for column, start_arg, end_arg in [
+        ('training_exp', 'exp_start', 'exp_end'),
+        ('epoch', 'epoch_start', 'epoch_end'),
+    ]:
+        start, end = request.args.get(start_arg, type=int), request.args.get(end_arg, type=int)
+        if start is not None or end is not None:
+            filters[column] = (start, end)
+    try:
+        metrics = execution.get_metrics(table, columns, filters, max_points)
+    except ValueError as ex:
+        return MalformedQueryString(msg=str(ex))
+    if metrics is None:
+        return ResourceNotFound(msg="Metrics are not available for this execution.")
+    return make_success_dict(data=metrics)
+
+
+@experiments_bp.get('/<experiment:name>/results/profile/')
+@experiments_bp.get('/<experiment:name>/results/profile')
+@token_auth.login_required
+def get_experiment_profile(username, wname, name):
+    experiment_config, err_response = get_resource(username, wname, typename=_DFL_EXPERIMENT_NAME, name=name)
+    if err_response:
+        return err_response
+    else:
+        exec_id = experiment_config.current_exec_id
+        return get_experiment_execution_profile(username, wname, name, exec_id)
+
+
+@experiments_bp.get('/<experiment:name>/results/profile/<int:exec_id>/')
+@experiments_bp.get('/<experiment:name>/results/profile/<int:exec_id>')
+@token_auth.login_required
+def get_experiment_execution_profile(username, wname, name, exec_id):
+    """
+    Profiler outputs of an execution (see 'profile' experiment option).
+    Query parameters:
+        file: 'trace' (Chrome trace, default) or 'summary' (top operators by time and memory).
+    :param username:
+    :param wname:
+    :param name:
+    :param exec_id:
+    :return:
+    """
+    experiment_config, err_response = get_resource(username, wname, typename=_DFL_EXPERIMENT_NAME, name=name)
+    if err_response:
+        return err_response
+    try:
+        execution = experiment_config.get_execution(exec_id, summary=True)
+    except ValueError as ex:
+        return ResourceNotFound(msg=str(ex))
+
+    kind = request.args.get('file', 'trace')
+    try:
+        fd = execution.get_profile_file(kind)
+    except ValueError as ex:
+        return MalformedQueryString(msg=str(ex))
+    if fd is None:
+        return ResourceNotFound(msg="Profiler outputs are not available for this execution.")
+    try:
+        return send_file(fd, attachment_filename=execution.PROFILE_FILES[kind])
+    except Exception as ex:
+        return InternalFailure(msg=f"Error when sending profile file: '{ex.args[0]}'.")
+
+
 @experiments_bp.delete('/<experiment:name>/')
 @experiments_bp.delete('/<experiment:name>')
 @token_auth.login_required
@@ -280,6 +426,7 @@ __all__ = [
     'experiments_bp',
 
     'create_experiment',
+    'get_experiments',
     'setup_experiment',
 
     'set_experiment_status',
@@ -294,6 +441,13 @@ __all__ = [
     'get_experiment_csv_results',
     'get_experiment_execution_csv_results',
 
+    'get_experiment_metrics',
+    'get_experiment_execution_metrics',
+
+    'get_experiment_profile',
+    'get_experiment_execution_profile',
+
+    'get_experiment_executions',
     'get_experiment_settings',
     'delete_experiment',
 ]
\ No newline at end of file
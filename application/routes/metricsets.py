@@ -32,6 +32,13 @@ def create_metric_set(username, wname):
     return add_new_resource(username, wname, _DFL_METRICSET_NAME_)
 
 
+@metricsets_bp.get('/')
+@metricsets_bp.get('')
+@token_auth.login_required
+def get_metricsets(username, wname):
+    return get_resources(username, wname, typename=_DFL_METRICSET_NAME_)
+
+
 @metricsets_bp.get('/<resource:name>/')
 @metricsets_bp.get('/<resource:name>')
 @token_auth.login_required
@@ -82,6 +89,7 @@ def delete_metric_set(username, wname, name):
 __all__ = [
     'metricsets_bp',
     'create_metric_set',
+    'get_metricsets',
     'get_metricset',
     'update_metricset',
     'delete_metric_set',
@@ -32,6 +32,13 @@ def create_model(username, wname):
     return add_new_resource(username, wname, _DFL_MODEL_NAME_)
 
 
+@models_bp.get('/')
+@models_bp.get('')
+@token_auth.login_required
+def get_models(username, wname):
+    return get_resources(username, wname, typename=_DFL_MODEL_NAME_)
+
+
 @models_bp.get('/<resource:name>/')
 @models_bp.get('/<resource:name>')
 @token_auth.login_required
@@ -76,6 +83,7 @@ def delete_model(username, wname, name):
 __all__ = [
     'models_bp',
     'create_model',
+    'get_models',
     'get_model',
     'update_model',
     'delete_model',
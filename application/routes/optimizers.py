@@ -32,6 +32,13 @@ def create_optimizer(username, wname):
     return add_new_resource(username, wname, _DFL_OPTIM_NAME_)
 
 
+@optimizers_bp.get('/')
+@optimizers_bp.get('')
+@token_auth.login_required
+def get_optimizers(username, wname):
+    return get_resources(username, wname, typename=_DFL_OPTIM_NAME_)
+
+
 @optimizers_bp.get('/<resource:name>/')
 @optimizers_bp.get('/<resource:name>')
 @token_auth.login_required
@@ -76,6 +83,7 @@ def delete_optimizer(username, wname, name):
 __all__ = [
     'optimizers_bp',
     'create_optimizer',
+    'get_optimizers',
     'get_optimizer',
     'update_optimizer',
     'delete_optimizer',
@@ -2,6 +2,10 @@ from __future__ import annotations
 
 import io
 import json
+import hashlib
+from threading import RLock
+from cachetools import LRUCache, cached
+from cachetools.keys import hashkey
 from werkzeug.datastructures import FileStorage
 
 import torch
@@ -16,7 +20,8 @@ from application.resources.contexts import UserWorkspaceResourceContext
 from application.resources.base import DataType, ReferrableDataType
 from application.resources.datatypes import BaseCLExperiment
 
-from application.mongo.resources.benchmarks import TransformConfig
+from application.mongo.resources.benchmarks import TransformConfig, BytesToTensor
+from application.mongo.resources.deployed_models import InputShapeError, predict_tensors
 
 from .auth import token_auth
 from .resources import *
@@ -33,25 +38,62 @@ _DFL_EXPERIMENT_NAME = t.cast(
 
 _DFL_DEPLOYED_MODEL_NAME_ = "DeployedModel"
 
+_TRANSFORMS_CACHE_SIZE = 128
+
+
+# noinspection PyUnusedLocal
+@cached(cache=LRUCache(maxsize=_TRANSFORMS_CACHE_SIZE), key=lambda transform_json, context: hashkey(transform_json),
+        lock=RLock())
+def compile_transform(transform_json: str, context: UserWorkspaceResourceContext):
+    """
+    Builds the transform pipeline described by the given (canonical) JSON transform config.
+    Results are cached by JSON string, since transform configs do not depend on user/workspace.
+    :param transform_json: Transform config serialized with sorted keys.
+    :param context:
+    :return:
+    """
+    transform_data = json.loads(transform_json)
+    transform_config: t.Type[TransformConfig] = TransformConfig.get_by_name(transform_data)
+    if transform_config is None:
+        raise ValueError(f"Unknown transform config: '{transform_data.get('name')}'.")
+    transform: TransformConfig | None = transform_config.create(transform_data, context)
+    return transform.get_transform()
 
 
 def get_transform(username, wname, info):
+    """
+    :raises InputShapeError: If 'shape' or 'dtype' are not valid for 'tensor' mode.
+    """
+    if info.get('mode', 'plain') == 'tensor':
+        # raw tensors are already preprocessed
+        try:
+            return BytesToTensor(info.get('shape'), info.get('dtype', 'float32'))
+        except ValueError as ex:
+            raise InputShapeError(str(ex))
     transform_data = info.get('transform', None)
     if transform_data is not None:
-        transform_config: t.Type[TransformConfig] = TransformConfig.get_by_name(transform_data)
         context = UserWorkspaceResourceContext(username, wname)
-        transform: TransformConfig | None = transform_config.create(transform_data, context)
-        return transform.get_transform()
+        return compile_transform(json.dumps(transform_data, sort_keys=True), context)
     return ToTensor()
 
 
-def predict(model: Module, input_data: list[FileStorage], transform, mode: str = 'plain') -> dict[str, int] | NotImplemented:
+def transform_fingerprint(info: TDesc) -> str:
+    """
+    Fingerprint of the input preprocessing described by request info, used as part
+    of prediction cache keys.
+    """
+    data = {key: info.get(key) for key in ('transform', 'mode', 'shape', 'dtype')}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def predict(model: Module, input_data: list[FileStorage], transform,
+            mode: str = 'plain') -> dict[str, int | list[int]] | NotImplemented:
     if mode == 'plain':
         input_bytes: dict[str, io.BytesIO] = {inp.filename: inp.read() for inp in input_data}
         output_bytes: dict[str, int] = {}
         # input_bytes = [inp.read() for inp in input_data]
         tensors = [transform(item_bytes).unsqueeze(0) for item_bytes in input_bytes.values()]
-        device = get_device()
+        device = get_model_device(model)
         tensors = [tensor.to(device) for tensor in tensors]
         batch_tensor = torch.stack(tensors)
         batch_tensor = batch_tensor.to(device)
@@ -64,6 +106,8 @@ def predict(model: Module, input_data: list[FileStorage], transform, mode: str =
             output_bytes[filename] = int(y_hat[i])
             i += 1
         return output_bytes
+    elif mode == 'tensor':
+        return predict_tensors(model, input_data, transform)
     elif mode == 'zip':
         return NotImplemented
     else:
@@ -96,7 +140,10 @@ def get_experiment_execution_predictions(username, wname, name, exec_id):
     """
     Request Syntax:
     {
-        "transform": <input_transform>
+        "transform": <input_transform>,
+        "mode": "plain"/"tensor",
+        "shape": [<batch_size>, <dim1>, ...],   # only for raw (not .npy) buffers in "tensor" mode
+        "dtype": <numpy_dtype_name>             # only for raw buffers in "tensor" mode, default "float32"
     }
     + raw data
     :param username:
@@ -112,7 +159,10 @@ def get_experiment_execution_predictions(username, wname, name, exec_id):
     if len(filestores) < 1:
         return MissingFile()
     info = json.load(filestores.getlist('info')[0].stream)
-    transform = get_transform(username, wname, info)
+    try:
+        transform = get_transform(username, wname, info)
+    except InputShapeError as ex:
+        return BadRequestSyntax(msg=str(ex))
     mode = info.get('mode', 'plain')    # file transfer mode (similar to that for data repositories)
     input_data = filestores.getlist('files')
     execution = experiment_config.get_execution(exec_id)
@@ -125,6 +175,8 @@ def get_experiment_execution_predictions(username, wname, name, exec_id):
                 return RouteNotImplemented(HTTPStatus.NOT_IMPLEMENTED, msg=f"'{mode}' file transfer is not implemented")
             else:
                 return make_success_dict(HTTPStatus.OK, msg="Prediction correctly executed", data={'class_ids': result})
+        except InputShapeError as ex:
+            return BadRequestSyntax(msg=str(ex))
         except Exception as ex:
             return InternalFailure(msg=f"Error when sending model file: '{ex.args[0]}'.")
     else:
@@ -145,16 +197,33 @@ def get_deployed_model_predictions(username, wname, path):
     if len(filestores) < 1:
         return MissingFile()
     info = json.load(filestores.getlist('info')[0].stream)
-    transform = get_transform(username, wname, info)
     mode = info.get('mode', 'plain')    # file transfer mode (similar to that for data repositories)
     input_data = filestores.getlist('files')
-    context = UserWorkspaceResourceContext(username, wname)
-    deployed_model = deployed_model_config.build(context)
-    result = deployed_model.get_prediction(input_data, transform, mode)
-    if result == NotImplemented:
-        return RouteNotImplemented(HTTPStatus.NOT_IMPLEMENTED, msg=f"'{mode}' file transfer is not implemented")
-    else:
-        return make_success_dict(HTTPStatus.OK, msg="Prediction correctly executed", data={'class_ids': result})
+    # answer cache hits before decoding inputs and loading the model
+    cache_keys, result = None, {}
+    if deployed_model_config.prediction_cache is not None and mode in ('plain', 'tensor'):
+        fingerprint = transform_fingerprint(info)
+        cache_keys = {}
+        for inp in input_data:
+            cache_keys[inp.filename] = deployed_model_config.prediction_cache_key(fingerprint, inp.read())
+            inp.stream.seek(0)
+        result = deployed_model_config.get_cached_predictions(cache_keys)
+    missing_data = [inp for inp in input_data if inp.filename not in result]
+    if len(missing_data) > 0:
+        context = UserWorkspaceResourceContext(username, wname)
+        try:
+            transform = get_transform(username, wname, info)
+            deployed_model = deployed_model_config.build(context)
+            predictions = deployed_model.get_prediction(missing_data, transform, mode)
+        except InputShapeError as ex:
+            return BadRequestSyntax(msg=str(ex))
+        if predictions == NotImplemented:
+            return RouteNotImplemented(HTTPStatus.NOT_IMPLEMENTED, msg=f"'{mode}' file transfer is not implemented")
+        if cache_keys is not None:
+            deployed_model_config.cache_predictions(cache_keys, predictions)
+        result.update(predictions)
+    result = {inp.filename: result[inp.filename] for inp in input_data}
+    return make_success_dict(HTTPStatus.OK, msg="Prediction correctly executed", data={'class_ids': result})
 
 
 __all__ = [
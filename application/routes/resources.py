@@ -117,6 +117,41 @@ def get_resource(username, workspace, typename: str | t.Type[DataType], name: st
         return None, ResourceNotFound(resource=name)
 
 
+# lock fields are never returned by lists
+_LIST_EXCLUDED_FIELDS = ('rdleases', 'wrlease', 'wrqueue')
+
+
+@check_ownership(msg="You cannot retrieve another user ({user}) {type} list.",
+                 eval_args={'user': 'username', 'type': 'typename'})
+def get_resources(username, workspace, typename: str | t.Type[DataType],
+                  to_dict: t.Callable[[MongoResourceConfig], TDesc] = None) -> Response:
+    """
+    Lists the resources of the given type in a workspace. If a 'limit' is given in the query string,
+    resources are streamed one page at a time (see MongoBaseResourceConfig.get_page), together with
+    the continuation token of the next page.
+    :param to_dict: Conversion of each resource (defaults to resource.to_dict()).
+    """
+    dtype, error = _canonicalize_datatype(typename)
+    if error:
+        return error
+    to_dict = (lambda resource: resource.to_dict()) if to_dict is None else to_dict
+    # noinspection PyUnresolvedReferences
+    ctp: t.Type[MongoResourceConfig] = dtype.config_type()
+    limit, token, error = get_pagination_args()
+    if error is not None:
+        return error
+    if limit is not None:
+        try:
+            page = ctp.get_page(limit, token, owner=username, workspace=workspace, exclude=_LIST_EXCLUDED_FIELDS)
+            return make_streamed_list_response(
+                (linker.make_links(to_dict(resource)) for resource in page), lambda: page.next_token,
+            )
+        except ValueError as ex:
+            return MalformedQueryString(msg=str(ex))
+    data = {resource.name: linker.make_links(to_dict(resource)) for resource in ctp.get(username, workspace)}
+    return make_success_dict(HTTPStatus.OK, data=data)
+
+
 @tuple_check_ownership(msg="You cannot update a {type} for another user ({user}).",
                        eval_args={'type': 'typename', 'user': 'username'})
 def update_resource(username, workspace, typename: str | t.Type[DataType], name, updata) -> Response:
@@ -190,6 +225,7 @@ __all__ = [
     'add_new_resource',
     'build_resource',
     'get_resource',
+    'get_resources',
     'update_resource',
     'delete_resource',
 ]
\ No newline at end of file
@@ -32,6 +32,13 @@ def create_strategy(username, wname):
     return add_new_resource(username, wname, _DFL_STRATEGY_NAME_)
 
 
+@strategies_bp.get('/')
+@strategies_bp.get('')
+@token_auth.login_required
+def get_strategies(username, wname):
+    return get_resources(username, wname, typename=_DFL_STRATEGY_NAME_)
+
+
 @strategies_bp.get('/<resource:name>/')
 @strategies_bp.get('/<resource:name>')
 @token_auth.login_required
@@ -76,6 +83,7 @@ def delete_strategy(username, wname, name):
 __all__ = [
     'strategies_bp',
     'create_strategy',
+    'get_strategies',
     'get_strategy',
     'update_strategy',
     'delete_strategy',
@@ -85,6 +85,8 @@ def get_all_users():
 
     RequestSyntax: {}
 
+    QueryString (optional): limit=<max_users>&token=<continuation_token>
+
     ResponseSyntax (on success):
 
     {
@@ -94,8 +96,25 @@ def get_all_users():
         ...
     }
 
+    or, if limit and/or token are given:
+
+    {
+        "items": [<user_json>, ...],
+        "next": <continuation_token>/null,
+        "message": "Request successfully completed."
+    }
+
     :return:
     """
+    limit, token, error = get_pagination_args()
+    if error is not None:
+        return error
+    if limit is not None:
+        try:
+            page = User.get_page(limit, token)
+            return make_streamed_list_response((user.to_dict(links=False) for user in page), lambda: page.next_token)
+        except ValueError as ex:
+            return MalformedQueryString(msg=str(ex))
 
     all_users = User.all()
     if len(all_users) == 0:
@@ -184,7 +203,7 @@ def edit_user(username):
             return InvalidEmail(msg=msg)
 
     try:
-        current_user = token_auth.current_user()
+        current_user = token_auth.current_user().get_user()
         result = current_user.edit(data)
         if len(result) == 0:
             return make_success_kwargs(HTTPStatus.NOT_MODIFIED)
@@ -219,7 +238,7 @@ def edit_password(username):
     """
 
     data, opts, extras = get_check_json_data()
-    current_user = token_auth.current_user()
+    current_user = token_auth.current_user().get_user()
     old_password = data['old_password']
     new_password = data['new_password']
 
@@ -260,7 +279,7 @@ def delete_user(username):
     :param username:
     :return:
     """
-    current_user = token_auth.current_user()
+    current_user = token_auth.current_user().get_user()
     result, exc = current_user.delete()
     if not result:
         return InternalFailure(msg=exc.args[0])
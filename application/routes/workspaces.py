@@ -93,6 +93,17 @@ def get_workspaces(username):
     user = User.get_by_name(username)
     if not user:
         return NotExistingUser(user=username)
+    limit, token, error = get_pagination_args()
+    if error is not None:
+        return error
+    if limit is not None:
+        try:
+            page = Workspace.get_page(user, limit, token)
+            return make_streamed_list_response(
+                (workspace.to_dict(links=False) for workspace in page), lambda: page.next_token,
+            )
+        except ValueError as ex:
+            return MalformedQueryString(msg=str(ex))
     data = {}
     for workspace in Workspace.get_by_owner(t.cast(User, user)):
         data[workspace.name] = linker.make_links(workspace.to_dict())
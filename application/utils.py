@@ -4,6 +4,8 @@ Common constants.
 from __future__ import annotations
 
 import sys
+import json
+import base64
 import traceback
 import typing as t
 import os
@@ -14,8 +16,10 @@ from functools import wraps
 import torch
 from torch.nn.modules import Module
 from http import HTTPStatus
-from flask import Flask, Blueprint, url_for, jsonify, Response, request, g
+from flask import Flask, Blueprint, url_for, jsonify, Response, request, g, stream_with_context, has_request_context
+from flask import json as flask_json
 from werkzeug.exceptions import BadRequest
+from werkzeug.urls import url_quote
 from flask_executor import Executor
 
 from .errors import *
@@ -69,6 +73,65 @@ def make_success_dict(status: int = HTTPStatus.OK, msg: str = _DFL_SUCCESS_MSG,
     return response
 
 
+# Paginated listings
+_DFL_PAGE_LIMIT = 50
+_MAX_PAGE_LIMIT = 1000
+
+
+def encode_continuation_token(position: t.Any) -> str:
+    """
+    Builds an opaque continuation token for the given (JSON-serializable) position in a listing.
+    """
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+
+def decode_continuation_token(token: str | None) -> t.Any:
+    """
+    :return: The position encoded in the token, None if token is None.
+    :raises ValueError: If the token is malformed.
+    """
+    if token is None:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception as ex:
+        raise ValueError(f"Invalid continuation token: '{token}'.") from ex
+
+
+def get_pagination_args() -> tuple[int | None, str | None, ServerResponseError | None]:
+    """
+    Reads 'limit' and 'token' query parameters.
+    :return: A triple (limit, token, error), with limit = None if pagination has not been requested.
+    """
+    token = request.args.get('token')
+    limit = request.args.get('limit', type=int)
+    if limit is None and token is not None:
+        limit = _DFL_PAGE_LIMIT
+    if limit is not None and not (0 < limit <= _MAX_PAGE_LIMIT):
+        return None, None, MalformedQueryString(msg=f"'limit' must be between 1 and {_MAX_PAGE_LIMIT}.")
+    return limit, token, None
+
+
+def make_streamed_list_response(items: t.Iterable[TDesc], next_token: t.Callable[[], str | None],
+                                status: int = HTTPStatus.OK, msg: str = _DFL_SUCCESS_MSG) -> Response:
+    """
+    Streams a JSON object {"items": [...], "next": <continuation_token>, "message": <msg>},
+    serializing items one at a time while they are produced (e.g. from a database cursor).
+    :param items: Items to serialize.
+    :param next_token: Called after all items have been produced, returns the continuation
+    token for the next page (None if there are no more items).
+    """
+    def generate():
+        yield '{"items": ['
+        first = True
+        for item in items:
+            yield ('' if first else ', ') + flask_json.dumps(item)
+            first = False
+        yield f'], "next": {flask_json.dumps(next_token())}, "message": {flask_json.dumps(msg)}}}'
+
+    return Response(stream_with_context(generate()), status=status, mimetype='application/json')
+
+
 # JSON checking!
 def checked_json(keyargs: bool = False, required: set[str] = None, optionals: set[str] = None,
                  force: bool = True) -> tuple[t.Any | None, ServerResponseError | None, list[str], list[str]]:
@@ -158,6 +221,9 @@ def get_check_json_data() -> tuple[t.Any | None, list[str], list[str]]:
 
 
 # Linker
+_URL_SAFE_CHARS = '/:'   # same as werkzeug default converters
+
+
 class LinkRule:
     def __init__(self, name: str, value: t.Any):
         self.name = name
@@ -172,7 +238,10 @@ class LinkRule:
         if args_rule is not None:
             extra_args.update(args_rule(self.value))
         url = (f"{link_bp.name}." if link_bp is not None else '') + link_view_func.__name__
-        return url_for(url, **extra_args)
+        template = linker.url_template(url, extra_args.keys())
+        if template is None:
+            return url_for(url, **extra_args)
+        return template.format(**{name: url_quote(str(value), safe=_URL_SAFE_CHARS) for name, value in extra_args.items()})
 
 
 class Linker:
@@ -183,6 +252,7 @@ class Linker:
     def __init__(self, app: Flask = None, links_keyword: str = None):
         self.link_rules: dict[str, tuple[t.Callable, t.Optional[Blueprint]]] = {}            # resource_name -> view function .__name__
         self.args_rules: dict[str, t.Callable] = {}     # resource_name -> args for url_for view function
+        self.url_templates: dict[tuple, str | None] = {}    # (endpoint, arg_names, script_root) -> url template
         self.links_keyword = links_keyword
         if app is not None:
             self.init_app(app)
@@ -202,6 +272,7 @@ class Linker:
             if old_view is not None:
                 raise AttributeError(f"A view function was already registered for '{resource_name}'")
         self.link_rules[resource_name] = (view_function, blueprint)
+        self.url_templates.clear()
 
     def add_args_rule(self, resource_name: str, args_function: t.Callable, replace=True):
         # resource_name = f"{blueprint.name}.{resource_name}" if resource_name is not None else resource_name
@@ -217,6 +288,27 @@ class Linker:
     def get_args_rule(self, name: str) -> t.Callable:
         return self.args_rules.get(name, None)
 
+    def url_template(self, endpoint: str, arg_names: t.Iterable[str]) -> str | None:
+        """
+        Builds (once) a format string for the URLs of the given endpoint, so that links are
+        generated without matching the URL map each time.
+        :return: The template, or None if the URL cannot be expressed as a template.
+        """
+        arg_names = tuple(sorted(arg_names))
+        key = (endpoint, arg_names, request.script_root if has_request_context() else None)
+        if key in self.url_templates:
+            return self.url_templates[key]
+        placeholders = {name: f'\x00{name}\x00' for name in arg_names}
+        template = url_for(endpoint, **placeholders).replace('{', '{{').replace('}', '}}')
+        for name, placeholder in placeholders.items():
+            quoted = url_quote(placeholder, safe=_URL_SAFE_CHARS)
+            if template.count(quoted) != 1:
+                template = None
+                break
+            template = template.replace(quoted, '{' + name + '}')
+        self.url_templates[key] = template
+        return template
+
     def link_rule(self, resource_name, blueprint: Blueprint = None, replace=True):
         def wrapper(view_function: t.Callable):
             self.add_link_rule(resource_name, view_function, blueprint=blueprint, replace=replace)
@@ -292,6 +384,15 @@ def get_device():
     return torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
+def get_model_device(model: torch.nn.Module) -> torch.device:
+    """
+    :return: The device of the model parameters, i.e. where inputs must be moved
+    (CPU for models without parameters, e.g. frozen TorchScript modules).
+    """
+    parameter = next(model.parameters(), None)
+    return parameter.device if parameter is not None else torch.device('cpu')
+
+
 # utility for common datasets
 def get_all_common_datasets_root(abspath: bool = False) -> str:
     basepath = os.path.join('common', 'datasets')
@@ -395,6 +496,11 @@ __all__ = [
     'make_success_kwargs',
     'make_success_dict',
 
+    'encode_continuation_token',
+    'decode_continuation_token',
+    'get_pagination_args',
+    'make_streamed_list_response',
+
     'checked_json',
     'check_json',
     'get_check_json_data',
@@ -404,6 +510,7 @@ __all__ = [
     'linker',
 
     'get_device',
+    'get_model_device',
     'Module',
 
     'get_all_common_datasets_root',
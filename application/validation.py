@@ -1,8 +1,10 @@
 """
 Validation functions for url elements (username, password, workspace/resource/experiment name,
-allowed data repository paths etc.)
+allowed data repository paths etc.) and cache of compiled config schemas.
 """
 from __future__ import annotations
+import threading
+import schema as sch
 from pyisemail import is_email
 
 from .utils import TBoolStr
@@ -176,6 +178,41 @@ def validate_path(path: str) -> TBoolStr:
         return True, None
 
 
+# Compiled config schemas
+_COMPILED_SCHEMAS: dict[type, sch.Schema] = {}
+_COMPILED_SCHEMAS_LOCK = threading.Lock()
+
+
+def compiled_schema(cls: type) -> sch.Schema:
+    """
+    Returns the schema built from cls.schema_dict(), building it only on first use.
+    Schema dictionaries must therefore not depend on the request: any dynamic check
+    must be done inside callables (e.g. lambda x: x in <registry>).
+    """
+    schema = _COMPILED_SCHEMAS.get(cls)
+    if schema is None:
+        schema = sch.Schema(cls.schema_dict())
+        with _COMPILED_SCHEMAS_LOCK:
+            _COMPILED_SCHEMAS[cls] = schema
+    return schema
+
+
+def invalidate_compiled_schemas(cls: type = None):
+    """
+    Drops the compiled schemas of cls and of its subclasses (which usually extend the parent
+    schema dictionary), or all compiled schemas if cls is None. Config registration decorators
+    call this so that dynamically registered or redefined configs are never validated with
+    stale schemas.
+    """
+    with _COMPILED_SCHEMAS_LOCK:
+        if cls is None:
+            _COMPILED_SCHEMAS.clear()
+        else:
+            for compiled_cls in list(_COMPILED_SCHEMAS.keys()):
+                if issubclass(compiled_cls, cls):
+                    del _COMPILED_SCHEMAS[compiled_cls]
+
+
 __all__ = [
     'base_validation_function',
 
@@ -196,4 +233,7 @@ __all__ = [
     'validate_alnum',
 
     'validate_path',
+
+    'compiled_schema',
+    'invalidate_compiled_schemas',
 ]
\ No newline at end of file
@@ -475,6 +475,15 @@ class BaseClient:
     def get_model(self, name: str):
         return self.get([self.models_base, name])
 
+    @check_in_session('auth_token', 'username', 'workspace')
+    def get_models(self, limit: int = None, token: str = None):
+        params = {}
+        if limit is not None:
+            params['limit'] = limit
+        if token is not None:
+            params['token'] = token
+        return self.get(self.models_base, params=params)
+
     @check_in_session('auth_token', 'username', 'workspace')
     def rename_model(self, name: str, new_name: str):
         return self.update_model(name, {'name': new_name})
@@ -0,0 +1,53 @@
+"""
+Testing on the request-scoped identity map.
+"""
+from __future__ import annotations
+import unittest
+
+from flask import Flask
+
+from application.database import db
+from application.mongo.utils import identity_key, request_cached
+
+
+class FirstResource(db.Document):
+    meta = {'collection': 'identity_map_first_resources'}
+    name = db.StringField()
+
+
+class SecondResource(db.Document):
+    meta = {'collection': 'identity_map_second_resources'}
+    name = db.StringField()
+
+
+class IdentityMapTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.app = Flask(__name__)
+
+    def test_classes_keys(self):
+        self.assertNotEqual(
+            identity_key(FirstResource, 'owner', 'workspace', 'name'),
+            identity_key(SecondResource, 'owner', 'workspace', 'name'),
+        )
+
+    def test_resources_with_same_name(self):
+        first, second = FirstResource(name='name'), SecondResource(name='name')
+        with self.app.app_context():
+            first_result = request_cached(
+                'resource', identity_key(FirstResource, 'owner', 'workspace', 'name'), lambda: [first],
+            )
+            second_result = request_cached(
+                'resource', identity_key(SecondResource, 'owner', 'workspace', 'name'), lambda: [second],
+            )
+            self.assertIs(first_result[0], first)
+            self.assertIs(second_result[0], second)
+            # cached values are returned within the same context
+            self.assertIs(
+                request_cached('resource', identity_key(SecondResource, 'owner', 'workspace', 'name'), list)[0],
+                second,
+            )
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
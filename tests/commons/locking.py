@@ -0,0 +1,80 @@
+"""
+Testing on the request-scoped memo of held locks.
+"""
+from __future__ import annotations
+import unittest
+from unittest import mock
+
+from bson import ObjectId
+from flask import Flask
+from pymongo.errors import OperationFailure
+
+from application.mongo.locking import RWLockableDocument, LockingError, _lock_key, _lock_memo
+
+
+class LockableResource(RWLockableDocument):
+    meta = {'collection': 'locking_test_resources'}
+
+    @property
+    def parents(self) -> set[RWLockableDocument]:
+        return set()
+
+
+class LockMemoTestCase(unittest.TestCase):
+
+    READ, WRITE = 0, 1
+
+    def setUp(self) -> None:
+        self.app = Flask(__name__)
+        self.resource = LockableResource(id=ObjectId())
+
+    def test_memoized_read(self):
+        with self.app.app_context():
+            memo = _lock_memo()
+            key = _lock_key(self.resource)
+            memo[key] = [self.READ, 1]
+            with self.resource.resource_read(parents_locked=True):
+                self.assertEqual(memo[key], [self.READ, 2])
+            self.assertEqual(memo[key], [self.READ, 1])
+
+    def test_read_write_upgrade(self):
+        with self.app.app_context():
+            memo = _lock_memo()
+            key = _lock_key(self.resource)
+            memo[key] = [self.READ, 1]
+            with self.assertRaises(LockingError):
+                with self.resource.resource_write(parents_locked=True):
+                    pass
+            # entry of the outer context is left untouched
+            self.assertEqual(memo[key], [self.READ, 1])
+
+
+class ReadLockAllTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.documents = [LockableResource(id=ObjectId()), LockableResource(id=ObjectId())]
+        self.transactions_supported = RWLockableDocument._transactions_supported
+        RWLockableDocument._transactions_supported = None
+
+    def tearDown(self) -> None:
+        RWLockableDocument._transactions_supported = self.transactions_supported
+
+    def test_write_conflict_retry(self):
+        ids = [document.pk for document in self.documents]
+        conflict = OperationFailure(
+            'WriteConflict', code=112, details={'errorLabels': ['TransientTransactionError']},
+        )
+        collection = mock.MagicMock()
+        collection.update_many.side_effect = [conflict, mock.Mock(modified_count=len(ids))]
+        groups = {'locking_test_resources': (collection, ids)}
+        with mock.patch.object(RWLockableDocument, '_group_by_collection', return_value=groups), \
+                mock.patch('application.mongo.locking.lease_manager.register'):
+            lease_id = RWLockableDocument.read_lock_all(self.documents, timeout=5)
+        # the conflicting transaction is aborted and retried, not reported as a server error
+        self.assertIsNotNone(lease_id)
+        self.assertEqual(collection.update_many.call_count, 2)
+        self.assertTrue(RWLockableDocument._transactions_supported)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
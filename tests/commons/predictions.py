@@ -0,0 +1,38 @@
+"""
+Testing on the validation of 'tensor' mode prediction inputs.
+"""
+from __future__ import annotations
+import unittest
+
+from application.mongo.resources.deployed_models import InputShapeError
+from application.routes.predictions import get_transform
+
+
+class TensorTransformTestCase(unittest.TestCase):
+
+    username = 'predictions-username'
+    workspace = 'predictions_workspace'
+
+    def get_transform(self, **info):
+        return get_transform(self.username, self.workspace, {'mode': 'tensor', **info})
+
+    def test_valid(self):
+        transform = self.get_transform(shape=[2, 3], dtype='int64')
+        self.assertEqual(transform.shape, (2, 3))
+        self.assertEqual(transform.dtype.name, 'int64')
+
+    def test_invalid_shape(self):
+        for shape in (3, '2x3', [2, -1], [2.0, 3], [True]):
+            with self.subTest(shape=shape):
+                with self.assertRaises(InputShapeError):
+                    self.get_transform(shape=shape)
+
+    def test_invalid_dtype(self):
+        for dtype in ('notatype', 7, ['float32'], 'object', 'U8'):
+            with self.subTest(dtype=dtype):
+                with self.assertRaises(InputShapeError):
+                    self.get_transform(shape=[2], dtype=dtype)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -134,6 +134,7 @@ class ResourceTestCase(BaseTestCase):
     deleted = False
 
     resources = ('metric_set', 'model', 'benchmark', 'criterion', 'optimizer', 'strategy')
+    user_fields = ('email', 'password_hash', 'token', 'token_expiration', 'token_generation')
 
     # "Macros"
     def register_login(self):
@@ -182,6 +183,24 @@ class ResourceTestCase(BaseTestCase):
 
         self.assertBaseHandler(rename_method(name=f"new_{resource_name}", new_name=resource_name))
 
+    def assertNoUserFields(self, data):
+        if isinstance(data, dict):
+            for key, value in data.items():
+                self.assertNotIn(key, self.user_fields)
+                self.assertNoUserFields(value)
+        elif isinstance(data, list):
+            for item in data:
+                self.assertNoUserFields(item)
+
+    def list_models(self):
+        # paged list, streamed from the database
+        response = self.client.get_models(limit=1)
+        self.assertBaseHandler(response)
+        data = response.json()
+        self.assertEqual(len(data['items']), 1)
+        self.assertEqual(data['items'][0]['name'], 'model')
+        self.assertNoUserFields(data)
+
     def test_main(self):
         self.deleted = False
         with self.client.session(self.username, self.workspace):
@@ -203,6 +222,9 @@ class ResourceTestCase(BaseTestCase):
                     self.handle_resource(resource_type, resource_name, resource_desc,
                                          resource_build, edited_resource)
 
+                # list resources with pagination
+                self.list_models()
+
                 for tp in self.resources[::-1]:
                     delete_method = eval(f"self.client.delete_{tp}")
                     self.assertBaseHandler(delete_method(name=tp))
@@ -22,6 +22,9 @@ class BaseClassicBenchmarkExperimentTestCase(BaseExperimentTestCase):
     deleted = False
     final_delete = True
 
+    # extra parameters added to all strategy builds (e.g. for comparing training options)
+    strategy_extras: dict = {}
+
     @staticmethod
     @abstractmethod
     def get_benchmark_name() -> str:    # split_mnist, split_cifar10, ...; used for directories
@@ -62,7 +65,7 @@ class BaseClassicBenchmarkExperimentTestCase(BaseExperimentTestCase):
                 for descriptor in self.experiment_data:
                     folder = descriptor['folder']
                     strategy_name = descriptor['strategy_name']
-                    strategy_build = descriptor['strategy_build']
+                    strategy_build = dict(descriptor['strategy_build'], **self.strategy_extras)
 
                     experiment_name = descriptor['experiment_name']
                     experiment_build = descriptor['experiment_build']
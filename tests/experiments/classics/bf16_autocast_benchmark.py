@@ -0,0 +1,105 @@
+"""
+Throughput comparison between float32 and bfloat16 autocast training ('autocast_bf16' strategy
+option) on the Split MNIST and Split CIFAR-100 (4 epochs) configurations. Each configuration
+is run for both modes, and durations of the executions (as saved in execution_results.json)
+are compared by throughput_report().
+"""
+from __future__ import annotations
+import os
+import json
+import unittest
+from email.utils import parsedate_to_datetime
+
+from ..data import *
+from .base import *
+# modules are imported instead of test cases, so that these are not run again from here
+from . import split_mnist_4_epochs as mnist
+from . import split_cifar100_4_epochs as cifar100
+
+
+class SplitMNISTFloat32Test(mnist.SplitMNISTTest):
+
+    num_iterations = 1
+    username = 'split-mnist-fp32-username'
+    email = 'split_mnist_fp32' + BaseClassicBenchmarkExperimentTestCase.email
+    workspace = 'split_mnist_fp32_workspace'
+
+    @staticmethod
+    def get_benchmark_name() -> str:
+        return 'split_mnist_4_epochs_fp32'
+
+
+class SplitMNISTBFloat16Test(mnist.SplitMNISTTest):
+
+    num_iterations = 1
+    username = 'split-mnist-bf16-username'
+    email = 'split_mnist_bf16' + BaseClassicBenchmarkExperimentTestCase.email
+    workspace = 'split_mnist_bf16_workspace'
+    strategy_extras = {'autocast_bf16': True}
+
+    @staticmethod
+    def get_benchmark_name() -> str:
+        return 'split_mnist_4_epochs_bf16'
+
+
+class SplitCIFAR100Float32Test(cifar100.SplitCIFAR100Test):
+
+    num_iterations = 1
+    username = 'split-cifar100-fp32-username'
+    email = 'split_cifar100_fp32' + BaseClassicBenchmarkExperimentTestCase.email
+    workspace = 'split_cifar100_fp32_workspace'
+
+    @staticmethod
+    def get_benchmark_name() -> str:
+        return 'split_cifar100_4_epochs_fp32'
+
+
+class SplitCIFAR100BFloat16Test(cifar100.SplitCIFAR100Test):
+
+    num_iterations = 1
+    username = 'split-cifar100-bf16-username'
+    email = 'split_cifar100_bf16' + BaseClassicBenchmarkExperimentTestCase.email
+    workspace = 'split_cifar100_bf16_workspace'
+    strategy_extras = {'autocast_bf16': True}
+
+    @staticmethod
+    def get_benchmark_name() -> str:
+        return 'split_cifar100_4_epochs_bf16'
+
+
+def _durations(benchmark_name: str, base_folder: str = STD_RESULTS_BASE_FOLDER) -> dict[str, float]:
+    """
+    :return: A dictionary strategy folder -> execution duration (in seconds).
+    """
+    result = {}
+    base_dir = os.path.join(base_folder, benchmark_name, '0')
+    for folder in sorted(os.listdir(base_dir)) if os.path.isdir(base_dir) else []:
+        file_path = os.path.join(base_dir, folder, 'execution_results.json')
+        if os.path.isfile(file_path):
+            with open(file_path, 'r') as fp:
+                data = json.load(fp)['data']
+            start, end = parsedate_to_datetime(data['start_time']), parsedate_to_datetime(data['end_time'])
+            result[folder] = (end - start).total_seconds()
+    return result
+
+
+def throughput_report(base_folder: str = STD_RESULTS_BASE_FOLDER) -> dict[str, dict[str, dict]]:
+    """
+    :return: A dictionary configuration -> strategy -> {'fp32_s', 'bf16_s', 'speedup'}.
+    """
+    report = {}
+    for config in ['split_mnist_4_epochs', 'split_cifar100_4_epochs']:
+        fp32 = _durations(f"{config}_fp32", base_folder)
+        bf16 = _durations(f"{config}_bf16", base_folder)
+        report[config] = {
+            strategy: {
+                'fp32_s': fp32[strategy], 'bf16_s': bf16[strategy],
+                'speedup': fp32[strategy] / bf16[strategy] if bf16[strategy] > 0 else None,
+            } for strategy in fp32.keys() & bf16.keys()
+        }
+    return report
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
+    print(json.dumps(throughput_report(), indent=2))